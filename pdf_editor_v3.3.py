@@ -14,6 +14,9 @@ import base64
 import json
 import time
 import gc
+import zlib
+import io
+from concurrent.futures import ThreadPoolExecutor
 
 # Kunhwa PDF Editor v3.3 - Undo/Redo + 진행률 + GoToPage + 상태표시줄 + 최근파일 + 모던UI
 VERSION = "v3.3"
@@ -53,11 +56,69 @@ def _get_app_data_dir():
 # Undo / Redo 매니저
 # ─────────────────────────────────────────────
 class UndoManager:
-    """PDF 편집 작업의 Undo/Redo를 관리 (최대 10단계)"""
-    def __init__(self, max_history=10):
-        self._undo_stack = []   # [(action_name, pdf_bytes), ...]
+    """PDF 편집 작업의 Undo/Redo를 관리 (용량 기준)
+
+    단계 수가 아니라 메모리 사용량으로 제한합니다. 메모리 한도를 넘으면 오래된
+    상태부터 압축하여 임시 파일로 내리고, 되돌릴 때 필요한 것만 다시 읽습니다.
+    디스크 한도를 넘으면 가장 오래된 상태부터 버립니다.
+    """
+    MEMORY_BUDGET = 256 * 1024 * 1024
+    DISK_BUDGET = 2 * 1024 * 1024 * 1024
+
+    def __init__(self, max_history=100, memory_budget=None, disk_budget=None):
+        # 항목: [action_name, pdf_bytes(디스크로 내리면 None), 임시파일 경로, 크기]
+        self._undo_stack = []
         self._redo_stack = []
         self.max_history = max_history
+        self.memory_budget = memory_budget or self.MEMORY_BUDGET
+        self.disk_budget = disk_budget or self.DISK_BUDGET
+        self._spill_dir = None
+
+    def _entry(self, action_name, pdf_bytes):
+        return [action_name, pdf_bytes, None, len(pdf_bytes)]
+
+    def _load(self, entry):
+        if entry[1] is not None:
+            return entry[1]
+        with open(entry[2], 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def _discard(self, entry):
+        if entry[2]:
+            try:
+                os.remove(entry[2])
+            except OSError:
+                pass
+        entry[1] = entry[2] = None
+
+    def _spill(self, entry):
+        """메모리에 있는 상태를 압축 임시 파일로 내림"""
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="kunhwa_undo_")
+        fd, path = tempfile.mkstemp(suffix=".z", dir=self._spill_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(zlib.compress(entry[1], 1))
+        entry[2] = path
+        entry[3] = os.path.getsize(path)
+        entry[1] = None
+
+    def _enforce_budget(self):
+        while len(self._undo_stack) > self.max_history:
+            self._discard(self._undo_stack.pop(0))
+        # 오래된 undo 상태부터 디스크로 (가장 최근 상태는 메모리에 유지)
+        in_memory = self.memory_bytes
+        for entry in self._undo_stack[:-1]:
+            if in_memory <= self.memory_budget:
+                break
+            if entry[1] is not None:
+                in_memory -= entry[3]
+                try:
+                    self._spill(entry)
+                except Exception as e:
+                    print(f"Undo 임시 파일 저장 실패: {e}")
+                    break
+        while self._undo_stack and self.disk_bytes > self.disk_budget:
+            self._discard(self._undo_stack.pop(0))
 
     def save_state(self, doc, action_name=""):
         """현재 PDF 상태를 undo 스택에 저장"""
@@ -65,12 +126,12 @@ class UndoManager:
             return
         try:
             pdf_bytes = doc.tobytes(deflate=True)
-            self._undo_stack.append((action_name, pdf_bytes))
-            # 스택 크기 제한
-            while len(self._undo_stack) > self.max_history:
-                self._undo_stack.pop(0)
+            self._undo_stack.append(self._entry(action_name, pdf_bytes))
             # 새 작업을 하면 redo 스택은 초기화
+            for entry in self._redo_stack:
+                self._discard(entry)
             self._redo_stack.clear()
+            self._enforce_budget()
         except Exception as e:
             print(f"Undo 상태 저장 실패: {e}")
 
@@ -82,9 +143,12 @@ class UndoManager:
             # 현재 상태를 redo 스택에 저장
             if doc is not None:
                 current_bytes = doc.tobytes(deflate=True)
-                self._redo_stack.append(("redo", current_bytes))
-            action_name, prev_bytes = self._undo_stack.pop()
-            print(f"Undo: '{action_name}' 작업 되돌리기")
+                self._redo_stack.append(self._entry("redo", current_bytes))
+            entry = self._undo_stack.pop()
+            prev_bytes = self._load(entry)
+            self._discard(entry)
+            self._enforce_budget()
+            print(f"Undo: '{entry[0]}' 작업 되돌리기")
             return prev_bytes
         except Exception as e:
             print(f"Undo 실패: {e}")
@@ -98,8 +162,11 @@ class UndoManager:
             # 현재 상태를 undo 스택에 저장
             if doc is not None:
                 current_bytes = doc.tobytes(deflate=True)
-                self._undo_stack.append(("undo", current_bytes))
-            _, redo_bytes = self._redo_stack.pop()
+                self._undo_stack.append(self._entry("undo", current_bytes))
+            entry = self._redo_stack.pop()
+            redo_bytes = self._load(entry)
+            self._discard(entry)
+            self._enforce_budget()
             print("Redo: 작업 다시 실행")
             return redo_bytes
         except Exception as e:
@@ -114,7 +181,17 @@ class UndoManager:
     def can_redo(self):
         return len(self._redo_stack) > 0
 
+    @property
+    def memory_bytes(self):
+        return sum(e[3] for e in self._undo_stack + self._redo_stack if e[1] is not None)
+
+    @property
+    def disk_bytes(self):
+        return sum(e[3] for e in self._undo_stack + self._redo_stack if e[2])
+
     def clear(self):
+        for entry in self._undo_stack + self._redo_stack:
+            self._discard(entry)
         self._undo_stack.clear()
         self._redo_stack.clear()
 
@@ -561,7 +638,7 @@ class PDFEditorApp:
         self.page_clipboard_bytes = None
         
         # ── v3.3 신규: Undo/Redo 매니저 ──
-        self.undo_manager = UndoManager(max_history=10)
+        self.undo_manager = UndoManager()
         
         # ── v3.3 신규: 최근 파일 매니저 ──
         self.recent_files_manager = RecentFilesManager()
@@ -764,6 +841,14 @@ class PDFEditorApp:
             
             print(f"최종 드롭 타겟 위치: {drop_target}")
             
+            image_files = [f for f in supported_files if os.path.splitext(f)[1].lower() != '.pdf']
+            supported_files = [f for f in supported_files if os.path.splitext(f)[1].lower() == '.pdf']
+            if not self.doc and not supported_files:
+                # 이미지만 드롭: 새 문서에 한 번에 추가
+                self.doc = fitz.open()
+                self.current_page_index = 0
+                drop_target = 0
+            
             if not self.doc:
                 # 현재 열린 PDF가 없으면 첫 번째 파일을 열기
                 first_file = supported_files[0]
@@ -794,11 +879,10 @@ class PDFEditorApp:
             
             # 나머지 파일들을 병합
             for file_path in supported_files:
-                file_ext = os.path.splitext(file_path)[1].lower()
-                if file_ext == '.pdf':
-                    self.merge_pdf_from_path_with_position(file_path, drop_target)
-                else:
-                    self.merge_image_from_path_with_position(file_path, drop_target)
+                self.merge_pdf_from_path_with_position(file_path, drop_target)
+            # 이미지는 한 번에 (병렬 헤더 읽기, JPEG 무변환, 한 번의 삽입과 새로고침)
+            if image_files:
+                self.merge_images_batch(image_files, drop_target)
             
             # 드래그 앤 드롭으로 파일 병합 완료 시 메시지 표시하지 않음
                 
@@ -1148,6 +1232,70 @@ class PDFEditorApp:
             print(f"이미지로부터 PDF 생성 실패: {e}")
             raise e
 
+    @staticmethod
+    def _read_image_for_page(path):
+        """파일과 이미지 헤더만 읽기 (픽셀 디코딩 없음). 읽기 스레드에서 실행"""
+        with open(path, "rb") as f:
+            data = f.read()
+        with Image.open(io.BytesIO(data)) as img:
+            return path, data, img.format, img.size, getattr(img, 'n_frames', 1)
+
+    def _add_image_future_page(self, batch, path, future, skipped):
+        """읽어 온 이미지 하나를 batch 문서의 페이지로 추가"""
+        a4_width, a4_height = 595.276, 841.890
+        try:
+            path, data, fmt, (width, height), frames = future.result()
+            if frames > 1:
+                # 여러 페이지 TIFF: 프레임마다 A4에 맞춘 페이지
+                ext = os.path.splitext(path)[1].lstrip(".").lower()
+                with fitz.open(stream=data, filetype=ext) as img_doc:
+                    with fitz.open("pdf", img_doc.convert_to_pdf()) as converted:
+                        for pno in range(len(converted)):
+                            r = converted[pno].rect
+                            scale = min(a4_width / r.width, a4_height / r.height)
+                            page = batch.new_page(width=r.width * scale, height=r.height * scale)
+                            page.show_pdf_page(page.rect, converted, pno)
+                return
+            # 이미지 비율을 유지하며 A4 안에 맞춤 (JPEG은 스트림 그대로 삽입)
+            scale = min(a4_width / width, a4_height / height)
+            page = batch.new_page(width=width * scale, height=height * scale)
+            page.insert_image(page.rect, stream=data)
+        except Exception as e:
+            skipped.append(path)
+            print(f"이미지 병합 실패: {path}: {e}")
+
+    def merge_images_batch(self, image_paths, insert_pos):
+        """여러 이미지를 한 번에 페이지로 추가
+
+        파일과 헤더는 스레드에서 병렬로 읽고, JPEG은 재압축 없이 그대로 넣으며,
+        여러 페이지 TIFF는 프레임마다 페이지를 만든다. 임시 문서에 모은 뒤
+        한 번만 삽입하고 썸네일도 한 번만 새로고침한다.
+        """
+        if self.doc and len(self.doc):
+            self.undo_manager.save_state(self.doc)
+        t0 = time.perf_counter()
+        batch = fitz.open()
+        skipped = []
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            # 16개씩 묶어 읽어 메모리 사용량 제한
+            for start in range(0, len(image_paths), 16):
+                chunk = image_paths[start:start + 16]
+                futures = [pool.submit(self._read_image_for_page, p) for p in chunk]
+                for path, future in zip(chunk, futures):
+                    self._add_image_future_page(batch, path, future, skipped)
+        
+        added = len(batch)
+        if added:
+            if insert_pos < 0 or insert_pos > len(self.doc):
+                insert_pos = len(self.doc)
+            self.doc.insert_pdf(batch, start_at=insert_pos)
+            self.selected_indices = set(range(insert_pos, insert_pos + added))
+            self.refresh_thumbnails()
+            self.update_preview()
+        batch.close()
+        print(f"이미지 {len(image_paths) - len(skipped)}개 → {added}페이지 추가 ({time.perf_counter() - t0:.2f}초), 실패 {len(skipped)}개")
+        return added > 0
+
     def merge_image_from_path_with_position(self, image_path, insert_pos):
         """지정된 위치에 이미지 병합"""
         if self.doc:
@@ -3440,8 +3588,8 @@ class PDFEditorApp:
             messagebox.showwarning("경고", "텍스트를 추출할 페이지를 선택해주세요.")
             return
         
-        # 텍스트 추출 실행
-        all_text = ""
+        # 텍스트 추출 실행 (페이지별 조각을 모아 한 번에 합침)
+        parts = []
         
         for i, page_idx in enumerate(target_pages):
             try:
@@ -3453,11 +3601,12 @@ class PDFEditorApp:
                 if not text.strip():
                     text = "이 페이지에는 텍스트가 없습니다."
                 
-                all_text += f"=== 페이지 {page_num} ===\n{text}\n\n"
+                parts.append(f"=== 페이지 {page_num} ===\n{text}\n\n")
                 
             except Exception as e:
                 error_msg = f"페이지 {page_idx + 1} 처리 중 오류: {str(e)}"
-                all_text += f"{error_msg}\n\n"
+                parts.append(f"{error_msg}\n\n")
+        all_text = "".join(parts)
         
         # 결과를 새 창에 표시
         result_dialog = Toplevel(self.root)
@@ -3644,7 +3793,7 @@ class PDFEditorApp:
             text_widget.insert(tk.END, "텍스트 추출 중...\n\n")
             dialog.update()
             
-            all_text = ""
+            parts = []
             
             for i, page_idx in enumerate(target_pages):
                 try:
@@ -3657,19 +3806,21 @@ class PDFEditorApp:
                         text = "이 페이지에는 텍스트가 없습니다."
                     
                     text_widget.insert(tk.END, f"{text}\n\n")
-                    all_text += f"=== 페이지 {page_num} ===\n{text}\n\n"
+                    parts.append(f"=== 페이지 {page_num} ===\n{text}\n\n")
                     
-                    dialog.update()
+                    # 화면 갱신은 10페이지마다 (매 페이지 update()는 추출보다 느림)
+                    if i % 10 == 9:
+                        dialog.update()
                     
                 except Exception as e:
                     error_msg = f"페이지 {page_idx + 1} 처리 중 오류: {str(e)}"
                     text_widget.insert(tk.END, f"{error_msg}\n\n")
-                    all_text += f"{error_msg}\n\n"
+                    parts.append(f"{error_msg}\n\n")
             
             text_widget.insert(tk.END, "텍스트 추출이 완료되었습니다.")
             
             # 전역 변수로 저장 (복사/저장용)
-            dialog.extracted_text = all_text
+            dialog.extracted_text = "".join(parts)
         
         def copy_all_text():
             """전체 텍스트를 클립보드에 복사"""
@@ -4495,7 +4646,8 @@ Copyright 2026 Kunhwa Engineering & Consulting. All rights reserved.
             return
         restored = self.undo_manager.undo(self.doc)
         if restored:
-            self.doc = restored
+            self.doc.close()
+            self.doc = fitz.open(stream=restored, filetype="pdf")
             self.current_page_index = min(self.current_page_index, len(self.doc) - 1)
             self.selected_indices.clear()
             self._thumbnail_cache.clear()
@@ -4513,7 +4665,8 @@ Copyright 2026 Kunhwa Engineering & Consulting. All rights reserved.
             return
         restored = self.undo_manager.redo(self.doc)
         if restored:
-            self.doc = restored
+            self.doc.close()
+            self.doc = fitz.open(stream=restored, filetype="pdf")
             self.current_page_index = min(self.current_page_index, len(self.doc) - 1)
             self.selected_indices.clear()
             self._thumbnail_cache.clear()
@@ -4609,7 +4762,10 @@ Copyright 2026 Kunhwa Engineering & Consulting. All rights reserved.
             undo_count = len(self.undo_manager._undo_stack)
             redo_count = len(self.undo_manager._redo_stack)
             if undo_count > 0 or redo_count > 0:
-                self._status_undo.config(text=f"↩ Undo: {undo_count} | Redo: {redo_count} ↪")
+                undo_text = f"↩ Undo: {undo_count} | Redo: {redo_count} ↪ ({self.undo_manager.memory_bytes / 1024 / 1024:.0f} MB"
+                if self.undo_manager.disk_bytes:
+                    undo_text += f", 디스크 {self.undo_manager.disk_bytes / 1024 / 1024:.0f} MB"
+                self._status_undo.config(text=undo_text + ")")
             else:
                 self._status_undo.config(text="")
         except Exception as e:
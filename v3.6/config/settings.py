@@ -18,6 +18,27 @@ APP_DIR = get_app_dir()
 DATA_DIR = os.path.join(APP_DIR, "data")
 USERS_FILE = os.path.join(APP_DIR, "users.json.enc")
 
+def get_user_data_dir():
+    """Returns the per-user data directory (the app directory may be read-only)."""
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('APPDATA') or os.path.expanduser('~')
+    return os.path.join(base, "KunhwaPDFEditor")
+
+USER_DATA_DIR = get_user_data_dir()
+RECOVERY_DIR = os.path.join(USER_DATA_DIR, "recovery")
+SETTINGS_FILE = os.path.join(USER_DATA_DIR, "settings.json")  # performance mode and tuned values
+THUMB_CACHE_DIR = os.path.join(USER_DATA_DIR, "thumbcache")
+LOCAL_COPY_DIR = os.path.join(USER_DATA_DIR, "localcopy")  # working copies of files on network shares
+SEARCH_INDEX_DIR = os.path.join(USER_DATA_DIR, "searchindex")  # text indexes of opened files, by content
+FOLDER_INDEX_FILE = os.path.join(USER_DATA_DIR, "folderindex.db")  # folder-wide search (SQLite FTS5)
+SHEET_REGIONS_FILE = os.path.join(USER_DATA_DIR, "sheet_regions.json")  # title-block fields for the sheet index
+
+# Memory
+MEMORY_BUDGET_MB = 1024  # whole editor (all windows), e.g. per user on a terminal server
+THUMB_CACHE_MB = 512  # rendered thumbnails kept on disk between sessions
+
+# Network shares: files at least this large are copied locally before opening
+LOCAL_COPY_MIN_MB = 64
+
 # UI Settings
 THEME_NAME = "flatly"  # readable, modern, professional
 FONT_FAMILY = "맑은 고딕"
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import threading
+import time
+import fitz  # PyMuPDF
+from core.save_profiles import make_temp_path, fsync_file, write_profile
+from core.local_copy import publish_file
+from core.workers import get_process_pool
+from core.virtual_document import build_from_plan
+
+
+def save_snapshot_worker(snapshot_path, target_path, profile, publish_to=None):
+    """Runs in a worker process: serializes a snapshot with a save profile.
+
+    Writes to a fsync'ed temporary file next to target_path and returns
+    (tmp_path, note, seconds). The caller renames it over the target.
+    With publish_to (the network original of a local copy) the finished file
+    is also copied there atomically before returning.
+    """
+    t0 = time.perf_counter()
+    with fitz.open(snapshot_path) as doc:
+        return _write_target(doc, target_path, profile, publish_to, t0)
+
+
+def save_plan_worker(plan, target_path, profile, publish_to=None):
+    """Runs in a worker process: builds a reference-assembled document from its
+    plan (core.virtual_document) and saves it like save_snapshot_worker."""
+    t0 = time.perf_counter()
+    with build_from_plan(plan) as doc:
+        return _write_target(doc, target_path, profile, publish_to, t0)
+
+
+def _write_target(doc, target_path, profile, publish_to, t0):
+    tmp_path = make_temp_path(target_path)
+    try:
+        note = write_profile(doc, tmp_path, profile)
+        fsync_file(tmp_path)
+        if publish_to:
+            t1 = time.perf_counter()
+            publish_file(tmp_path, publish_to)
+            note = f"{note} published to share in {time.perf_counter() - t1:.1f}s".strip()
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path, note, time.perf_counter() - t0
+
+
+class BackgroundSave:
+    """One save in progress: snapshot on the caller's thread, serialization in a worker process.
+
+    The snapshot is a cheap uncompressed in-memory copy of the document, so the
+    user can keep browsing and editing the live document while the expensive
+    profile (garbage collection, compression, font subsetting) runs elsewhere.
+    A reference-assembled document is not built here at all: the worker gets
+    its save plan (source files and page runs) and builds the PDF itself.
+    """
+
+    def __init__(self, doc, target_path, profile, serial, write_path=None):
+        self.target_path = target_path
+        # Local copy of a network target_path: written here, then published to target_path
+        self.write_path = write_path or target_path
+        self.profile = profile
+        self.serial = serial # engine change serial at snapshot time
+        self.started = time.perf_counter()
+        self.result = None # (tmp_path, note, seconds) when done
+        self.error = None
+        self._done = threading.Event()
+
+        t0 = time.perf_counter()
+        self._snapshot = None
+        self._plan = None
+        if hasattr(doc, 'save_plan'):
+            self._plan = doc.save_plan()
+        else:
+            self._snapshot = doc.tobytes(garbage=0, deflate=False)
+        self.snapshot_seconds = time.perf_counter() - t0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        snapshot_path = None
+        publish_to = self.target_path if self.write_path != self.target_path else None
+        try:
+            if self._plan is not None:
+                future = get_process_pool("save", max_workers=1).submit(
+                    save_plan_worker, self._plan, self.write_path, self.profile, publish_to)
+                self._plan = None
+                self.result = future.result()
+                return
+            # Snapshot goes to the local temp dir, even when the target is on a share
+            fd, snapshot_path = tempfile.mkstemp(prefix="kunhwa_snapshot_", suffix=".pdf")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._snapshot)
+            self._snapshot = None # release memory as soon as it is on disk
+            future = get_process_pool("save", max_workers=1).submit(
+                save_snapshot_worker, snapshot_path, self.write_path, self.profile, publish_to)
+            self.result = future.result()
+        except Exception as e:
+            self.error = e
+        finally:
+            if snapshot_path and os.path.exists(snapshot_path):
+                try:
+                    os.remove(snapshot_path)
+                except OSError:
+                    pass
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
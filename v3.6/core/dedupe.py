@@ -0,0 +1,164 @@
+import hashlib
+import re
+import time
+import zlib
+
+# Object references inside a PDF object definition, e.g. "12 0 R"
+_REF_RE = re.compile(r"\b(\d+) 0 R\b")
+_LENGTH_RE = re.compile(r"/Length\s*\d+(\s+0\s+R)?")
+# Objects whose identity matters (page tree, annotations, form fields) are never merged.
+# Annotations need not say /Type /Annot (PyMuPDF's links do not), so their subtypes are listed too;
+# dedupe_objects also skips everything a page's /Annots array points to.
+_IDENTITY_RE = re.compile(r"/Type\s*/(Page|Pages|Catalog|Annot|Outlines|Sig)\b|/Parent\b|/FT\b|/P\s*\d+ 0 R"
+                          r"|/Subtype\s*/(Link|Widget|Text|FreeText|Line|Square|Circle|Polygon|PolyLine|Highlight"
+                          r"|Underline|Squiggly|StrikeOut|Stamp|Caret|Ink|Popup|FileAttachment|Sound|Movie|Screen"
+                          r"|PrinterMark|TrapNet|Watermark|3D|Redact|RichMedia)\b")
+
+MAX_PASSES = 5
+
+
+def _remap(text, mapping):
+    return _REF_RE.sub(lambda m: f"{mapping.get(int(m.group(1)), int(m.group(1)))} 0 R", text)
+
+
+def page_annotations(doc):
+    """{page number: [annotation xrefs]} from each page's /Annots array (and the array object, if separate)."""
+    annots = {}
+    for pno in range(len(doc)):
+        page_xref = doc.page_xref(pno)
+        kind, value = doc.xref_get_key(page_xref, "Annots")
+        if kind == "xref":
+            array_xref = int(value.split()[0])
+            value = doc.xref_object(array_xref, compressed=True)
+            annots[pno] = [array_xref]
+        elif kind == "array":
+            annots[pno] = []
+        else:
+            continue
+        annots[pno] += [int(x) for x in _REF_RE.findall(value)]
+    return annots
+
+
+def shared_annotations(doc):
+    """Annotation xrefs that appear on more than one page (must be empty: an annotation belongs to one page)."""
+    owner = {}
+    shared = set()
+    for pno, xrefs in page_annotations(doc).items():
+        for xref in xrefs:
+            if owner.setdefault(xref, pno) != pno:
+                shared.add(xref)
+    return shared
+
+
+def _stored_size(doc, xref, text):
+    """Bytes an object takes in a saved file. Streams without a filter are counted
+    compressed, since saving deflates them."""
+    size = len(text)
+    if doc.xref_is_stream(xref):
+        raw = doc.xref_stream_raw(xref)
+        if doc.xref_get_key(xref, "Filter")[0] == "null":
+            size += len(zlib.compress(raw, 1))
+        else:
+            size += len(raw)
+    return size
+
+
+def _candidate_key(doc, xref, text):
+    """Cheap first-level key; streams are only hashed when this collides."""
+    if doc.xref_is_stream(xref):
+        kind, value = doc.xref_get_key(xref, "Length")
+        return ("stream", _LENGTH_RE.sub("", text), value)
+    return ("object", text)
+
+
+def dedupe_objects(doc, progress_callback=None, first_xref=1):
+    """Collapses identical streams (fonts, images, form XObjects) and the dictionaries that use them.
+
+    Each pass groups objects by their definition (with references already
+    redirected to the surviving copy); streams that collide are confirmed by
+    hashing their raw bytes. References are then rewritten to the first copy
+    and the duplicates are replaced by null, so they cost nothing on save.
+    Repeats until no more duplicates appear (a font dict only becomes
+    identical once its font file was merged).
+
+    With first_xref, only objects from that number on are looked at (the
+    ones a merge just appended); older objects are neither read nor changed.
+
+    Returns a report dict: {'duplicates', 'bytes_saved', 'passes', 'seconds'}.
+    """
+    t0 = time.perf_counter()
+    report = {'duplicates': 0, 'bytes_saved': 0, 'passes': 0, 'seconds': 0.0}
+
+    protected = {int(x) for x in _REF_RE.findall(doc.pdf_trailer(compressed=True))}
+    for xrefs in page_annotations(doc).values():
+        protected.update(xrefs)
+    removed = set()
+
+    for n in range(MAX_PASSES):
+        report['passes'] = n + 1
+        if progress_callback:
+            progress_callback(n + 1, MAX_PASSES, "중복 리소스 검사 중...")
+
+        groups = {}
+        texts = {}
+        for xref in range(first_xref, doc.xref_length()):
+            if xref in removed or xref in protected:
+                continue
+            try:
+                text = doc.xref_object(xref, compressed=True)
+            except Exception:
+                continue
+            if text == "null" or _IDENTITY_RE.search(text):
+                continue
+            texts[xref] = text
+            groups.setdefault(_candidate_key(doc, xref, text), []).append(xref)
+
+        mapping = {}
+        for key, xrefs in groups.items():
+            if len(xrefs) < 2:
+                continue
+            if key[0] == "stream":
+                by_hash = {}
+                for xref in xrefs:
+                    digest = hashlib.sha1(doc.xref_stream_raw(xref)).digest()
+                    by_hash.setdefault(digest, []).append(xref)
+                buckets = by_hash.values()
+            else:
+                buckets = [xrefs]
+            for bucket in buckets:
+                keep = bucket[0]
+                for dup in bucket[1:]:
+                    mapping[dup] = keep
+
+        if not mapping:
+            break
+
+        # Count what the duplicates cost before removing them
+        for dup in mapping:
+            report['bytes_saved'] += _stored_size(doc, dup, texts[dup])
+
+        # Point every remaining object at the surviving copy
+        for xref, text in texts.items():
+            if xref in mapping:
+                continue
+            new_text = _remap(text, mapping)
+            if new_text != text:
+                doc.update_object(xref, new_text)
+        for xref in range(first_xref, doc.xref_length()):
+            if xref not in texts and xref not in removed and xref not in mapping:
+                # Objects skipped above (pages, annotations) still reference resources
+                try:
+                    text = doc.xref_object(xref, compressed=True)
+                except Exception:
+                    continue
+                new_text = _remap(text, mapping)
+                if new_text != text:
+                    doc.update_object(xref, new_text)
+
+        for dup in mapping:
+            doc.update_object(dup, "null")
+            removed.add(dup)
+        report['duplicates'] += len(mapping)
+
+    report['seconds'] = time.perf_counter() - t0
+    return report
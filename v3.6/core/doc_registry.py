@@ -0,0 +1,120 @@
+import hashlib
+import os
+from collections import OrderedDict
+import fitz  # PyMuPDF
+from core.memory_budget import MemoryBudget, PRIORITY_RENDER_CACHE
+from core.render_profiles import RENDER_DEFAULT
+
+# Rendered pages kept for windows that show the same unedited file
+RENDER_CACHE_BUDGET = 64 * 1024 * 1024
+# Bytes hashed at each end of the file for the identity key (hashing 400 MB would defeat the purpose)
+KEY_SAMPLE_BYTES = 64 * 1024
+
+
+def document_key(path):
+    """Identity of a file on disk: (path, size, mtime, hash of head and tail)."""
+    st = os.stat(path)
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read(KEY_SAMPLE_BYTES))
+        if st.st_size > KEY_SAMPLE_BYTES:
+            f.seek(max(KEY_SAMPLE_BYTES, st.st_size - KEY_SAMPLE_BYTES))
+            digest.update(f.read())
+    return (os.path.normcase(os.path.abspath(path)), st.st_size, st.st_mtime_ns, digest.hexdigest())
+
+
+class DocumentRegistry:
+    """Process-wide registry of opened files, shared by all windows.
+
+    Windows that open the same unchanged file get the same parsed document
+    and share rendered pages. A window that edits calls detach() first
+    (copy-on-write) and gets a document of its own.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(DocumentRegistry, cls).__new__(cls)
+            cls._instance.entries = {} # key -> {'doc', 'users', 'path'}
+            cls._instance.renders = OrderedDict() # (key, pno, scale, profile) -> PIL Image, LRU order
+            cls._instance.render_bytes = 0
+            cls._instance.render_budget = RENDER_CACHE_BUDGET
+            MemoryBudget().register("렌더 캐시 (공유)", None, lambda: cls._instance.render_bytes,
+                                    cls._instance.evict_renders, PRIORITY_RENDER_CACHE)
+        return cls._instance
+
+    def acquire(self, path):
+        """Returns (key, doc) for path, opening it only if no window has it open yet."""
+        key = document_key(path)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = {'doc': fitz.open(path), 'users': 0, 'path': path}
+            self.entries[key] = entry
+        entry['users'] += 1
+        return key, entry['doc']
+
+    def release(self, key):
+        """Drops one user; the document is closed when the last one lets go."""
+        entry = self.entries.get(key)
+        if not entry:
+            return
+        entry['users'] -= 1
+        if entry['users'] <= 0:
+            del self.entries[key]
+            self._drop_renders(key)
+            entry['doc'].close()
+
+    def detach(self, key):
+        """Copy-on-write: returns a document the caller may edit.
+
+        The last user simply takes over the shared document; otherwise the
+        file is opened again (MuPDF parses lazily, so this is cheap compared
+        to copying the document).
+        """
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+        if entry['users'] <= 1:
+            del self.entries[key]
+            self._drop_renders(key)
+            return entry['doc']
+        entry['users'] -= 1
+        return fitz.open(entry['path'])
+
+    def cached_render(self, key, pno, scale, profile=RENDER_DEFAULT):
+        img = self.renders.get((key, pno, scale, profile))
+        if img is not None:
+            self.renders.move_to_end((key, pno, scale, profile))
+        return img
+
+    def store_render(self, key, pno, scale, img, profile=RENDER_DEFAULT):
+        size = img.width * img.height * len(img.getbands())
+        if key not in self.entries or size > self.render_budget // 4:
+            return
+        self.renders[(key, pno, scale, profile)] = img
+        self.render_bytes += size
+        if self.render_bytes > self.render_budget:
+            self.evict_renders(self.render_bytes - self.render_budget)
+
+    def evict_renders(self, needed):
+        """Drops least recently used renders. Returns the bytes freed."""
+        freed = 0
+        while freed < needed and self.renders:
+            _, old = self.renders.popitem(last=False)
+            size = old.width * old.height * len(old.getbands())
+            self.render_bytes -= size
+            freed += size
+        return freed
+
+    def _drop_renders(self, key):
+        for cache_key in [k for k in self.renders if k[0] == key]:
+            img = self.renders.pop(cache_key)
+            self.render_bytes -= img.width * img.height * len(img.getbands())
+
+    def report(self):
+        """{'documents': [{'path', 'users'}], 'render_bytes', 'renders'}"""
+        return {
+            'documents': [{'path': e['path'], 'users': e['users']} for e in self.entries.values()],
+            'render_bytes': self.render_bytes,
+            'renders': len(self.renders),
+        }
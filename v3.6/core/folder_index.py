@@ -0,0 +1,231 @@
+import hashlib
+import os
+import sqlite3
+import time
+import fitz  # PyMuPDF
+from config.settings import FOLDER_INDEX_FILE
+from core.workers import get_process_pool, default_worker_count
+
+# Files in flight per worker: enough to keep the pool busy, few enough to stop quickly
+IN_FLIGHT_PER_WORKER = 2
+# Results written per transaction
+COMMIT_EVERY = 20
+HASH_BLOCK = 1024 * 1024
+# Page rows are numbered content id << PAGE_BITS | page number, so a content's pages are one rowid range
+PAGE_BITS = 20
+
+# files: path -> content (sha1), contents: one row per distinct file content, pages: the text of each page.
+# '-', '.', '/' and '_' are part of a word, so "PC-12" and "A-101.2" are searched as they are written
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    content INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS files_content ON files(content);
+CREATE TABLE IF NOT EXISTS contents (
+    id INTEGER PRIMARY KEY,
+    hash TEXT UNIQUE,
+    page_count INTEGER
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    text,
+    tokenize = "unicode61 tokenchars '-./_'"
+);
+"""
+
+
+def file_hash(path):
+    """sha1 of the whole file (copies of a file in several folders are indexed once)."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(HASH_BLOCK)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_file(path):
+    """Runs in a worker process: (path, hash, [page texts], error)."""
+    try:
+        digest = file_hash(path)
+        with fitz.open(path) as doc:
+            if doc.needs_pass:
+                return path, digest, [], "암호화된 파일"
+            return path, digest, [page.get_text("text") for page in doc], None
+    except Exception as e:
+        return path, None, [], str(e)
+
+
+def walk_pdfs(folder):
+    """PDF files under folder (recursively), with os.stat results."""
+    for root, dirs, names in os.walk(folder):
+        for name in names:
+            if name.lower().endswith(".pdf") and not name.startswith("~$"):
+                path = os.path.join(root, name)
+                try:
+                    yield os.path.normcase(os.path.abspath(path)), os.stat(path)
+                except OSError:
+                    continue
+
+
+def fts_query(text):
+    """FTS5 query for the words of text: all words, each matched as a prefix."""
+    terms = [w.replace('"', '""') for w in text.split()]
+    return " ".join(f'"{t}"*' for t in terms if t)
+
+
+class FolderIndex:
+    """Persistent full-text index of the PDFs in folders (SQLite FTS5).
+
+    Page text is stored once per file content (sha1) and page number; the
+    files table maps paths to contents. Files whose size and mtime are
+    unchanged since the last run are not read again, changed and new files
+    are extracted by the 'text' worker pool, and files that are gone are
+    dropped. Results are written in small transactions as they arrive, so
+    an interrupted run keeps what it finished.
+    """
+
+    def __init__(self, db_path=FOLDER_INDEX_FILE):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.folder = None
+        self.todo = []
+        self._futures = []
+        self._uncommitted = 0
+        self.report = {}
+
+    def close(self):
+        self.cancel()
+        self.db.close()
+
+    # --- indexing ---
+
+    def start(self, folder):
+        """Compares folder with the index and queues the new and changed files. Returns the report dict:
+        {'files', 'unchanged', 'todo', 'done', 'pages', 'removed', 'errors', 'seconds'}."""
+        self.cancel()
+        t0 = time.perf_counter()
+        self.folder = os.path.normcase(os.path.abspath(folder))
+        known = {path: (size, mtime) for path, size, mtime in
+                 self.db.execute("SELECT path, size, mtime_ns FROM files WHERE path LIKE ? ESCAPE '\\'",
+                                 (self._prefix(),))}
+        seen = set()
+        self.todo = []
+        for path, st in walk_pdfs(self.folder):
+            seen.add(path)
+            if known.get(path) != (st.st_size, st.st_mtime_ns):
+                self.todo.append((path, st.st_size, st.st_mtime_ns))
+        removed = [p for p in known if p not in seen]
+        with self.db:
+            self.db.executemany("DELETE FROM files WHERE path = ?", ((p,) for p in removed))
+            self._drop_orphans()
+        self.todo.reverse() # pop() from the end keeps folder order
+        self.report = {'files': len(seen), 'unchanged': len(seen) - len(self.todo), 'todo': len(self.todo),
+                       'done': 0, 'pages': 0, 'removed': len(removed), 'errors': [], 'seconds': 0.0}
+        self._started = t0
+        return self.report
+
+    def pump(self):
+        """Collects finished files and keeps the pool fed. Called from the UI loop; True while work remains."""
+        pool = get_process_pool("text")
+        running = []
+        for future in self._futures:
+            if future.done():
+                if not future.cancelled():
+                    self._store(future.stat, *future.result())
+            else:
+                running.append(future)
+        self._futures = running
+        limit = default_worker_count() * IN_FLIGHT_PER_WORKER
+        while self.todo and len(self._futures) < limit:
+            path, size, mtime = self.todo.pop()
+            future = pool.submit(extract_file, path)
+            future.stat = (size, mtime) # as scanned: a file changed meanwhile is indexed again next time
+            self._futures.append(future)
+        busy = bool(self.todo or self._futures)
+        if not busy or self._uncommitted >= COMMIT_EVERY:
+            self.db.commit()
+            self._uncommitted = 0
+        if not busy and self._started is not None:
+            self.report['seconds'] = time.perf_counter() - self._started
+            self._started = None
+            r = self.report
+            print(f"[timing] folder index: {r['files']} files ({r['done']} indexed, {r['unchanged']} unchanged), "
+                  f"{r['pages']} pages, {r['seconds']:.2f}s")
+        return busy
+
+    def cancel(self):
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        self.todo = []
+        self._started = None
+        if self.db.in_transaction:
+            self.db.commit()
+
+    def _store(self, stat, path, digest, texts, error):
+        self.report['done'] += 1
+        content = None
+        if error:
+            self.report['errors'].append((path, error))
+        else:
+            row = self.db.execute("SELECT id FROM contents WHERE hash = ?", (digest,)).fetchone()
+            if row:
+                content = row[0] # same content already indexed under another path
+            else:
+                content = self.db.execute("INSERT INTO contents (hash, page_count) VALUES (?, ?)",
+                                          (digest, len(texts))).lastrowid
+                self.db.executemany("INSERT INTO pages (rowid, text) VALUES (?, ?)",
+                                    (((content << PAGE_BITS) | pno, text) for pno, text in enumerate(texts)))
+                self.report['pages'] += len(texts)
+        old = self.db.execute("SELECT content FROM files WHERE path = ?", (path,)).fetchone()
+        self.db.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns, content, error) VALUES (?, ?, ?, ?, ?)",
+                        (path, stat[0], stat[1], content, error))
+        if old and old[0] is not None and old[0] != content:
+            self._drop_orphans([old[0]])
+        self._uncommitted += 1
+
+    def _drop_orphans(self, candidates=None):
+        """Deletes the contents (and page text) no file refers to any more."""
+        if candidates is None:
+            candidates = [row[0] for row in self.db.execute(
+                "SELECT id FROM contents WHERE id NOT IN (SELECT content FROM files WHERE content IS NOT NULL)")]
+        for content in candidates:
+            if self.db.execute("SELECT 1 FROM files WHERE content = ? LIMIT 1", (content,)).fetchone():
+                continue
+            self.db.execute("DELETE FROM contents WHERE id = ?", (content,))
+            self.db.execute("DELETE FROM pages WHERE rowid >= ? AND rowid < ?",
+                            (content << PAGE_BITS, (content + 1) << PAGE_BITS))
+
+    def _prefix(self):
+        folder = self.folder.rstrip(os.sep) + os.sep
+        return folder.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+    # --- queries ---
+
+    def search(self, text, limit=500):
+        """Pages under the current folder containing every word of text (prefix match), best first.
+
+        Returns [(path, page index, snippet)]; the snippet marks matches with [ ].
+        """
+        query = fts_query(text)
+        if not query or not self.folder:
+            return []
+        try:
+            rows = self.db.execute(
+                "SELECT files.path, pages.rowid, snippet(pages, 0, '[', ']', '…', 10) "
+                "FROM pages JOIN files ON files.content = (pages.rowid >> ?) "
+                "WHERE pages MATCH ? AND files.path LIKE ? ESCAPE '\\' "
+                "ORDER BY rank LIMIT ?", (PAGE_BITS, query, self._prefix(), limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"Folder search failed: {e}")
+            return []
+        mask = (1 << PAGE_BITS) - 1
+        return [(path, rowid & mask, " ".join(snippet.split())) for path, rowid, snippet in rows]
@@ -0,0 +1,189 @@
+import io
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+import fitz  # PyMuPDF
+from PIL import Image
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.gif')
+
+# Image pages keep the image's aspect ratio and fit inside A4 (as the v3.3 editor did)
+A4_WIDTH = 595.276
+A4_HEIGHT = 841.890
+
+# Files read ahead of the page builder; bounds memory for hundreds of scans
+READ_AHEAD = 16
+READ_THREADS = 8
+
+# EXIF orientation -> page /Rotate, so camera JPEGs are shown upright without re-encoding
+EXIF_ORIENTATION = 0x0112
+EXIF_ROTATION = {3: 180, 6: 90, 8: 270}
+
+
+def is_image_file(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def page_size_for(width, height):
+    """Page size in points for an image of width x height (any unit): the largest fit into A4."""
+    if width / height > A4_WIDTH / A4_HEIGHT:
+        return A4_WIDTH, A4_WIDTH * height / width
+    return A4_HEIGHT * width / height, A4_HEIGHT
+
+
+def read_image(path):
+    """Reads one file and its image header (no pixel decode). Runs on a reader thread.
+
+    Returns {'path', 'data', 'format', 'size', 'frames', 'rotation', 'error'}.
+    """
+    item = {'path': path, 'data': None, 'format': None, 'size': None, 'frames': 1, 'rotation': 0, 'error': None}
+    try:
+        with open(path, "rb") as f:
+            item['data'] = f.read()
+        # PIL parses only the header here; pixels are never decoded
+        with Image.open(io.BytesIO(item['data'])) as img:
+            item['format'] = img.format
+            item['size'] = img.size
+            item['frames'] = getattr(img, 'n_frames', 1)
+            if img.format == "JPEG":
+                item['rotation'] = EXIF_ROTATION.get(img.getexif().get(EXIF_ORIENTATION), 0)
+    except Image.UnidentifiedImageError:
+        item['data'] = None
+        item['error'] = "지원하지 않는 이미지 형식"
+    except Exception as e:
+        item['data'] = None
+        item['error'] = f"이미지를 읽을 수 없음 ({e})"
+    return item
+
+
+def _read_ahead(paths, depth=READ_AHEAD, threads=READ_THREADS):
+    """Yields read_image() results in order while up to depth files are read in parallel."""
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = []
+        for path in paths:
+            pending.append(pool.submit(read_image, path))
+            if len(pending) >= depth:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# PNG color type -> (components, PDF color space); types with an alpha channel cannot be passed through
+PNG_COLOR_TYPES = {0: (1, "/DeviceGray"), 2: (3, "/DeviceRGB"), 3: (1, None)}
+
+
+def _png_image_xref(doc, data):
+    """Adds a PNG as an image XObject whose stream is the file's IDAT data, undecoded.
+
+    PNG rows are Flate data with a per-row predictor, which is what PDF's
+    /FlateDecode with /Predictor 15 reads. Returns the xref, or None when the
+    file needs decoding (alpha channel, tRNS transparency, interlacing).
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    header = None
+    palette = None
+    idat = []
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif kind == b"PLTE":
+            palette = chunk
+        elif kind == b"IDAT":
+            idat.append(chunk)
+        elif kind == b"tRNS":
+            return None
+        elif kind == b"IEND":
+            break
+    if not header or not idat:
+        return None
+    width, height, bits, color_type, compression, filter_method, interlace = header
+    if color_type not in PNG_COLOR_TYPES or compression or filter_method or interlace:
+        return None
+    colors, colorspace = PNG_COLOR_TYPES[color_type]
+    if color_type == 3:
+        if not palette:
+            return None
+        colorspace = f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]"
+    xref = doc.get_new_xref()
+    doc.update_object(xref, f"<</Type/XObject/Subtype/Image/Width {width}/Height {height}"
+                            f"/ColorSpace {colorspace}/BitsPerComponent {bits}>>")
+    doc.update_stream(xref, b"".join(idat), compress=False)
+    # update_stream leaves an uncompressed stream; the PNG data is declared afterwards
+    doc.xref_set_key(xref, "Filter", "/FlateDecode")
+    doc.xref_set_key(xref, "DecodeParms", f"<</Predictor 15/Colors {colors}/BitsPerComponent {bits}/Columns {width}>>")
+    return xref
+
+
+def _add_image_page(doc, item):
+    """One page holding the file's stream as it is where PDF can use it: JPEG stays DCT, and
+    opaque, non-interlaced PNGs keep their Flate data. Other images are decoded by MuPDF.
+    Returns (pages, passed through)."""
+    width, height = item['size']
+    rotation = item['rotation']
+    if rotation in (90, 270):
+        width, height = height, width
+    page_w, page_h = page_size_for(width, height)
+    if rotation in (90, 270):
+        page_w, page_h = page_h, page_w # the unrotated page holds the stored image
+    page = doc.new_page(width=page_w, height=page_h)
+    xref = _png_image_xref(doc, item['data']) if item['format'] == "PNG" else None
+    if xref:
+        page.insert_image(page.rect, xref=xref, keep_proportion=False)
+    else:
+        page.insert_image(page.rect, stream=item['data'], keep_proportion=False)
+    if rotation:
+        page.set_rotation(rotation)
+    return 1, bool(xref) or item['format'] == "JPEG"
+
+
+def _add_frames(doc, item):
+    """Multi-page TIFF (or animated GIF): MuPDF converts the frames, each becomes an A4-fitted page."""
+    ext = os.path.splitext(item['path'])[1].lstrip(".").lower()
+    with fitz.open(stream=item['data'], filetype=ext) as frames:
+        with fitz.open("pdf", frames.convert_to_pdf()) as converted:
+            for pno, src_page in enumerate(converted):
+                page_w, page_h = page_size_for(src_page.rect.width, src_page.rect.height)
+                page = doc.new_page(width=page_w, height=page_h)
+                page.show_pdf_page(page.rect, converted, pno)
+            return len(converted)
+
+
+def build_image_document(paths, progress_callback=None):
+    """Builds one PDF with a page per image (per frame for multi-page TIFF).
+
+    Files are read and their headers parsed on reader threads; MuPDF only runs
+    on the caller's thread. The result is grafted into the open document in
+    one insert, so the page tree and the UI are updated once for the batch.
+    progress_callback(done, total, name). Returns (doc, report).
+    """
+    t0 = time.perf_counter()
+    report = {'added': [], 'skipped': [], 'pages': 0, 'passthrough': 0, 'seconds': 0.0}
+    doc = fitz.open()
+    for done, item in enumerate(_read_ahead(paths), 1):
+        if progress_callback:
+            progress_callback(done, len(paths), os.path.basename(item['path']))
+        if item['error']:
+            report['skipped'].append((item['path'], item['error']))
+            continue
+        try:
+            if item['frames'] > 1:
+                pages = _add_frames(doc, item)
+            else:
+                pages, passthrough = _add_image_page(doc, item)
+                report['passthrough'] += passthrough
+        except Exception as e:
+            report['skipped'].append((item['path'], f"삽입 실패 ({e})"))
+            continue
+        finally:
+            item['data'] = None
+        report['added'].append(item['path'])
+        report['pages'] += pages
+    report['seconds'] = time.perf_counter() - t0
+    return doc, report
@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+import uuid
+from config.settings import LOCAL_COPY_DIR
+from core.save_profiles import make_temp_path, fsync_file
+
+IO_AUTO = "auto"             # local copy for large files on network drives
+IO_LOCAL_COPY = "local_copy" # always work on a local copy
+IO_DIRECT = "direct"         # MuPDF reads the file where it is
+
+IO_LABELS = {
+    IO_AUTO: "자동 (네트워크의 큰 파일은 로컬 복사)",
+    IO_LOCAL_COPY: "항상 로컬 복사",
+    IO_DIRECT: "직접 열기",
+}
+
+# Sequential reads/writes in large blocks: one SMB round trip per 8 MB instead of
+# the many small random reads MuPDF does while parsing and rendering
+COPY_BLOCK = 8 * 1024 * 1024
+# Local copies not touched for this long are left over from a crash
+STALE_SECONDS = 2 * 24 * 3600
+
+NETWORK_FILESYSTEMS = {"cifs", "smb3", "smbfs", "nfs", "nfs4", "afs", "fuse.sshfs", "9p"}
+DRIVE_REMOTE = 4
+
+
+def is_network_path(path):
+    """True if path is on a network drive (UNC path, mapped drive, or a network mount)."""
+    path = os.path.abspath(path)
+    if sys.platform == "win32":
+        if path.startswith("\\\\"):
+            return True
+        import ctypes
+        drive = os.path.splitdrive(path)[0] + "\\"
+        return ctypes.windll.kernel32.GetDriveTypeW(drive) == DRIVE_REMOTE
+    best, fstype = "", ""
+    try:
+        with open("/proc/mounts", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and path.startswith(parts[1]) and len(parts[1]) > len(best):
+                    best, fstype = parts[1], parts[2]
+    except OSError:
+        return False
+    return fstype in NETWORK_FILESYSTEMS
+
+
+def should_copy_local(path, mode, min_bytes):
+    if mode == IO_LOCAL_COPY:
+        return True
+    if mode != IO_AUTO:
+        return False
+    try:
+        return os.path.getsize(path) >= min_bytes and is_network_path(path)
+    except OSError:
+        return False
+
+
+def copy_file(src, dst, progress_callback=None, opener=open, block=COPY_BLOCK):
+    """Copies src to dst with large sequential reads. progress_callback(done_bytes, total_bytes).
+
+    opener opens src for reading (tools/slow_share.py passes a throttled one).
+    Returns the bytes copied.
+    """
+    total = os.path.getsize(src)
+    done = 0
+    buf = bytearray(block)
+    view = memoryview(buf)
+    with opener(src, "rb") as fin, open(dst, "wb") as fout:
+        while True:
+            n = fin.readinto(buf)
+            if not n:
+                break
+            fout.write(view[:n])
+            done += n
+            if progress_callback:
+                progress_callback(done, total)
+    return done
+
+
+class LocalCopy:
+    """A local working copy of a file on a network share.
+
+    MuPDF reads only the local file. Saves are written next to the local
+    copy and published to the share with publish(): a sequential copy to a
+    temporary file beside the original, then an atomic rename.
+    """
+
+    def __init__(self, source_path, local_path):
+        self.source_path = source_path
+        self.local_path = local_path
+        self.copy_seconds = 0.0
+        self.publish_seconds = 0.0
+
+    @classmethod
+    def create(cls, source_path, progress_callback=None, opener=open):
+        os.makedirs(LOCAL_COPY_DIR, exist_ok=True)
+        name = f"{uuid.uuid4().hex[:8]}_{os.path.basename(source_path)}"
+        local_path = os.path.join(LOCAL_COPY_DIR, name)
+        t0 = time.perf_counter()
+        try:
+            copy_file(source_path, local_path, progress_callback, opener)
+        except Exception:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+            raise
+        copy = cls(source_path, local_path)
+        copy.copy_seconds = time.perf_counter() - t0
+        return copy
+
+    def covers(self, path):
+        """True if path is the network file this is a copy of."""
+        return bool(path) and os.path.normcase(os.path.abspath(path)) == os.path.normcase(os.path.abspath(self.source_path))
+
+    def publish(self, saved_path, progress_callback=None):
+        """Copies a saved local file over the network original, atomically."""
+        t0 = time.perf_counter()
+        publish_file(saved_path, self.source_path, progress_callback)
+        self.publish_seconds = time.perf_counter() - t0
+
+    def remove(self):
+        try:
+            os.remove(self.local_path)
+        except OSError:
+            pass
+
+
+def publish_file(src, target, progress_callback=None):
+    """Replaces target with src: sequential copy to a temporary file next to target, fsync, rename."""
+    tmp_path = make_temp_path(target)
+    try:
+        copy_file(src, tmp_path, progress_callback)
+        fsync_file(tmp_path)
+        os.replace(tmp_path, target)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def cleanup_stale_copies():
+    """Removes local copies left behind by a crash (files in use stay)."""
+    if not os.path.isdir(LOCAL_COPY_DIR):
+        return
+    now = time.time()
+    for name in os.listdir(LOCAL_COPY_DIR):
+        path = os.path.join(LOCAL_COPY_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > STALE_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass
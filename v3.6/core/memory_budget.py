@@ -0,0 +1,108 @@
+import time
+import fitz  # PyMuPDF
+from config.settings import MEMORY_BUDGET_MB
+
+# Eviction order: cheapest to rebuild first
+PRIORITY_MUPDF_STORE = 10
+PRIORITY_RENDER_CACHE = 20
+PRIORITY_THUMBNAILS = 30
+PRIORITY_UNDO = 40
+PRIORITY_PREVIEW = 90 # the page on screen
+
+CHECK_INTERVAL = 1.0 # seconds between checks, however many windows ask
+
+
+def mupdf_store_size():
+    """Bytes held by MuPDF's resource store (fonts, images, display lists)."""
+    size = fitz.TOOLS.store_size
+    return size() if callable(size) else size
+
+
+def shrink_mupdf_store(needed):
+    """Frees roughly needed bytes from the MuPDF store. Returns the bytes freed."""
+    before = mupdf_store_size()
+    if not before:
+        return 0
+    percent = min(100, max(10, int(needed * 100 / before) + 1))
+    fitz.TOOLS.store_shrink(percent)
+    return before - mupdf_store_size()
+
+
+class MemoryBudget:
+    """Process-wide memory budget across windows, caches and the MuPDF store.
+
+    Every memory consumer registers a size function and, if it can give
+    memory back, an evict function (called with the bytes wanted, returns
+    the bytes freed). check() evicts by priority until the total fits the
+    budget. Consumers owned by a window are listed per window in report().
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MemoryBudget, cls).__new__(cls)
+            cls._instance.budget_bytes = MEMORY_BUDGET_MB * 1024 * 1024
+            cls._instance.consumers = []
+            cls._instance.last_check = 0.0
+            cls._instance.last_eviction = None
+            cls._instance.register("MuPDF 저장소", None, mupdf_store_size, shrink_mupdf_store, PRIORITY_MUPDF_STORE)
+        return cls._instance
+
+    def register(self, name, owner, size_fn, evict_fn=None, priority=50):
+        self.consumers.append({'name': name, 'owner': owner, 'size': size_fn, 'evict': evict_fn, 'priority': priority})
+
+    def unregister_owner(self, owner):
+        self.consumers = [c for c in self.consumers if c['owner'] is not owner]
+
+    def _sizes(self):
+        sizes = []
+        for c in self.consumers:
+            try:
+                sizes.append((c, c['size']() or 0))
+            except Exception as e:
+                print(f"Memory consumer '{c['name']}' failed: {e}")
+                sizes.append((c, 0))
+        return sizes
+
+    def total_bytes(self):
+        return sum(size for _, size in self._sizes())
+
+    def check(self, force=False):
+        """Evicts by priority while over budget. Cheap to call often (rate limited)."""
+        now = time.perf_counter()
+        if not force and now - self.last_check < CHECK_INTERVAL:
+            return
+        self.last_check = now
+
+        sizes = self._sizes()
+        over = sum(size for _, size in sizes) - self.budget_bytes
+        if over <= 0:
+            return
+        t0 = time.perf_counter()
+        freed_total = 0
+        for c, size in sorted(sizes, key=lambda item: item[0]['priority']):
+            if over <= 0:
+                break
+            if not c['evict'] or not size:
+                continue
+            try:
+                freed = c['evict'](min(over, size)) or 0
+            except Exception as e:
+                print(f"Memory eviction '{c['name']}' failed: {e}")
+                continue
+            over -= freed
+            freed_total += freed
+        self.last_eviction = {'freed': freed_total, 'still_over': max(0, over), 'seconds': time.perf_counter() - t0}
+        print(f"[timing] memory budget: freed {freed_total / 1024 / 1024:.0f} MB in "
+              f"{self.last_eviction['seconds'] * 1000:.0f} ms, still over by {max(0, over) / 1024 / 1024:.0f} MB")
+
+    def report(self):
+        """{'budget', 'total', 'owners': {owner or None: {'total', 'consumers': {name: bytes}}}}"""
+        owners = {}
+        total = 0
+        for c, size in self._sizes():
+            group = owners.setdefault(c['owner'], {'total': 0, 'consumers': {}})
+            group['total'] += size
+            group['consumers'][c['name']] = group['consumers'].get(c['name'], 0) + size
+            total += size
+        return {'budget': self.budget_bytes, 'total': total, 'owners': owners}
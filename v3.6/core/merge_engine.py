@@ -0,0 +1,248 @@
+import os
+import queue
+import threading
+import time
+import fitz  # PyMuPDF
+from core.zip_sources import is_member_path, check_member, load_member
+
+# Files up to this size are read into memory by the prefetch thread and opened from the stream.
+# Larger files are only read ahead (to warm the OS cache) and opened from disk, to bound peak memory.
+PREFETCH_MAX_BYTES = 32 * 1024 * 1024
+READ_CHUNK = 4 * 1024 * 1024
+
+# What insert_pdf copies besides the page content. Links/annotations/widgets
+# dominate graft time on heavily hyperlinked reports.
+FIDELITY_FULL = "full"
+FIDELITY_NO_LINKS = "no_links"
+FIDELITY_PAGES_ONLY = "pages_only"
+
+FIDELITY_OPTIONS = {
+    FIDELITY_FULL: {},
+    FIDELITY_NO_LINKS: {"links": False},
+    FIDELITY_PAGES_ONLY: {"links": False, "annots": False, "widgets": False},
+}
+
+FIDELITY_LABELS = {
+    FIDELITY_FULL: "전체 (링크/주석/양식 포함)",
+    FIDELITY_NO_LINKS: "링크 제외",
+    FIDELITY_PAGES_ONLY: "페이지만 (링크/주석/양식 제외)",
+}
+
+
+def fidelity_options(level):
+    """Returns the insert_pdf keyword arguments for a fidelity level."""
+    return FIDELITY_OPTIONS.get(level, FIDELITY_OPTIONS[FIDELITY_FULL])
+
+
+def check_file(path):
+    """Cheap validation that only reads the head of a file.
+
+    Returns None if the file looks like a mergeable PDF, else a reason string.
+    MuPDF still gets the final word when the file is opened. Archive
+    members (core.zip_sources) are checked inside the archive.
+    """
+    if is_member_path(path):
+        return check_member(path)
+    try:
+        size = os.path.getsize(path)
+    except OSError as e:
+        return f"읽을 수 없음 ({e.strerror})"
+    if size == 0:
+        return "빈 파일"
+
+    try:
+        with open(path, "rb") as f:
+            head = f.read(1024)
+    except OSError as e:
+        return f"읽을 수 없음 ({e.strerror})"
+
+    if b"%PDF" not in head:
+        return "PDF 파일이 아님"
+    # Encryption is left to open_source: a file with only an owner password
+    # (printing/copying restrictions) names /Encrypt too but opens without one
+    return None
+
+
+class PrefetchItem:
+    def __init__(self, path):
+        self.path = path
+        self.data = None    # bytes when the file was small enough to load
+        self.error = None
+        self.read_seconds = 0.0
+
+
+class PrefetchLoader(threading.Thread):
+    """Reads the next few files on a background thread while the current one is grafted.
+
+    Only plain file I/O happens here - MuPDF calls stay on the caller's thread.
+    The queue size bounds how many files are held in memory at once.
+    """
+
+    def __init__(self, paths, depth=2):
+        super().__init__(daemon=True)
+        self.paths = list(paths)
+        self.items = queue.Queue(maxsize=max(1, depth))
+        self._cancel = threading.Event()
+
+    def run(self):
+        for path in self.paths:
+            if self._cancel.is_set():
+                break
+            item = PrefetchItem(path)
+            t0 = time.perf_counter()
+            if is_member_path(path):
+                # ZIP members are always decompressed into memory; MuPDF opens them from the stream
+                item.data, item.error = load_member(path)
+                item.read_seconds = time.perf_counter() - t0
+                self._put(item)
+                continue
+            item.error = check_file(path)
+            if item.error is None:
+                try:
+                    if os.path.getsize(path) <= PREFETCH_MAX_BYTES:
+                        with open(path, "rb") as f:
+                            item.data = f.read()
+                    else:
+                        # Read ahead sequentially so MuPDF's random reads hit the cache
+                        with open(path, "rb") as f:
+                            while not self._cancel.is_set() and f.read(READ_CHUNK):
+                                pass
+                except OSError as e:
+                    item.error = f"읽을 수 없음 ({e.strerror})"
+            item.read_seconds = time.perf_counter() - t0
+            self._put(item)
+        self._put(None)
+
+    def _put(self, item):
+        while not self._cancel.is_set():
+            try:
+                self.items.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def cancel(self):
+        self._cancel.set()
+
+
+def open_source(item):
+    """Opens a prefetched item with MuPDF. Returns (doc, error)."""
+    try:
+        if item.data is not None:
+            src = fitz.open(stream=item.data, filetype="pdf")
+        else:
+            src = fitz.open(item.path)
+    except Exception as e:
+        return None, f"열기 실패 ({e})"
+
+    if src.needs_pass:
+        src.close()
+        return None, "암호화된 파일"
+    if src.page_count == 0:
+        src.close()
+        return None, "페이지 없음"
+    return src, None
+
+
+def preflight(paths):
+    """Checks every input up front. Returns a list of (path, reason) for files that will be skipped."""
+    problems = []
+    for path in paths:
+        reason = check_file(path)
+        if reason:
+            problems.append((path, reason))
+    return problems
+
+
+def merge_files(doc, paths, insert_at=-1, prefetch_depth=2, progress_callback=None, fidelity=FIDELITY_FULL):
+    """Grafts each file in paths into doc, in order, starting at insert_at (-1 = append).
+
+    Every source document is closed as soon as its pages are copied, and
+    broken or encrypted files are skipped and reported instead of aborting.
+    Returns a report dict.
+    """
+    t0 = time.perf_counter()
+    options = fidelity_options(fidelity)
+    report = {
+        'fidelity': fidelity,
+        'merged': [],
+        'skipped': [],
+        'pages': 0,
+        'seconds': 0.0,
+        'wait_seconds': 0.0,   # time spent waiting for the prefetch thread
+        'graft_seconds': 0.0,
+    }
+
+    loader = PrefetchLoader(paths, depth=prefetch_depth)
+    loader.start()
+    position = insert_at
+    try:
+        done = 0
+        while True:
+            t_wait = time.perf_counter()
+            item = loader.items.get()
+            report['wait_seconds'] += time.perf_counter() - t_wait
+            if item is None:
+                break
+            done += 1
+            if progress_callback:
+                progress_callback(done, len(paths), os.path.basename(item.path))
+
+            if item.error:
+                report['skipped'].append((item.path, item.error))
+                continue
+
+            src, error = open_source(item)
+            item.data = None  # release the buffer as soon as MuPDF owns the document
+            if error:
+                report['skipped'].append((item.path, error))
+                continue
+
+            t_graft = time.perf_counter()
+            try:
+                with src:
+                    pages = src.page_count
+                    doc.insert_pdf(src, start_at=position, **options)
+                report['merged'].append(item.path)
+                report['pages'] += pages
+                if position != -1:
+                    position += pages
+            except Exception as e:
+                report['skipped'].append((item.path, f"병합 실패 ({e})"))
+            report['graft_seconds'] += time.perf_counter() - t_graft
+    finally:
+        loader.cancel()
+
+    report['seconds'] = time.perf_counter() - t0
+    return report
+
+
+def insert_page_runs(doc, src, page_indices, start_at=-1, fidelity=FIDELITY_FULL):
+    """Copies page_indices (in order) from src into doc at start_at.
+
+    Consecutive pages are grafted with one insert_pdf call per run; the graft
+    map is kept until the last run, so resources the runs share are copied once.
+    Returns a timing report dict.
+    """
+    t0 = time.perf_counter()
+    options = fidelity_options(fidelity)
+    runs = []
+    for idx in page_indices:
+        if runs and idx == runs[-1][1] + 1:
+            runs[-1][1] = idx
+        else:
+            runs.append([idx, idx])
+
+    position = start_at
+    for i, (first, last) in enumerate(runs):
+        doc.insert_pdf(src, from_page=first, to_page=last, start_at=position,
+                       final=int(i == len(runs) - 1), **options)
+        if position != -1:
+            position += last - first + 1
+
+    return {
+        'fidelity': fidelity,
+        'pages': len(page_indices),
+        'calls': len(runs),
+        'seconds': time.perf_counter() - t0,
+    }
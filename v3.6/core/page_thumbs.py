@@ -0,0 +1,81 @@
+import io
+import fitz  # PyMuPDF
+from PIL import Image
+from core.render_profiles import render_page, RENDER_DRAFT
+from core.thumb_store import is_monochrome
+
+# Longest side of thumbnails written into PDFs (Acrobat writes about 100 px)
+EMBED_THUMB_PIXELS = 160
+
+
+def read_embedded_thumbnail(doc, page_xref, rotation=0):
+    """Returns the page's embedded /Thumb image as a PIL Image (turned like the page is shown), or None.
+
+    Scanner and CAD plot drivers often write these; they are decoded in a
+    fraction of the time a render takes. /Thumb images show the unrotated page.
+    """
+    kind, value = doc.xref_get_key(page_xref, "Thumb")
+    if kind != "xref":
+        return None
+    try:
+        img = _decode_thumb(doc, int(value.split()[0]))
+    except Exception as e:
+        print(f"Embedded thumbnail unreadable ({value}): {e}")
+        return None
+    if img is None:
+        return None
+    if rotation:
+        img = img.rotate(-rotation, expand=True)
+    return img
+
+
+def _decode_thumb(doc, xref):
+    # /Thumb streams need not carry /Subtype /Image, which MuPDF's image loader wants;
+    # the usual forms (8-bit gray/RGB, JPEG) are decoded directly
+    filters = doc.xref_get_key(xref, "Filter")[1]
+    if "DCTDecode" in filters:
+        return Image.open(io.BytesIO(doc.xref_stream_raw(xref))).convert("RGB")
+    colorspace = doc.xref_get_key(xref, "ColorSpace")[1]
+    bpc = doc.xref_get_key(xref, "BitsPerComponent")[1]
+    n = {"/DeviceGray": 1, "/DeviceRGB": 3}.get(colorspace)
+    if n and bpc == "8":
+        width = int(doc.xref_get_key(xref, "Width")[1])
+        height = int(doc.xref_get_key(xref, "Height")[1])
+        data = doc.xref_stream(xref)
+        if len(data) >= width * height * n:
+            return Image.frombytes("L" if n == 1 else "RGB", (width, height), data[:width * height * n])
+        return None
+    # Indexed, CMYK, ... : let MuPDF convert (needs an image dictionary)
+    pix = fitz.Pixmap(doc, xref)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    return Image.frombytes("L" if pix.n == 1 else "RGB", [pix.width, pix.height], pix.samples)
+
+
+def embed_thumbnails(doc, max_pixels=EMBED_THUMB_PIXELS, profile=RENDER_DRAFT):
+    """Renders every page and writes it as the page's /Thumb image (replacing an existing one).
+
+    Runs as part of a save (in the save worker for background saves), so the
+    next open on any workstation can show the grid without rendering.
+    Returns the number of thumbnails written.
+    """
+    written = 0
+    for page in doc:
+        r = page.rect
+        scale = max_pixels / max(r.width, r.height, 1)
+        img = render_page(page, scale, profile)
+        if page.rotation:
+            img = img.rotate(page.rotation, expand=True) # back to the unrotated page
+        if is_monochrome(img):
+            img = img.convert("L")
+        colorspace = "DeviceGray" if img.mode == "L" else "DeviceRGB"
+
+        kind, value = doc.xref_get_key(page.xref, "Thumb")
+        xref = int(value.split()[0]) if kind == "xref" else doc.get_new_xref()
+        doc.update_object(xref, f"<</Type/XObject/Subtype/Image/Width {img.width}/Height {img.height}/ColorSpace/{colorspace}/BitsPerComponent 8>>")
+        doc.update_stream(xref, img.tobytes())
+        doc.xref_set_key(page.xref, "Thumb", f"{xref} 0 R")
+        written += 1
+    return written
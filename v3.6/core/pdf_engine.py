@@ -1,54 +1,467 @@
 import fitz  # PyMuPDF
+import hashlib
 import os
-from PIL import Image
+import time
+from core.size_splitter import split_by_size, SizeSplitJob, PageSizeEstimator
+from core.merge_engine import merge_files, insert_page_runs, FIDELITY_FULL
+from core.dedupe import dedupe_objects, shared_annotations
+from core.background_save import BackgroundSave
+from core.recovery import replay_session
+from core.undo_history import UndoHistory
+from core.virtual_document import VirtualDocument, reference_files
+from core.doc_registry import DocumentRegistry, document_key
+from core.render_profiles import render_page, RENDER_DEFAULT
+from core.page_thumbs import read_embedded_thumbnail
+from core.local_copy import LocalCopy, should_copy_local, IO_AUTO
+from core.zip_sources import expand_archives, load_member, source_size
+from core.image_import import build_image_document
+from config.settings import LOCAL_COPY_MIN_MB
+from core.save_profiles import (PROFILE_AUTO, PROFILE_INCREMENTAL, PROFILE_FULL, PROFILE_LABELS,
+                                make_temp_path, fsync_file, write_profile, modifies_document)
+
+# Edits that leave the pages read from the file untouched (thumbnail cache keys stay valid)
+THUMB_CACHE_SAFE_CHANGES = {'rotate', 'delete', 'move', 'reorder', 'blank', 'insert', 'paste', 'drop', 'merge', 'images', 'bookmarks'}
 
 class PDFEngine:
     def __init__(self):
         self.doc = None
         self.file_path = None
         self.clipboard_pages = [] # List of pixmaps or temp files? Keeping it simple for now
-        self.undo_stack = []
-        self.max_undo_steps = 10
+        # Undo depth follows a byte budget; older states spill to disk (see core.undo_history)
+        self.undo_stack = UndoHistory()
+        self.merge_prefetch_depth = 2
+        self.last_merge_report = None
+        self.dedupe_on_merge = True
+        self.merge_fidelity = FIDELITY_FULL
+        self.last_timing = None # {'op', 'fidelity', 'pages', 'seconds', ...} of the last graft
+        self.default_save_profile = PROFILE_AUTO
+        self.last_save_report = None
+        self.last_image_report = None
+        self.last_recovery_report = None
+        
+        # Edits since open / last save, used to decide how to save
+        self.changes = [] # [{'kind': 'rotate', 'pages': [...], 'bytes': est. appended bytes, ...}]
+        self.change_listeners = [] # callables(change_dict), e.g. recovery journal, search index
+        self.undo_extras = {} # name -> callable() whose value is kept with each undo state (search index pages)
+        self.undone_extras = {} # those values for the state restored by the last undo
+        self.memory_backed = False # True after undo reopened the document from bytes
+        self.change_serial = 0 # bumped on every edit; lets a background save detect later edits
+        self.background_save = None # BackgroundSave in progress
+        self.size_split = None # SizeSplitJob in progress
+        # An incremental save is not worth it when it would append more than this fraction of the file
+        self.incremental_max_ratio = 0.5
+        # New documents are assembled by page reference (see core.virtual_document)
+        self.virtual_mode = False
+        # Set while self.doc is the read-only copy shared with other windows (core.doc_registry)
+        self.shared_key = None
+        # Content identity of the file self.doc was read from or last saved to (thumbnail cache keys)
+        self.content_key = None
+        self.content_xrefs = 0
+        # Large files on network shares are read from a local copy (core.local_copy)
+        self.io_mode = IO_AUTO
+        self.local_copy_min_bytes = LOCAL_COPY_MIN_MB * 1024 * 1024
+        self.local_copy = None
+
+    @property
+    def is_virtual(self):
+        return isinstance(self.doc, VirtualDocument)
+
+    def _new_document(self):
+        return VirtualDocument() if self.virtual_mode else fitz.open()
+
+    def _ensure_private(self):
+        """Copy-on-write: called before any edit of a document shared with other windows."""
+        if not self.shared_key: return
+        self.doc = DocumentRegistry().detach(self.shared_key)
+        self.shared_key = None
+
+    def _close_doc(self):
+        """Closes the current document, or only lets go of it if other windows share it."""
+        if self.shared_key:
+            DocumentRegistry().release(self.shared_key)
+            self.shared_key = None
+        elif self.doc is not None:
+            self.doc.close()
+        self.doc = None
 
-    def open_pdf(self, path):
-        """Opens a PDF file."""
+    def _drop_local_copy(self):
+        if self.local_copy:
+            self.local_copy.remove()
+            self.local_copy = None
+
+    def _local_target(self, path):
+        """The local working copy if path is the network file it stands in for, else path."""
+        if self.local_copy and self.local_copy.covers(path):
+            return self.local_copy.local_path
+        return path
+
+    def materialize(self):
+        """Turns a virtual document into a real one (needed before editing page content)."""
+        if not self.is_virtual: return
+        t0 = time.perf_counter()
+        vdoc = self.doc
+        self.doc = vdoc.materialize()
+        # Undo snapshots may still restore vdoc, so it is not closed here
+        self.memory_backed = True
+        print(f"[timing] materialize: {len(self.doc)} pages, {time.perf_counter() - t0:.2f}s")
+
+    def _record_change(self, kind, bytes_estimate=0, **info):
+        """Records an edit so the save strategy (and listeners) can see what happened."""
+        change = {'kind': kind, 'bytes': bytes_estimate}
+        change.update(info)
+        self.changes.append(change)
+        self.change_serial += 1
+        self._notify(change)
+
+    def _notify(self, event):
+        """Passes an edit, or an 'opened' / 'saved' / 'closed' event, to the change listeners."""
+        for listener in list(self.change_listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Change listener failed: {e}")
+
+    def _estimate_pages_bytes(self, doc, page_indices):
+        """Rough size of the objects used by some pages (what an incremental save would append)."""
+        try:
+            estimator = PageSizeEstimator(doc)
+            objs = set()
+            for idx in page_indices:
+                objs |= estimator.page_objects(idx)
+            return sum(estimator.object_size(x) for x in objs)
+        except Exception:
+            return 0
+
+    def open_pdf(self, path, progress_callback=None, local_copy=None):
+        """Opens a PDF file.
+
+        Large files on network shares are first copied to a local working copy
+        with large sequential reads, depending on io_mode (see core.local_copy);
+        progress_callback(done_bytes, total_bytes) reports the copy. local_copy
+        is a copy the caller already made (core.staged_open). path stays the
+        save target either way.
+        """
         if not os.path.exists(path):
             raise FileNotFoundError(f"File not found: {path}")
         
         try:
-            if self.doc:
-                self.doc.close()
-            self.doc = fitz.open(path)
+            if local_copy is None and should_copy_local(path, self.io_mode, self.local_copy_min_bytes):
+                local_copy = LocalCopy.create(path, progress_callback)
+                print(f"[timing] local copy: {os.path.getsize(path) / 1024 / 1024:.1f} MB in {local_copy.copy_seconds:.2f}s")
+            self._close_doc()
+            self._drop_local_copy()
+            self.local_copy = local_copy
+            # Windows that open the same unchanged file share one parsed document
+            self.shared_key, self.doc = DocumentRegistry().acquire(local_copy.local_path if local_copy else path)
             self.file_path = path
+            self.changes = []
+            self.memory_backed = False
+            self._set_content_identity(self.shared_key)
+            self._notify({'kind': 'opened', 'path': path})
+            return True, f"Loaded {len(self.doc)} pages."
+        except Exception as e:
+            if local_copy and local_copy is not self.local_copy:
+                local_copy.remove()
+            return False, str(e)
+
+    def open_repaired(self, path, repaired_path):
+        """Opens the repaired copy of a damaged file (written by a worker, see core.staged_open).
+
+        The document is held in memory; path stays the save target, and saves
+        are full rewrites (a damaged file cannot be appended to).
+        """
+        try:
+            with open(repaired_path, "rb") as f:
+                data = f.read()
+            self._close_doc()
+            self._drop_local_copy()
+            self.doc = fitz.open(stream=data, filetype="pdf")
+            self.file_path = path
+            self.changes = []
+            self.memory_backed = True
+            self._set_content_identity(None)
+            self._notify({'kind': 'opened', 'path': path})
+            return True, f"Loaded {len(self.doc)} pages (repaired)."
+        except Exception as e:
+            return False, str(e)
+
+    def open_archive_member(self, member_path):
+        """Opens a PDF inside a ZIP archive (core.zip_sources) from memory; nothing is extracted to disk.
+
+        There is no file to save back to, so the first save asks for a path.
+        """
+        data, reason = load_member(member_path)
+        if reason:
+            return False, reason
+        try:
+            self.open_memory(data)
             return True, f"Loaded {len(self.doc)} pages."
         except Exception as e:
             return False, str(e)
 
-    def save_pdf(self, path=None):
-        """Saves the current PDF."""
+    def open_memory(self, data=None, file_path=None):
+        """Opens a document from bytes (None = new empty document) that is not backed by a file.
+
+        file_path is only remembered as the default save target.
+        """
+        self._close_doc()
+        self._drop_local_copy()
+        self.doc = fitz.open(stream=data, filetype="pdf") if data else fitz.open()
+        self.file_path = file_path
+        self.changes = []
+        self.memory_backed = data is not None
+        self._set_content_identity(None)
+        self._notify({'kind': 'opened', 'path': None})
+
+    def recover_session(self, session):
+        """Rebuilds the document of a crashed session (see core.recovery). Returns (success, message).
+
+        The replay report is kept in last_recovery_report ('partial' when some edits could not be restored).
+        """
+        success, msg, report = replay_session(self, session)
+        self.last_recovery_report = report
+        return success, msg
+
+    def save_pdf(self, path=None, profile=None):
+        """Saves the current PDF with a save profile (see core.save_profiles).
+
+        profile=None uses default_save_profile; "auto" picks the cheapest
+        profile that is valid for the document (incremental when possible).
+        Timing and size end up in last_save_report.
+        """
         if not self.doc:
             return False, "No document open."
         
         target_path = path if path else self.file_path
+        if not target_path:
+            return False, "No file path."
+        requested = profile or self.default_save_profile
+        decision = self.predict_save(target_path)
+        chosen = self.choose_save_profile(target_path, requested)
+        
+        size_before = os.path.getsize(target_path) if os.path.exists(target_path) else 0
+        t0 = time.perf_counter()
+        note = ""
         try:
-            # Incremental save if overwriting and possible, else full lossless save
-            if target_path == self.file_path:
-                try:
-                    self.doc.saveIncr() 
-                except:
-                    # Fallback to full save if incremental fails
-                    self.doc.save(target_path, deflate=True, garbage=0)
+            if chosen == PROFILE_INCREMENTAL:
+                self.doc.saveIncr()
             else:
-                # Full save, deflate for lossless compression, no garbage collection to prevent recompression
-                self.doc.save(target_path, deflate=True, garbage=0)
-            return True, "Saved successfully."
+                note = self._save_full(target_path, chosen)
         except Exception as e:
-            # If incremental save fails (e.g. major changes), try full save
+            if chosen != PROFILE_INCREMENTAL:
+                return False, str(e)
+            # Incremental refused (e.g. repaired file): fall back to a full save
             try:
-                self.doc.save(target_path, deflate=True, garbage=0)
-                return True, "Saved successfully (Full)."
+                note = f"incremental failed ({e})"
+                chosen = PROFILE_FULL
+                self._save_full(target_path, chosen)
             except Exception as e2:
                 return False, str(e2)
+        
+        size_after = os.path.getsize(target_path)
+        self.last_save_report = {
+            'requested': requested,
+            'profile': chosen,
+            'decision': decision,
+            'path': target_path,
+            'seconds': time.perf_counter() - t0,
+            'size': size_after,
+            'appended_bytes': size_after - size_before if chosen == PROFILE_INCREMENTAL else None,
+            'note': note,
+        }
+        if self._is_backed_by(target_path):
+            self.changes = []
+            self._set_content_identity(document_key(self._local_target(target_path)))
+            self._notify({'kind': 'saved', 'path': target_path, 'clean': True})
+        print(f"[timing] save: profile={chosen}, {self.last_save_report['seconds']:.2f}s, "
+              f"{self.last_save_report['size'] / 1024 / 1024:.1f} MB, decision: {decision['reason']} {note}")
+        return True, f"Saved successfully ({PROFILE_LABELS[chosen]}, {self.last_save_report['size'] / 1024 / 1024:.1f} MB, {self.last_save_report['seconds']:.1f}s)."
+
+    def _is_backed_by(self, path):
+        """True if the open document was read from path (not from memory, e.g. after undo).
+
+        A network file is backed by its local working copy.
+        """
+        if not self.doc or not self.doc.name or not path:
+            return False
+        try:
+            return os.path.samefile(self.doc.name, self._local_target(path))
+        except OSError:
+            return False
+
+    def can_save_incrementally(self, target_path):
+        """True if target_path is the file backing the open document and MuPDF allows appending."""
+        if not self._is_backed_by(target_path):
+            return False
+        return bool(self.doc.can_save_incrementally())
+
+    def predict_save(self, target_path):
+        """Predicts whether an incremental append is possible and cheaper than a full rewrite.
+
+        Returns {'incremental': bool, 'reason': str, 'append_bytes': int, 'file_bytes': int}.
+        """
+        file_bytes = os.path.getsize(target_path) if target_path and os.path.exists(target_path) else 0
+        append_bytes = sum(c.get('bytes', 0) for c in self.changes)
+        decision = {'incremental': False, 'reason': "", 'append_bytes': append_bytes, 'file_bytes': file_bytes}
+        kinds = {c['kind'] for c in self.changes}
+        
+        if self.is_virtual:
+            decision['reason'] = "virtual document (pages by reference)"
+        elif self.memory_backed:
+            decision['reason'] = "document is held in memory (undo, or edited during a background save)"
+        elif self.local_copy and self.local_copy.covers(target_path):
+            # The whole file goes back to the share anyway; rewrite and copy it in the background
+            decision['reason'] = "network file opened from a local copy"
+        elif not self.can_save_incrementally(target_path):
+            decision['reason'] = "target is not the open file or MuPDF cannot append"
+        elif 'dedupe' in kinds:
+            # Appending would keep every duplicate in the file and defeat the purpose
+            decision['reason'] = "resources were deduplicated"
+        elif file_bytes and append_bytes > file_bytes * self.incremental_max_ratio:
+            decision['reason'] = f"append (~{append_bytes // 1024} KB) would be close to a rewrite"
+        else:
+            decision['incremental'] = True
+            decision['reason'] = f"{len(self.changes)} edits, ~{append_bytes // 1024} KB to append"
+        return decision
+
+    def choose_save_profile(self, target_path, requested=PROFILE_AUTO):
+        """Returns the profile that will actually be used for a save to target_path."""
+        incremental_ok = self.predict_save(target_path)['incremental']
+        if requested == PROFILE_AUTO:
+            return PROFILE_INCREMENTAL if incremental_ok else PROFILE_FULL
+        if requested == PROFILE_INCREMENTAL and not incremental_ok:
+            return PROFILE_FULL
+        return requested
+
+    def _save_full(self, target_path, profile):
+        """Full save through a temporary file and an atomic rename.
+
+        A network file opened from a local copy is written locally, published
+        to the share (core.local_copy.publish_file), then becomes the new local copy.
+        """
+        write_path = self._local_target(target_path)
+        tmp_path = make_temp_path(write_path)
+        try:
+            own_file = self._is_backed_by(target_path) or (
+                self.file_path and os.path.abspath(target_path) == os.path.abspath(self.file_path))
+            if self.is_virtual:
+                with self.doc.materialize() as out:
+                    note = write_profile(out, tmp_path, profile)
+            elif modifies_document(profile) and not own_file:
+                # Save As: the open document stays as it is (it is not reopened from the written file)
+                with fitz.open(stream=self.doc.tobytes(garbage=0, deflate=False), filetype="pdf") as out:
+                    note = write_profile(out, tmp_path, profile)
+            else:
+                note = write_profile(self.doc, tmp_path, profile)
+            fsync_file(tmp_path)
+            if write_path != target_path:
+                self.local_copy.publish(tmp_path)
+                note = f"{note} published to share in {self.local_copy.publish_seconds:.1f}s".strip()
+            self._swap_in_saved_file(tmp_path, write_path, reopen=True)
+            return note
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _swap_in_saved_file(self, tmp_path, target_path, reopen):
+        """Renames a finished temporary file over target_path.
+
+        The open file cannot be replaced while MuPDF holds it (Windows), so the
+        document is closed first. With reopen=True the saved file becomes the
+        document again (the next save can be incremental); otherwise the live
+        document is kept in memory because it has edits the file lacks.
+        """
+        own_file = self.file_path and os.path.abspath(target_path) == os.path.abspath(self.file_path)
+        if not (self._is_backed_by(target_path) or own_file):
+            os.replace(tmp_path, target_path)
+            return
+        
+        if reopen:
+            self._close_doc()
+            os.replace(tmp_path, target_path)
+            self.doc = fitz.open(target_path)
+            self.memory_backed = False
+        else:
+            if self._is_backed_by(target_path):
+                data = self.doc.tobytes(garbage=0, deflate=False)
+                self._close_doc()
+                self.doc = fitz.open(stream=data, filetype="pdf")
+                self.memory_backed = True
+            os.replace(tmp_path, target_path)
+
+    def start_background_save(self, path=None, profile=None):
+        """Snapshots the document and serializes it in a worker process.
+
+        Returns (started, message). The caller polls background_save.done()
+        and then calls finish_background_save(). Incremental saves are cheap
+        and should use save_pdf() directly.
+        """
+        if not self.doc:
+            return False, "No document open."
+        if self.background_save:
+            return False, "Save already in progress."
+        target_path = path if path else self.file_path
+        if not target_path:
+            return False, "No file path."
+        
+        requested = profile or self.default_save_profile
+        chosen = self.choose_save_profile(target_path, requested)
+        if chosen == PROFILE_INCREMENTAL:
+            chosen = PROFILE_FULL
+        try:
+            write_path = self._local_target(target_path)
+            self.background_save = BackgroundSave(self.doc, target_path, chosen, self.change_serial,
+                                                  write_path=write_path if write_path != target_path else None)
+            self.background_save.requested = requested
+            self.background_save.decision = self.predict_save(target_path)
+            return True, f"저장 중... ({PROFILE_LABELS[chosen]})"
+        except Exception as e:
+            self.background_save = None
+            return False, str(e)
+
+    def finish_background_save(self):
+        """Completes a finished background save (atomic rename). Returns (success, message)."""
+        job = self.background_save
+        if not job or not job.done():
+            return False, "No finished save."
+        self.background_save = None
+        if job.error:
+            return False, str(job.error)
+        
+        tmp_path, note, worker_seconds = job.result
+        unchanged = job.serial == self.change_serial
+        try:
+            self._swap_in_saved_file(tmp_path, job.write_path, reopen=unchanged)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False, str(e)
+        if unchanged and self._is_backed_by(job.target_path):
+            self.changes = []
+            self._set_content_identity(document_key(job.write_path))
+            self._notify({'kind': 'saved', 'path': job.target_path, 'clean': True})
+        elif self.file_path and os.path.abspath(job.target_path) == os.path.abspath(self.file_path):
+            # The file was replaced underneath edits made during the save
+            self._notify({'kind': 'saved', 'path': job.target_path, 'clean': False})
+        
+        self.last_save_report = {
+            'requested': job.requested,
+            'profile': job.profile,
+            'decision': job.decision,
+            'path': job.target_path,
+            'seconds': time.perf_counter() - job.started,
+            'snapshot_seconds': job.snapshot_seconds, # the only part that blocked the UI
+            'worker_seconds': worker_seconds,
+            'size': os.path.getsize(job.target_path),
+            'appended_bytes': None,
+            'background': True,
+            'edited_during_save': not unchanged,
+            'note': note,
+        }
+        r = self.last_save_report
+        print(f"[timing] background save: profile={job.profile}, snapshot {r['snapshot_seconds'] * 1000:.0f} ms, "
+              f"worker {worker_seconds:.2f}s, total {r['seconds']:.2f}s, {r['size'] / 1024 / 1024:.1f} MB {note}")
+        return True, f"Saved successfully ({PROFILE_LABELS[job.profile]}, {r['size'] / 1024 / 1024:.1f} MB, {r['seconds']:.1f}s)."
 
     def save_subset(self, page_indices, path):
         """Saves specific pages to a new PDF file."""
@@ -56,15 +469,18 @@ class PDFEngine:
             return False, "No document open."
         
         try:
-            new_doc = fitz.open()
             # Sort indices to maintain order? Or follow selection order?
             # User might select 3, 1, 2. Usually we want 1, 2, 3.
             # But "Custom: 3, 1" might mean specific order.
             # Let's trust the input list order.
             
-            for idx in page_indices:
-                if 0 <= idx < len(self.doc):
-                    new_doc.insert_pdf(self.doc, from_page=idx, to_page=idx)
+            if self.is_virtual:
+                new_doc = self.doc.materialize([idx for idx in page_indices if 0 <= idx < len(self.doc)])
+            else:
+                new_doc = fitz.open()
+                for idx in page_indices:
+                    if 0 <= idx < len(self.doc):
+                        new_doc.insert_pdf(self.doc, from_page=idx, to_page=idx)
             
             new_doc.save(path, deflate=True, garbage=0)
             new_doc.close()
@@ -72,23 +488,77 @@ class PDFEngine:
         except Exception as e:
             return False, str(e)
 
+    def split_by_size(self, max_bytes, output_base, progress_callback=None):
+        """Splits the document into output_base_partNN.pdf files under max_bytes each.
+
+        Returns (success, parts or message, stats).
+        """
+        if not self.doc:
+            return False, "No document open.", None
+
+        try:
+            if self.is_virtual:
+                with self.doc.materialize() as out:
+                    parts, stats = split_by_size(out, max_bytes, output_base, progress_callback=progress_callback)
+            else:
+                parts, stats = split_by_size(self.doc, max_bytes, output_base, progress_callback=progress_callback)
+            return True, parts, stats
+        except Exception as e:
+            return False, str(e), None
+
+    def start_split_by_size(self, max_bytes, output_base):
+        """Starts split_by_size in a worker process. Returns (started, message).
+
+        The caller polls size_split.done() and then calls finish_split_by_size().
+        """
+        if not self.doc:
+            return False, "No document open."
+        if self.size_split:
+            return False, "Split already in progress."
+        source_path = None
+        if not (self.is_virtual or self.memory_backed or self.changes) and os.path.exists(self.doc.name):
+            source_path = self.doc.name
+        try:
+            self.size_split = SizeSplitJob(self.doc, max_bytes, output_base, source_path=source_path)
+            return True, "분할 지점 계산 중..."
+        except Exception as e:
+            self.size_split = None
+            return False, str(e)
+
+    def finish_split_by_size(self):
+        """Completes a finished split. Returns (success, parts or message, stats) like split_by_size()."""
+        job = self.size_split
+        if not job or not job.done():
+            return False, "No finished split.", None
+        self.size_split = None
+        if job.error:
+            return False, str(job.error), None
+        parts, stats = job.result
+        return True, parts, stats
+
     def close(self):
-        if self.doc:
-            self.doc.close()
-            self.doc = None
+        if self.doc is not None:
+            self._close_doc()
             self.file_path = None
+        self._drop_local_copy()
         self.undo_stack.clear()
+        self.changes = []
+        self.memory_backed = False
+        self._set_content_identity(None)
+        self._notify({'kind': 'closed'})
         
     def push_undo_state(self):
         """Saves the current document state to memory for undo capability."""
         if not self.doc: return
         try:
+            extras = {name: get() for name, get in self.undo_extras.items()}
+            if self.is_virtual:
+                # The page list is the whole state; no PDF has to be written
+                self.undo_stack.push((self.doc, self.doc.snapshot()), size=64 * len(self.doc), extras=extras)
+                return
             # Full lossless save to memory bytes
             state_bytes = self.doc.tobytes(deflate=True)
-            self.undo_stack.append(state_bytes)
-            # Limit stack size to prevent huge RAM usage
-            if len(self.undo_stack) > self.max_undo_steps:
-                self.undo_stack.pop(0)
+            self.undo_stack.push(state_bytes, extras=extras)
         except Exception as e:
             print(f"Failed to push undo state: {e}")
 
@@ -96,11 +566,20 @@ class PDFEngine:
         """Restores the document to the last saved state from memory."""
         if not self.undo_stack: return False
         try:
-            state_bytes = self.undo_stack.pop()
-            if self.doc:
-                self.doc.close()
+            state_bytes, self.undone_extras = self.undo_stack.pop(with_extras=True)
+            if isinstance(state_bytes, tuple):
+                vdoc, refs = state_bytes
+                if self.doc is not None and self.doc is not vdoc:
+                    self._close_doc()
+                vdoc.restore(refs)
+                self.doc = vdoc
+                self._record_change('undo')
+                return True
+            self._close_doc()
                 
-            self.doc = fitz.open("pdf", state_bytes) # Open from memory stream
+            self.doc = fitz.open(stream=state_bytes, filetype="pdf") # Open from memory stream
+            self.memory_backed = True
+            self._record_change('undo', bytes_estimate=len(state_bytes))
             return True
         except Exception as e:
             print(f"Undo failed: {e}")
@@ -109,60 +588,169 @@ class PDFEngine:
     def get_page_count(self):
         return len(self.doc) if self.doc else 0
 
-    def get_page_image(self, page_index, scale=1.0):
-        """Returns a PIL Image for a specific page."""
+    def get_page_image(self, page_index, scale=1.0, profile=RENDER_DEFAULT):
+        """Returns a PIL Image for a specific page.
+
+        profile selects the render quality (core.render_profiles); thumbnails
+        use RENDER_DRAFT, the preview and print output the default.
+        """
         if not self.doc or not (0 <= page_index < len(self.doc)):
             return None
+        # Unedited shared file: another window may already have rendered this page
+        registry = DocumentRegistry() if self.shared_key else None
+        if registry:
+            img = registry.cached_render(self.shared_key, page_index, scale, profile)
+            if img is not None:
+                return img
 
-        page = self.doc[page_index]
-        matrix = fitz.Matrix(scale, scale)
-        pix = page.get_pixmap(matrix=matrix)
-        
-        # Convert to PIL Image
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        img = render_page(self.doc[page_index], scale, profile)
+        if registry:
+            registry.store_render(self.shared_key, page_index, scale, img, profile)
         return img
 
+    def embedded_thumbnail(self, page_index):
+        """The page's embedded /Thumb image (PIL, as the page is shown) or None (see core.page_thumbs)."""
+        if not self.doc or not (0 <= page_index < len(self.doc)):
+            return None
+        page = self.doc[page_index]
+        if self.is_virtual:
+            # Thumbnails belong to the source page; the ref carries the rotation shown
+            return read_embedded_thumbnail(page.ref.source.doc, page._page.xref, page.rotation)
+        return read_embedded_thumbnail(self.doc, page.xref, page.rotation)
+
+    def page_pixel_size(self, page_index, scale=1.0):
+        """(width, height) that get_page_image returns at scale, without rendering."""
+        r = (self.doc[page_index].rect * fitz.Matrix(scale, scale)).irect
+        return r.width, r.height
+
+    def _set_content_identity(self, key):
+        """key: document_key() of the file self.doc now matches, or None."""
+        if key and self.doc is not None and not self.is_virtual:
+            self.content_key = f"{key[1]}-{key[3]}" # size and content hash; not path or mtime, so copies hit
+            self.content_xrefs = self.doc.xref_length()
+        else:
+            self.content_key = None
+            self.content_xrefs = 0
+
+    def thumbnail_key(self, page_index):
+        """Identity of a page's appearance for the persistent thumbnail cache, or None.
+
+        A page read from a known file is identified by the file content and
+        the page object (which holds /Rotate, the box and the content and
+        resource references), so it survives moves, deletes and rotations of
+        other pages. Edits that may change content or resources in place make
+        every page unknown until the next save.
+        """
+        if not self.content_key or self.memory_backed or not self.doc:
+            return None
+        if any(c['kind'] not in THUMB_CACHE_SAFE_CHANGES for c in self.changes):
+            return None
+        xref = self.doc[page_index].xref
+        if xref >= self.content_xrefs:
+            return None # added since the file was read
+        digest = hashlib.sha1(self.doc.xref_object(xref, compressed=True).encode("utf-8")).hexdigest()
+        return f"{self.content_key}:{xref}:{digest}"
+
     def rotate_page(self, page_index, angle):
         """Rotates a page by angle (90, -90, 180)."""
         if not self.doc: return
+        self._ensure_private()
         page = self.doc[page_index]
         page.set_rotation(page.rotation + angle)
+        # Only the page dictionary changes
+        estimate = 0 if self.is_virtual else len(self.doc.xref_object(page.xref, compressed=True)) + 64
+        self._record_change('rotate', bytes_estimate=estimate, pages=[page_index], angle=angle)
 
     def delete_pages(self, page_indices):
         """Deletes pages. Indices should be a list of integers."""
         if not self.doc: return
+        self._ensure_private()
         # Delete in reverse order to avoid index shifting problems
-        for idx in sorted(page_indices, reverse=True):
+        indices = sorted(page_indices, reverse=True)
+        for idx in indices:
             self.doc.delete_page(idx)
+        # Page tree is rewritten; orphaned objects stay in the file on an incremental save
+        self._record_change('delete', bytes_estimate=64 * len(self.doc) + 1024, pages=sorted(indices))
 
     def move_page(self, from_index, to_index):
         """Moves a page from one index to another."""
         if not self.doc: return
+        self._ensure_private()
         self.doc.move_page(from_index, to_index)
+        self._record_change('move', bytes_estimate=64 * len(self.doc) + 1024, from_index=from_index, to_index=to_index)
+
+    def reorder_pages(self, order):
+        """Rearranges pages to the given list of current page indices."""
+        if not self.doc: return
+        self._ensure_private()
+        self.doc.select(order)
+        self._record_change('reorder', bytes_estimate=64 * len(self.doc) + 1024, order=list(order))
 
     def create_blank_page(self, width=595, height=842, insert_at=-1):
         """Creates a blank page."""
         if not self.doc:
-             self.doc = fitz.open() # Create new if none
+             self.doc = self._new_document() # Create new if none
+        self._ensure_private()
         
         self.doc.new_page(pno=insert_at, width=width, height=height)
+        self._record_change('blank', bytes_estimate=64 * len(self.doc) + 1024,
+                            insert_at=insert_at, width=width, height=height)
 
-    def insert_pdf(self, path, insert_at=-1):
+    def insert_pdf(self, path, insert_at=-1, fidelity=None):
         """Merges another PDF into the current one."""
+        return self.merge_pdf_list([path], insert_at=insert_at, fidelity=fidelity)
+
+    def insert_pages_from(self, src_doc, page_indices, start_at=-1, fidelity=None, op="insert"):
+        """Copies pages from another open document (paste / drop between windows)."""
         if not self.doc:
-             self.doc = fitz.open() # Create new if none
-             
+            self.doc = self._new_document()
+        self._ensure_private()
+        level = fidelity or self.merge_fidelity
+        if self.is_virtual:
+            t0 = time.perf_counter()
+            pages = self.doc.insert_pages(src_doc, page_indices, start_at=start_at, fidelity=level)
+            report = {'fidelity': level, 'pages': pages, 'calls': 0, 'seconds': time.perf_counter() - t0}
+            estimate = 0
+        elif isinstance(src_doc, VirtualDocument):
+            # Pages of a reference-assembled window: build them, graft, and let the copy go
+            with src_doc.materialize(page_indices) as tmp:
+                indices = list(range(len(tmp)))
+                report = insert_page_runs(self.doc, tmp, indices, start_at=start_at, fidelity=level)
+                estimate = self._estimate_pages_bytes(tmp, indices)
+        else:
+            report = insert_page_runs(self.doc, src_doc, page_indices, start_at=start_at, fidelity=level)
+            estimate = self._estimate_pages_bytes(src_doc, page_indices)
+        report['op'] = op
+        self.last_timing = report
+        self._record_change(op, bytes_estimate=estimate + 64 * len(self.doc),
+                            start_at=start_at, pages=list(page_indices), fidelity=level)
+        print(f"[timing] {op}: {report['pages']} pages, fidelity={level}, {report['seconds'] * 1000:.1f} ms")
+        return report['pages']
+
+    def insert_images(self, image_paths, insert_at=-1, progress_callback=None):
+        """Adds a page per image (per frame for multi-page TIFF) at insert_at, in one insert.
+
+        See core.image_import; details are kept in last_image_report.
+        Returns the number of pages added.
+        """
+        src, report = build_image_document(image_paths, progress_callback)
         try:
-            src = fitz.open(path)
-            self.doc.insert_pdf(src, start_at=insert_at)
+            pages = self.insert_pages_from(src, list(range(len(src))), start_at=insert_at, op="images") if len(src) else 0
+        finally:
             src.close()
-            return True
-        except Exception as e:
-            return False
+        report['seconds'] += self.last_timing['seconds'] if pages else 0.0
+        self.last_image_report = report
+        print(f"[timing] images: {len(report['added'])} files, {report['pages']} pages "
+              f"({report['passthrough']} unchanged), {report['seconds']:.2f}s")
+        for path, reason in report['skipped']:
+            print(f"Failed to import {path}: {reason}")
+        return pages
 
     def export_selection(self, page_indices, output_path):
         """Exports selected pages to a new PDF."""
         if not self.doc: return False
+        if self.is_virtual:
+            return self.save_subset(page_indices, output_path)[0]
         
         try:
             new_doc = fitz.open()
@@ -188,23 +776,82 @@ class PDFEngine:
             return None
         return self.doc[page_index].get_text()
 
-    def merge_pdf_list(self, file_paths):
-        """Merges multiple PDFs into the current document or a new one."""
+    def merge_pdf_list(self, file_paths, insert_at=-1, progress_callback=None, fidelity=None):
+        """Merges multiple PDFs into the current document or a new one.
+
+        The next files are read on a background thread while the current one is
+        grafted; details (skipped files, timings) are kept in last_merge_report.
+        A .zip in file_paths stands for the PDFs inside it (core.zip_sources).
+        """
+        file_paths = expand_archives(file_paths)
         if not self.doc:
-            self.doc = fitz.open()
+            self.doc = self._new_document()
+        self._ensure_private()
 
-        count = 0
-        for path in file_paths:
-            try:
-                self.doc.insert_pdf(fitz.open(path))
-                count += 1
-            except Exception as e:
-                print(f"Failed to merge {path}: {e}")
-        return count > 0
+        level = fidelity or self.merge_fidelity
+        # A virtual document only references the files; nothing is grafted
+        merge = reference_files if self.is_virtual else merge_files
+        first_new = 0 if self.is_virtual else self.doc.xref_length()
+        report = merge(self.doc, file_paths, insert_at=insert_at,
+                       prefetch_depth=self.merge_prefetch_depth,
+                       progress_callback=progress_callback,
+                       fidelity=level)
+        self.last_merge_report = report
+        self.last_timing = {'op': 'merge', 'fidelity': level, 'pages': report['pages'],
+                            'seconds': report['seconds'], 'graft_seconds': report['graft_seconds']}
+        print(f"[timing] merge: {len(report['merged'])} files, {report['pages']} pages, fidelity={level}, "
+              f"graft {report['graft_seconds']:.2f}s / total {report['seconds']:.2f}s")
+        for path, reason in report['skipped']:
+            print(f"Failed to merge {path}: {reason}")
+        if report['merged']:
+            merged_bytes = 0 if self.is_virtual else sum(source_size(p) for p in report['merged'])
+            # Sheets from the same template carry identical fonts/logos once per file. Only the
+            # objects just grafted are collapsed, so the rest of the file (and an incremental
+            # save, thumbnail keys) is untouched; the manual command covers the whole document.
+            if self.dedupe_on_merge and not self.is_virtual:
+                try:
+                    report['dedupe'] = dedupe_objects(self.doc, first_xref=first_new)
+                    merged_bytes = max(0, merged_bytes - report['dedupe']['bytes_saved'])
+                    print(f"Dedupe (merged files): {report['dedupe']['duplicates']} objects, "
+                          f"{report['dedupe']['bytes_saved'] / 1024:.0f} KB saved")
+                    shared = shared_annotations(self.doc)
+                    if shared:
+                        print(f"Dedupe left annotations shared between pages: {sorted(shared)}")
+                except Exception as e:
+                    print(f"Dedupe failed: {e}")
+            self._record_change('merge', bytes_estimate=merged_bytes, paths=list(report['merged']),
+                                insert_at=insert_at, fidelity=level, pages=report['pages'])
+        return len(report['merged']) > 0
+
+    def dedupe_resources(self):
+        """Collapses identical fonts, images and XObjects. Returns the dedupe report."""
+        if not self.doc or self.is_virtual: return None
+        self._ensure_private()
+        try:
+            report = dedupe_objects(self.doc)
+            if report['duplicates']:
+                self._record_change('dedupe', bytes_estimate=0, duplicates=report['duplicates'])
+            print(f"Dedupe: {report['duplicates']} objects, {report['bytes_saved'] / 1024:.0f} KB saved")
+            return report
+        except Exception as e:
+            print(f"Dedupe failed: {e}")
+            return None
+
+    def set_bookmarks(self, toc):
+        """Replaces the bookmarks (outline) with toc: [[level, title, page number (1-based)], ...]."""
+        if not self.doc: return
+        self._ensure_private()
+        # The outline lives in the document catalog, which references cannot express
+        self.materialize()
+        self.doc.set_toc(toc)
+        self._record_change('bookmarks', bytes_estimate=256 * len(toc) + 1024, entries=len(toc), toc=toc)
 
     def add_watermark(self, text, page_indices=None):
         """Adds text watermark to specified pages (or all)."""
         if not self.doc: return
+        self._ensure_private()
+        # Changes page content, which references cannot express
+        self.materialize()
 
         pages = page_indices if page_indices else range(len(self.doc))
         
@@ -223,5 +870,7 @@ class PDFEngine:
             shape = page.new_shape()
             shape.insert_text(center, text, fontsize=60, color=(0.8, 0.8, 0.8), rotate=45, align=1)
             shape.commit()
+        
+        self._record_change('watermark', bytes_estimate=2048 * len(pages), pages=list(pages), text=text)
             
             
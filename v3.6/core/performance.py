@@ -0,0 +1,188 @@
+import json
+import os
+import sys
+from config.settings import SETTINGS_FILE, MEMORY_BUDGET_MB
+from core.render_profiles import RENDER_DEFAULT, RENDER_DRAFT, RENDER_DRAFT_GRAY
+from core.save_profiles import PROFILE_AUTO, PROFILE_FULL
+from core.workers import set_worker_count
+from core.memory_budget import MemoryBudget
+from core.doc_registry import DocumentRegistry
+
+PERF_HIGH = "high"         # speed first: large drawing sets, slow PCs
+PERF_BALANCED = "balanced"
+PERF_QUALITY = "quality"   # look first: sharper thumbnails, clean full saves
+
+PERF_LABELS = {PERF_HIGH: "고성능 모드", PERF_BALANCED: "균형 모드", PERF_QUALITY: "고품질 모드"}
+
+MB = 1024 * 1024
+
+
+def total_memory():
+    """Physical memory in bytes (0 if it cannot be determined)."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+            return status.ullTotalPhys
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return 0
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+def tune_profiles(cpu_count=None, memory_bytes=None):
+    """Builds the three profiles for this machine.
+
+    Every byte budget is a fraction of physical memory (the editor may run
+    several windows, next to CAD), worker counts follow the CPU count.
+    Returns {'system': {...}, 'profiles': {mode: {setting: value}}}.
+    """
+    cpus = cpu_count or os.cpu_count() or 2
+    memory = memory_bytes or total_memory() or 8 * 1024 * MB
+    # Whole-editor budget: 1/8 of RAM, at least the old fixed budget on small machines
+    budget_mb = _clamp(memory // 8 // MB, min(MEMORY_BUDGET_MB, 512), 4096)
+
+    profiles = {
+        PERF_HIGH: {
+            'render_workers': _clamp(cpus - 1, 1, 8),
+            'thumb_profile': RENDER_DRAFT_GRAY,
+            'thumb_scale': 0.12,
+            'memory_budget_mb': budget_mb,
+            'render_cache_mb': _clamp(budget_mb // 8, 32, 256),
+            'prefetch_depth': 4,
+            'undo_memory_mb': _clamp(budget_mb // 4, 64, 512),
+            'undo_disk_mb': 4096,
+            'save_profile': PROFILE_AUTO,
+        },
+        PERF_BALANCED: {
+            'render_workers': _clamp(cpus // 2, 1, 4),
+            'thumb_profile': RENDER_DRAFT,
+            'thumb_scale': 0.20,
+            'memory_budget_mb': budget_mb,
+            'render_cache_mb': _clamp(budget_mb // 16, 32, 128),
+            'prefetch_depth': 2,
+            'undo_memory_mb': _clamp(budget_mb // 4, 64, 256),
+            'undo_disk_mb': 2048,
+            'save_profile': PROFILE_AUTO,
+        },
+        PERF_QUALITY: {
+            'render_workers': _clamp(cpus // 2, 1, 4),
+            'thumb_profile': RENDER_DEFAULT,
+            'thumb_scale': 0.30,
+            'memory_budget_mb': budget_mb,
+            'render_cache_mb': _clamp(budget_mb // 8, 32, 256),
+            'prefetch_depth': 2,
+            'undo_memory_mb': _clamp(budget_mb // 4, 64, 256),
+            'undo_disk_mb': 2048,
+            'save_profile': PROFILE_FULL,
+        },
+    }
+    return {'system': {'cpus': cpus, 'memory_mb': memory // MB}, 'profiles': profiles}
+
+
+def default_mode(system):
+    """First-run choice: slow or small machines get the high-performance profile."""
+    if system['cpus'] <= 2 or system['memory_mb'] < 4096:
+        return PERF_HIGH
+    if system['cpus'] >= 8 and system['memory_mb'] >= 16384:
+        return PERF_QUALITY
+    return PERF_BALANCED
+
+
+class PerformanceSettings:
+    """The performance mode and its tuned profiles, stored in SETTINGS_FILE.
+
+    On first run the profiles are tuned from CPU count and RAM and saved, so
+    they can be edited by hand; unknown or missing values fall back to the
+    tuned defaults.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PerformanceSettings, cls).__new__(cls)
+            cls._instance.path = SETTINGS_FILE
+            cls._instance.data = {}
+            cls._instance.load()
+        return cls._instance
+
+    def load(self):
+        tuned = tune_profiles()
+        data = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Settings file unreadable, using defaults: {e}")
+
+        first_run = not data
+        profiles = tuned['profiles']
+        for mode, values in (data.get('profiles') or {}).items():
+            if mode in profiles and isinstance(values, dict):
+                profiles[mode].update({k: v for k, v in values.items() if k in profiles[mode]})
+        mode = data.get('performance_mode')
+        if mode not in profiles:
+            mode = default_mode(tuned['system'])
+        self.data = {'performance_mode': mode, 'system': tuned['system'], 'profiles': profiles}
+        if first_run:
+            self.save()
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Failed to save settings: {e}")
+
+    @property
+    def mode(self):
+        return self.data['performance_mode']
+
+    def set_mode(self, mode):
+        if mode not in self.data['profiles']:
+            return False
+        self.data['performance_mode'] = mode
+        self.save()
+        return True
+
+    def profile(self, mode=None):
+        return dict(self.data['profiles'][mode or self.mode])
+
+
+def apply_global(profile):
+    """Applies the process-wide part of a profile (shared by all windows)."""
+    set_worker_count(profile['render_workers'])
+    MemoryBudget().budget_bytes = profile['memory_budget_mb'] * MB
+    registry = DocumentRegistry()
+    registry.render_budget = profile['render_cache_mb'] * MB
+    if registry.render_bytes > registry.render_budget:
+        registry.evict_renders(registry.render_bytes - registry.render_budget)
+
+
+def apply_engine(engine, profile):
+    """Applies the per-document part of a profile to a PDFEngine."""
+    engine.merge_prefetch_depth = profile['prefetch_depth']
+    engine.default_save_profile = profile['save_profile']
+    engine.undo_stack.memory_budget = profile['undo_memory_mb'] * MB
+    engine.undo_stack.disk_budget = profile['undo_disk_mb'] * MB
+    over = engine.undo_stack.memory_bytes - engine.undo_stack.memory_budget
+    if over > 0:
+        engine.undo_stack.spill(over)
@@ -0,0 +1,451 @@
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+import fitz  # PyMuPDF
+from config.settings import RECOVERY_DIR
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+JOURNAL_VERSION = 1
+# Edits that can be re-applied from their journal record. Anything else
+# (undo of a reference-assembled document) is covered by a snapshot checkpoint.
+REPLAYABLE = {'rotate', 'delete', 'move', 'reorder', 'blank', 'watermark', 'merge', 'dedupe', 'bookmarks',
+              'insert', 'paste', 'drop', 'images'}
+# Edits that add pages from another document: the added pages are journaled as a small PDF
+PAGE_PAYLOAD = {'insert', 'paste', 'drop', 'images'}
+# Past this size the journal is folded into a snapshot so it (and replay) stays small
+JOURNAL_MAX_BYTES = 4 * 1024 * 1024
+
+
+def _try_lock(f):
+    """Non-blocking exclusive lock on an open file. False if another session holds it."""
+    try:
+        if msvcrt:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _write_durable(path, data):
+    """Writes data to path through a temporary file, fsync and rename."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class RecoveryJournal:
+    """Append-only journal of one window's edits, for crash recovery.
+
+    Registered as a PDFEngine change listener. The listener only queues a
+    small record; a writer thread appends it to <session>.jsonl and fsyncs.
+    Pages added from another document (paste, drop, images) are written
+    next to the record as a PDF of just those pages. An undo replaces the
+    journal with the restored state, whose bytes the undo history already
+    holds. Only what neither covers (undo of a reference-assembled
+    document, a journal grown too large) sets needs_checkpoint, and the
+    window then calls checkpoint() when idle.
+    Nothing is written until the first edit after open/save.
+    """
+
+    def __init__(self, engine, directory=RECOVERY_DIR):
+        self.engine = engine
+        self.directory = directory
+        self.session_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{uuid.uuid4().hex[:6]}"
+        self.journal_path = os.path.join(directory, self.session_id + ".jsonl")
+        self.lock_path = os.path.join(directory, self.session_id + ".lock")
+        self.needs_checkpoint = False
+        self.stats = {
+            'records': 0,
+            'bytes': 0,              # journal bytes written
+            'listener_ms_total': 0.0, # time the edit itself was delayed
+            'listener_ms_max': 0.0,
+            'checkpoints': 0,
+            'checkpoint_seconds': 0.0, # UI-thread part (tobytes)
+            'snapshot_bytes': 0,
+        }
+        self._seq = 0
+        self._generation = 0
+        self._has_header = False
+        self._base_stat = None
+        self._lock_handle = None
+        self._journal_bytes = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        engine.change_listeners.append(self.on_change)
+
+    # --- UI thread ---
+
+    def on_change(self, change):
+        t0 = time.perf_counter()
+        kind = change['kind']
+        if kind in ('opened', 'closed') or (kind == 'saved' and change.get('clean')):
+            # The file on disk now matches the document: nothing to recover
+            self._base_stat = self._stat(change.get('path'))
+            self._has_header = False
+            self.needs_checkpoint = False
+            self._queue.put(('clear',))
+            return
+        if kind == 'saved':
+            # Saved over the base file while edits were in flight: the base is gone
+            self.needs_checkpoint = True
+            return
+
+        if not self._has_header:
+            self._queue.put(('header', self._header()))
+            self._has_header = True
+        self._seq += 1
+        record = {k: v for k, v in change.items() if k != 'bytes'}
+        record['seq'] = self._seq
+        record['t'] = round(time.time(), 3)
+        if kind in PAGE_PAYLOAD:
+            record['pages_file'] = f"{self.session_id}.p{self._seq}.pdf"
+            self._queue.put(('pages', record['pages_file'], self._added_pages(change)))
+        # Queued before any snapshot: a crash before the snapshot is on disk leaves
+        # a record replay cannot apply, and the session shows as partly recoverable
+        self._queue.put(('record', record))
+        if kind == 'undo' and isinstance(getattr(self.engine.doc, 'stream', None), bytes):
+            # The undone state was reopened from its undo bytes: they are the snapshot
+            self.checkpoint(self.engine.doc.stream)
+        elif kind not in REPLAYABLE:
+            self.needs_checkpoint = True
+
+        ms = (time.perf_counter() - t0) * 1000
+        self.stats['records'] += 1
+        self.stats['listener_ms_total'] += ms
+        self.stats['listener_ms_max'] = max(self.stats['listener_ms_max'], ms)
+
+    def _added_pages(self, change):
+        """PDF bytes of the pages an insert-type edit just added (costs as much as the pages, not the document)."""
+        doc = self.engine.doc
+        count = len(change['pages'])
+        at = change.get('start_at', -1)
+        if at is None or at < 0 or at > len(doc) - count:
+            at = len(doc) - count
+        indices = list(range(at, at + count))
+        if self.engine.is_virtual:
+            pages = doc.materialize(indices)
+        else:
+            pages = fitz.open()
+            pages.insert_pdf(doc, from_page=at, to_page=at + count - 1)
+        with pages:
+            return pages.tobytes(garbage=0, deflate=False)
+
+    def checkpoint(self, data=None):
+        """Replaces the journal with a snapshot of the current document.
+
+        data: the document's bytes if the caller has them; otherwise only
+        tobytes() runs on the caller's thread. The writes are queued.
+        """
+        doc = self.engine.doc
+        if not doc:
+            return
+        t0 = time.perf_counter()
+        if data is None:
+            data = doc.tobytes(garbage=0, deflate=False)
+        self._generation += 1
+        header = self._header(snapshot=f"{self.session_id}.{self._generation}.pdf")
+        self._queue.put(('checkpoint', header, data))
+        self._has_header = True
+        self.needs_checkpoint = False
+
+        seconds = time.perf_counter() - t0
+        self.stats['checkpoints'] += 1
+        self.stats['checkpoint_seconds'] += seconds
+        self.stats['snapshot_bytes'] = len(data)
+        print(f"[timing] recovery checkpoint: {len(data) / 1024 / 1024:.1f} MB, {seconds * 1000:.0f} ms")
+
+    def close(self, discard=True):
+        """Stops the writer. discard=True (clean exit) deletes the session's files."""
+        if self.on_change in self.engine.change_listeners:
+            self.engine.change_listeners.remove(self.on_change)
+        if discard:
+            self._queue.put(('clear',))
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        if self._lock_handle:
+            self._lock_handle.close()
+            self._lock_handle = None
+            if discard:
+                _remove(self.lock_path)
+        s = self.stats
+        if s['records']:
+            print(f"[timing] recovery journal: {s['records']} records, {s['bytes'] / 1024:.0f} KB, "
+                  f"avg {s['listener_ms_total'] / s['records']:.3f} ms / max {s['listener_ms_max']:.3f} ms per edit, "
+                  f"{s['checkpoints']} checkpoints")
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+            return {'size': st.st_size, 'mtime': st.st_mtime}
+        except (OSError, TypeError):
+            return None
+
+    def _header(self, snapshot=None):
+        engine = self.engine
+        header = {
+            'type': 'header',
+            'version': JOURNAL_VERSION,
+            'session': self.session_id,
+            'pid': os.getpid(),
+            'created': round(time.time(), 3),
+            'path': engine.file_path,
+            'snapshot': snapshot,
+        }
+        if snapshot:
+            header['base'] = 'snapshot'
+        elif engine.file_path and engine._is_backed_by(engine.file_path) and self._base_stat:
+            header['base'] = 'file'
+            header.update(self._base_stat)
+        elif not engine.file_path and not engine.memory_backed:
+            header['base'] = 'empty'
+        else:
+            # Document only exists in memory; replay needs the next checkpoint
+            header['base'] = None
+            self.needs_checkpoint = True
+        return header
+
+    # --- writer thread ---
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            for item in batch:
+                if item is not None and item[0] == 'record':
+                    lines.append(json.dumps(item[1], ensure_ascii=False))
+                    continue
+                try:
+                    self._flush(lines)
+                    if item is None:
+                        return
+                    if item[0] == 'header':
+                        self._start_journal(item[1])
+                    elif item[0] == 'checkpoint':
+                        self._write_checkpoint(item[1], item[2])
+                    elif item[0] == 'pages':
+                        self._acquire_lock()
+                        _write_durable(os.path.join(self.directory, item[1]), item[2])
+                    elif item[0] == 'clear':
+                        self._clear_files()
+                except Exception as e:
+                    print(f"Recovery journal write failed: {e}")
+                lines = []
+            try:
+                self._flush(lines)
+            except Exception as e:
+                print(f"Recovery journal write failed: {e}")
+
+    def _acquire_lock(self):
+        if self._lock_handle:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_handle = open(self.lock_path, "a+")
+        _try_lock(self._lock_handle)
+
+    def _start_journal(self, header):
+        self._acquire_lock()
+        data = (json.dumps(header, ensure_ascii=False) + "\n").encode("utf-8")
+        _write_durable(self.journal_path, data)
+        self._journal_bytes = len(data)
+        self.stats['bytes'] += len(data)
+
+    def _flush(self, lines):
+        if not lines:
+            return
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_bytes += len(data)
+        self.stats['bytes'] += len(data)
+        if self._journal_bytes > JOURNAL_MAX_BYTES:
+            self.needs_checkpoint = True
+
+    def _write_checkpoint(self, header, data):
+        self._acquire_lock()
+        snapshot_path = os.path.join(self.directory, header['snapshot'])
+        _write_durable(snapshot_path, data)
+        # The journal only switches to the new snapshot once it is safely on disk
+        self._start_journal(header)
+        for path in self._snapshots():
+            if path != snapshot_path:
+                _remove(path)
+
+    def _snapshots(self):
+        return glob.glob(os.path.join(glob.escape(self.directory), glob.escape(self.session_id) + ".*.pdf"))
+
+    def _clear_files(self):
+        _remove(self.journal_path)
+        for path in self._snapshots():
+            _remove(path)
+        self._journal_bytes = 0
+
+
+def read_journal(journal_path):
+    """Returns (header, records). A torn last line (crash mid-write) is ignored."""
+    header, records = None, []
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if entry.get('type') == 'header':
+                header = entry
+            else:
+                records.append(entry)
+    return header, records
+
+
+def find_orphaned_sessions(directory=RECOVERY_DIR):
+    """Lists journals whose session is no longer running (the app crashed or was killed).
+
+    Returns a list of dicts: {'session_id', 'journal', 'path', 'records', 'modified', 'complete'};
+    complete is False when replay will stop early (a snapshot was still pending at the crash).
+    """
+    sessions = []
+    for journal_path in sorted(glob.glob(os.path.join(glob.escape(directory), "*.jsonl"))):
+        session_id = os.path.basename(journal_path)[:-len(".jsonl")]
+        lock_path = os.path.join(directory, session_id + ".lock")
+        if os.path.exists(lock_path):
+            try:
+                with open(lock_path, "a+") as f:
+                    if not _try_lock(f):
+                        continue # live session (this or another instance)
+            except OSError:
+                continue
+        try:
+            header, records = read_journal(journal_path)
+        except OSError:
+            continue
+        if not header:
+            continue
+        sessions.append({
+            'session_id': session_id,
+            'journal': journal_path,
+            'path': header.get('path'),
+            'records': len(records),
+            'modified': os.path.getmtime(journal_path),
+            'complete': header.get('base') is not None and all(r.get('kind') in REPLAYABLE for r in records),
+        })
+    return sessions
+
+
+def discard_session(session, directory=RECOVERY_DIR):
+    """Deletes an orphaned session's journal, snapshots and lock file."""
+    prefix = os.path.join(glob.escape(directory), glob.escape(session['session_id']))
+    for path in glob.glob(prefix + ".*"):
+        _remove(path)
+
+
+def _apply(engine, record, directory):
+    kind = record['kind']
+    if kind == 'rotate':
+        for idx in record['pages']:
+            engine.rotate_page(idx, record['angle'])
+    elif kind == 'delete':
+        engine.delete_pages(record['pages'])
+    elif kind == 'move':
+        engine.move_page(record['from_index'], record['to_index'])
+    elif kind == 'reorder':
+        engine.reorder_pages(record['order'])
+    elif kind == 'blank':
+        engine.create_blank_page(record['width'], record['height'], record['insert_at'])
+    elif kind == 'watermark':
+        engine.add_watermark(record['text'], record['pages'])
+    elif kind == 'merge':
+        # Collapsing the merged files' duplicates is part of the merge
+        engine.merge_pdf_list(record['paths'], insert_at=record['insert_at'], fidelity=record['fidelity'])
+        skipped = engine.last_merge_report['skipped']
+        if skipped:
+            raise RuntimeError(f"{os.path.basename(skipped[0][0])}: {skipped[0][1]}")
+    elif kind == 'dedupe':
+        engine.dedupe_resources()
+    elif kind == 'bookmarks':
+        engine.set_bookmarks(record['toc'])
+    elif kind in PAGE_PAYLOAD:
+        with fitz.open(os.path.join(directory, record['pages_file'])) as src:
+            engine.insert_pages_from(src, list(range(len(src))), start_at=record['start_at'],
+                                     fidelity=record['fidelity'], op=kind)
+    else:
+        raise ValueError(f"not replayable: {kind}")
+
+
+def replay_session(engine, session, directory=RECOVERY_DIR):
+    """Rebuilds a crashed session's document in engine. Returns (success, message, report)."""
+    t0 = time.perf_counter()
+    try:
+        header, records = read_journal(session['journal'])
+    except OSError as e:
+        return False, f"복구 기록을 읽을 수 없습니다: {e}", None
+    if not header:
+        return False, "복구 기록이 손상되었습니다.", None
+
+    base = header.get('base')
+    path = header.get('path')
+    try:
+        if base == 'snapshot':
+            with open(os.path.join(directory, header['snapshot']), "rb") as f:
+                engine.open_memory(f.read(), file_path=path)
+        elif base == 'file':
+            st = os.stat(path) if path and os.path.exists(path) else None
+            if not st or st.st_size != header.get('size') or st.st_mtime != header.get('mtime'):
+                return False, "원본 파일이 없거나 이후에 변경되어 복구할 수 없습니다.", None
+            success, msg = engine.open_pdf(path)
+            if not success:
+                return False, msg, None
+        elif base == 'empty':
+            engine.open_memory(None)
+        else:
+            return False, "편집 내용이 메모리에만 있어 복구할 수 없습니다.", None
+    except Exception as e:
+        return False, f"복구 실패: {e}", None
+
+    report = {'base': base, 'records': len(records), 'applied': 0, 'stopped_at': None, 'error': None,
+              'partial': False, 'seconds': 0.0}
+    for record in records:
+        try:
+            _apply(engine, record, directory)
+        except Exception as e:
+            report['stopped_at'] = record['kind']
+            report['error'] = str(e)
+            report['partial'] = True
+            break
+        report['applied'] += 1
+    report['seconds'] = time.perf_counter() - t0
+
+    msg = f"복구 완료: 편집 {report['applied']}/{report['records']}건 적용"
+    if report['stopped_at']:
+        msg += f" ('{report['stopped_at']}' 이후 편집은 복구하지 못했습니다: {report['error']})"
+    print(f"[timing] recovery replay: base={base}, {report['applied']}/{report['records']} records, {report['seconds']:.2f}s")
+    return True, msg, report
@@ -0,0 +1,55 @@
+import fitz  # PyMuPDF
+from PIL import Image
+
+# Render profiles (see render_page)
+RENDER_DEFAULT = "default"       # full anti-aliasing, RGB, annotations and form fields drawn
+RENDER_DRAFT = "draft"           # thumbnails: low anti-aliasing, no annotations or widgets
+RENDER_DRAFT_GRAY = "draft_gray" # draft, rendered straight to grayscale
+
+RENDER_LABELS = {
+    RENDER_DEFAULT: "기본 품질",
+    RENDER_DRAFT: "초안 (썸네일)",
+    RENDER_DRAFT_GRAY: "초안 (흑백)",
+}
+
+# aa_level: MuPDF anti-aliasing bits for text and graphics (0 = off, 8 = full).
+# min_line_width: hairlines are drawn at least this wide (pixels) so thin
+# drawing lines do not vanish at 0.1-0.3 scale without anti-aliasing.
+RENDER_OPTIONS = {
+    RENDER_DEFAULT: {'aa_level': None, 'min_line_width': None, 'gray': False, 'annots': True},
+    RENDER_DRAFT: {'aa_level': 2, 'min_line_width': 1.0, 'gray': False, 'annots': False},
+    RENDER_DRAFT_GRAY: {'aa_level': 2, 'min_line_width': 1.0, 'gray': True, 'annots': False},
+}
+
+
+def _set_aa_levels(text, graphics):
+    """Sets the text and graphics anti-aliasing levels separately (fitz.TOOLS.set_aa_level sets both to one value)."""
+    fitz.mupdf.fz_set_text_aa_level(text)
+    fitz.mupdf.fz_set_graphics_aa_level(graphics)
+
+
+def render_page(page, scale=1.0, profile=RENDER_DEFAULT):
+    """Renders page (fitz.Page or VirtualPage) to a PIL Image using a render profile.
+
+    Anti-aliasing is a process-wide MuPDF setting, so it is changed only for
+    the duration of this call and restored afterwards. Rendering happens on
+    the UI thread, so no other render can observe the lowered level.
+    """
+    options = RENDER_OPTIONS.get(profile, RENDER_OPTIONS[RENDER_DEFAULT])
+    matrix = fitz.Matrix(scale, scale)
+    colorspace = fitz.csGRAY if options['gray'] else fitz.csRGB
+
+    previous = None
+    if options['aa_level'] is not None:
+        previous = fitz.TOOLS.show_aa_level()
+        _set_aa_levels(options['aa_level'], options['aa_level'])
+        fitz.TOOLS.set_graphics_min_line_width(options['min_line_width'])
+    try:
+        pix = page.get_pixmap(matrix=matrix, colorspace=colorspace, alpha=False, annots=options['annots'])
+    finally:
+        if previous:
+            _set_aa_levels(previous['text'], previous['graphics'])
+            fitz.TOOLS.set_graphics_min_line_width(previous['graphics_min_line_width'])
+
+    mode = "L" if pix.n == 1 else "RGB"
+    return Image.frombytes(mode, [pix.width, pix.height], pix.samples)
@@ -0,0 +1,95 @@
+import os
+import tempfile
+from core.page_thumbs import embed_thumbnails
+
+PROFILE_AUTO = "auto"
+PROFILE_INCREMENTAL = "incremental"
+PROFILE_FULL = "full"
+PROFILE_COMPACT = "compact"
+PROFILE_LINEARIZED = "linearized"
+PROFILE_THUMBNAILS = "thumbnails"
+
+# Ordered from cheapest to most expensive
+SAVE_PROFILES = {
+    PROFILE_INCREMENTAL: {
+        'label': "빠른 저장 (증분)",
+        'options': {},
+    },
+    PROFILE_FULL: {
+        # Previous default: lossless, keeps every object (no garbage collection)
+        'label': "일반 저장",
+        'options': {'deflate': True, 'garbage': 0},
+    },
+    PROFILE_COMPACT: {
+        # Drops orphaned objects left by deletes/reorders, merges duplicates,
+        # packs small objects into object streams and subsets embedded fonts
+        'label': "최적화 저장 (용량 축소)",
+        'options': {'deflate': True, 'garbage': 3, 'use_objstms': 1},
+        'subset_fonts': True,
+    },
+    PROFILE_LINEARIZED: {
+        # Fast first-page open from network shares
+        'label': "웹 최적화 (빠른 첫 페이지)",
+        'options': {'deflate': True, 'garbage': 3, 'linear': True},
+    },
+    PROFILE_THUMBNAILS: {
+        # Normal save plus a /Thumb image per page, so the next open shows the grid at once
+        'label': "썸네일 포함 저장",
+        'options': {'deflate': True, 'garbage': 0},
+        'thumbnails': True,
+    },
+}
+
+PROFILE_LABELS = {PROFILE_AUTO: "자동 (가장 빠른 방식)"}
+PROFILE_LABELS.update({name: p['label'] for name, p in SAVE_PROFILES.items()})
+
+
+def fsync_file(path):
+    """Flushes a written file to disk so a rename after it is crash-safe."""
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def make_temp_path(target_path):
+    """Creates an empty temporary file next to target_path (same volume, so rename is atomic)."""
+    directory = os.path.dirname(os.path.abspath(target_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".~", suffix=".pdf.tmp", dir=directory)
+    os.close(fd)
+    return tmp_path
+
+
+def modifies_document(profile):
+    """True if writing with profile changes the document it writes (font subsetting, /Thumb images)."""
+    spec = SAVE_PROFILES[profile]
+    return bool(spec.get('subset_fonts') or spec.get('thumbnails'))
+
+
+def write_profile(doc, path, profile):
+    """Writes doc to path with a full-save profile. Returns a note string (may be empty).
+
+    See modifies_document(): some profiles change doc itself before writing it.
+    """
+    spec = SAVE_PROFILES[profile]
+    note = ""
+    if spec.get('subset_fonts'):
+        try:
+            doc.subset_fonts()
+        except Exception as e:
+            note = f"font subsetting skipped ({e})"
+    if spec.get('thumbnails'):
+        try:
+            embed_thumbnails(doc)
+        except Exception as e:
+            note = f"thumbnails skipped ({e})"
+
+    options = dict(spec['options'])
+    try:
+        doc.save(path, **options)
+    except Exception as e:
+        if not options.pop('linear', False):
+            raise
+        # Recent MuPDF releases dropped linearization; fall back to the compact layout
+        options['use_objstms'] = 1
+        doc.save(path, **options)
+        note = f"linearization unavailable ({e}); saved compact"
+    return note
@@ -0,0 +1,452 @@
+import base64
+import bisect
+import json
+import os
+import re
+import time
+import zlib
+from array import array
+import fitz  # PyMuPDF
+from config.settings import SEARCH_INDEX_DIR
+from core.workers import get_process_pool
+
+# Pages per worker task
+EXTRACT_CHUNK = 50
+# Persisted indexes kept (one per file content), oldest dropped first
+KEEP_INDEXES = 200
+INDEX_VERSION = 1
+
+# Punctuation trimmed from both ends of a word ("PC-12," -> "pc-12"); inner '-', '.', '/' stay
+_TRIM = re.compile(r"^[\W_]+|[\W_]+$", re.UNICODE)
+
+# Edits that add pages: kind -> (position key, page count)
+_INSERTS = {
+    'insert': ('start_at', lambda c: len(c['pages'])),
+    'paste': ('start_at', lambda c: len(c['pages'])),
+    'drop': ('start_at', lambda c: len(c['pages'])),
+    'images': ('start_at', lambda c: len(c['pages'])),
+    'merge': ('insert_at', lambda c: c['pages']),
+    'blank': ('insert_at', lambda c: 1),
+}
+
+
+def normalize(word):
+    return _TRIM.sub("", word).casefold()
+
+
+def page_words(page):
+    """(words, boxes) of a page: normalized words and their boxes (x0, y0, x1, y1 per word, unrotated page space)."""
+    words = []
+    boxes = array('f')
+    for x0, y0, x1, y1, text, *_ in page.get_text("words"):
+        term = normalize(text)
+        if term:
+            words.append(term)
+            boxes.extend((x0, y0, x1, y1))
+    return words, boxes
+
+
+def extract_words(path, indices):
+    """Runs in a worker process: [(page index, words, boxes as bytes)] for pages of a file."""
+    out = []
+    with fitz.open(path) as doc:
+        for i in indices:
+            words, boxes = page_words(doc[i])
+            out.append((i, words, boxes.tobytes()))
+    return out
+
+
+class SearchIndex:
+    """Full-text index of the document open in a PDFEngine.
+
+    Pages are identified by an id that follows them through moves, deletes
+    and inserts (slots maps position -> id), so edits only touch the pages
+    they change: structural edits rearrange ids, new or edited pages get new
+    ids queued for extraction. slots is kept with every undo state, and the
+    words of pages taken off the document are kept while an undo state may
+    bring them back, so an undo only puts the ids back. Pages of the file as opened are extracted by the
+    'text' worker pool; pages that exist only in memory are extracted here in
+    small slices by pump(). The inverted index maps each word to the ids
+    of the pages containing it; search() matches words by prefix.
+
+    Indexes of unedited files are persisted by file content (the thumbnail
+    cache identity, PDFEngine.content_key), so reopening is instant.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.slots = []      # position -> page id
+        self.words = {}      # page id -> [word]
+        self.boxes = {}      # page id -> array('f') of x0, y0, x1, y1 per word
+        self.postings = {}   # word -> set(page ids)
+        self.pending = set() # ids waiting for in-process extraction
+        self.remote = set()  # ids being extracted by workers
+        self.detached = set() # ids no longer on a page, kept for undo
+        self._futures = []
+        self._next_id = 0
+        self._terms = None   # sorted words for prefix search (rebuilt lazily)
+        self._positions = None
+        self._generation = 0
+        self._content_key = None
+        self.build_seconds = 0.0
+        self._build_started = None
+        engine.change_listeners.append(self.on_change)
+        engine.undo_extras['search'] = lambda: array('q', self.slots)
+
+    # --- maintenance ---
+
+    def _new_ids(self, count):
+        ids = list(range(self._next_id, self._next_id + count))
+        self._next_id += count
+        return ids
+
+    def _forget(self, page_id):
+        for word in set(self.words.pop(page_id, ())):
+            ids = self.postings.get(word)
+            if ids:
+                ids.discard(page_id)
+                if not ids:
+                    del self.postings[word]
+                    self._terms = None
+        self.boxes.pop(page_id, None)
+        self.pending.discard(page_id)
+        self.remote.discard(page_id)
+        self.detached.discard(page_id)
+
+    def _release(self, page_id):
+        """A page left the document: its words stay while an undo state may restore it."""
+        if not len(self.engine.undo_stack):
+            self._forget(page_id)
+            return
+        self.detached.add(page_id)
+        if len(self.detached) > max(len(self.slots), 100):
+            self._drop_detached()
+
+    def _drop_detached(self):
+        """Forgets the detached pages no undo state refers to any more."""
+        kept = set(self.slots)
+        for slots in self.engine.undo_stack.extras('search'):
+            kept.update(slots)
+        for page_id in self.detached - kept:
+            self._forget(page_id)
+        self.detached &= kept
+
+    def _restore(self, slots):
+        """Undo: the restored state's pages are put back; only pages without words are extracted."""
+        self.detached.update(self.slots)
+        self.slots = list(slots)
+        self.detached.difference_update(self.slots)
+        for page_id in self.slots:
+            if page_id not in self.words and page_id not in self.remote:
+                self.pending.add(page_id) # forgotten meanwhile (index rebuilt)
+        self._drop_detached()
+
+    def _store(self, page_id, words, boxes):
+        if page_id in self.words:
+            self._forget(page_id)
+        self.words[page_id] = words
+        self.boxes[page_id] = boxes
+        for word in set(words):
+            ids = self.postings.get(word)
+            if ids is None:
+                self.postings[word] = {page_id}
+                self._terms = None
+            else:
+                ids.add(page_id)
+
+    def clear(self):
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        self.slots = []
+        self.words.clear()
+        self.boxes.clear()
+        self.postings.clear()
+        self.pending.clear()
+        self.remote.clear()
+        self.detached.clear()
+        self._terms = None
+        self._positions = None
+        self._generation += 1
+        self._content_key = None
+
+    def rebuild(self):
+        """Indexes the whole document: from the persisted index, the worker pool, or in-process."""
+        self.clear()
+        doc = self.engine.doc
+        if doc is None:
+            return
+        self.slots = self._new_ids(len(doc))
+        self._build_started = time.perf_counter()
+        key = self.engine.content_key if not self.engine.memory_backed else None
+        path = doc.name if key and not self.engine.is_virtual else None
+        if key and self._load(key):
+            self.build_seconds = time.perf_counter() - self._build_started
+            self._build_started = None
+            return
+        self._content_key = key
+        if path and os.path.exists(path) and not self.engine.changes:
+            # File pages in order: id == page number of the file
+            pool = get_process_pool("text")
+            generation = self._generation
+            for start in range(0, len(doc), EXTRACT_CHUNK):
+                indices = list(range(start, min(len(doc), start + EXTRACT_CHUNK)))
+                future = pool.submit(extract_words, path, indices)
+                future.generation = generation
+                future.ids = [self.slots[i] for i in indices]
+                self._futures.append(future)
+                self.remote.update(future.ids)
+        else:
+            self.pending.update(self.slots)
+
+    def on_change(self, change):
+        """Engine change listener: keeps the index in step with edits."""
+        kind = change['kind']
+        if kind == 'opened':
+            self.rebuild()
+            return
+        if kind == 'closed':
+            self.clear()
+            return
+        if kind == 'saved':
+            if change.get('clean') and self.ready and self.engine.content_key:
+                self._save(self.engine.content_key) # the saved file opens with its index next time
+            return
+        if kind in ('dedupe', 'rotate', 'bookmarks'):
+            return # words are kept in unrotated page space; bookmarks are not page text
+        self._positions = None
+        if kind == 'undo':
+            slots = self.engine.undone_extras.get('search')
+            if slots is None:
+                self.rebuild()
+                return
+            self._restore(slots)
+        elif kind == 'delete':
+            for index in sorted(change['pages'], reverse=True):
+                self._release(self.slots.pop(index))
+        elif kind == 'move':
+            page_id = self.slots.pop(change['from_index'])
+            to = change['to_index']
+            if to < 0 or to > len(self.slots):
+                self.slots.append(page_id)
+            else:
+                self.slots.insert(to - 1 if to > change['from_index'] else to, page_id)
+        elif kind == 'reorder':
+            kept = [self.slots[i] for i in change['order']]
+            for page_id in set(self.slots) - set(kept):
+                self._release(page_id)
+            # A page selected twice is a second, separate page
+            seen = set()
+            self.slots = []
+            for page_id in kept:
+                if page_id in seen:
+                    new_id = self._new_ids(1)[0]
+                    if page_id in self.words:
+                        self._store(new_id, list(self.words[page_id]), array('f', self.boxes[page_id]))
+                    else:
+                        self.pending.add(new_id)
+                    page_id = new_id
+                seen.add(page_id)
+                self.slots.append(page_id)
+        elif kind in _INSERTS:
+            key, count = _INSERTS[kind]
+            ids = self._new_ids(count(change))
+            at = change.get(key, -1)
+            if at is None or at < 0 or at > len(self.slots):
+                at = len(self.slots)
+            self.slots[at:at] = ids
+            for page_id in ids:
+                if kind == 'blank':
+                    self._store(page_id, [], array('f'))
+                else:
+                    self.pending.add(page_id)
+        elif kind == 'watermark':
+            # Changed in place: a new id, so the words before the edit stay valid for undo
+            for index in change['pages']:
+                if 0 <= index < len(self.slots):
+                    self._release(self.slots[index])
+                    self.slots[index] = self._new_ids(1)[0]
+                    self.pending.add(self.slots[index])
+        else:
+            self.rebuild()
+            return
+        self._content_key = None # edited: nothing to persist
+        doc = self.engine.doc
+        if doc is None or len(self.slots) != len(doc):
+            print(f"Search index out of step after '{kind}', rebuilding")
+            self.rebuild()
+
+    def pump(self, budget_seconds=0.04):
+        """Collects worker results and extracts pending pages for up to budget_seconds.
+
+        Called from the UI loop. Returns True while work remains.
+        """
+        t0 = time.perf_counter()
+        still_running = []
+        for future in self._futures:
+            if not future.done():
+                still_running.append(future)
+                continue
+            if future.cancelled() or future.generation != self._generation:
+                continue
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"Text worker failed: {e}")
+                self.pending.update(i for i in future.ids if i in self.remote)
+                self.remote.difference_update(future.ids)
+                continue
+            for page_id, (i, words, boxes) in zip(future.ids, results):
+                if page_id not in self.remote:
+                    continue # deleted, or edited (re-queued) meanwhile
+                self.remote.discard(page_id)
+                if page_id in self.pending:
+                    continue
+                self._store(page_id, words, array('f', boxes))
+        self._futures = still_running
+
+        doc = self.engine.doc
+        if self.pending and doc is not None:
+            positions = self._position_map()
+            # Visible order: earlier pages first
+            for page_id in sorted(self.pending, key=lambda p: positions.get(p, 0)):
+                if time.perf_counter() - t0 > budget_seconds:
+                    break
+                self.pending.discard(page_id)
+                index = positions.get(page_id)
+                if index is None:
+                    continue
+                try:
+                    words, boxes = page_words(doc[index])
+                except Exception as e:
+                    print(f"Text extraction failed on page {index + 1}: {e}")
+                    words, boxes = [], array('f')
+                self._store(page_id, words, boxes)
+
+        busy = bool(self.pending or self.remote)
+        if not busy and self._build_started is not None:
+            self.build_seconds = time.perf_counter() - self._build_started
+            self._build_started = None
+            print(f"[timing] search index: {len(self.slots)} pages, {len(self.postings)} words, {self.build_seconds:.2f}s")
+            if self._content_key:
+                self._save(self._content_key)
+        return busy
+
+    @property
+    def ready(self):
+        return not (self.pending or self.remote)
+
+    def _position_map(self):
+        if self._positions is None:
+            self._positions = {page_id: i for i, page_id in enumerate(self.slots)}
+        return self._positions
+
+    # --- queries ---
+
+    def _matching_ids(self, term):
+        """Ids of pages with a word starting with term."""
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        ids = set()
+        k = bisect.bisect_left(self._terms, term)
+        while k < len(self._terms) and self._terms[k].startswith(term):
+            ids |= self.postings[self._terms[k]]
+            k += 1
+        return ids
+
+    def search(self, query, limit=None):
+        """Pages containing every word of query (prefix match). Returns [(page index, hits)] in page order."""
+        terms = [t for t in (normalize(w) for w in query.split()) if t]
+        if not terms:
+            return []
+        ids = None
+        for term in sorted(terms, key=len, reverse=True): # longest (most selective) first
+            found = self._matching_ids(term)
+            ids = found if ids is None else ids & found
+            if not ids:
+                return []
+        positions = self._position_map()
+        results = []
+        for page_id in ids:
+            index = positions.get(page_id)
+            if index is None:
+                continue
+            hits = sum(1 for w in self.words.get(page_id, ()) if any(w.startswith(t) for t in terms))
+            results.append((index, hits))
+        results.sort()
+        return results[:limit] if limit else results
+
+    def page_hits(self, page_index, query):
+        """Boxes (fitz.Rect, unrotated page space) of the words on a page that match query."""
+        if not (0 <= page_index < len(self.slots)):
+            return []
+        terms = [t for t in (normalize(w) for w in query.split()) if t]
+        page_id = self.slots[page_index]
+        boxes = self.boxes.get(page_id)
+        rects = []
+        for k, word in enumerate(self.words.get(page_id, ())):
+            if any(word.startswith(t) for t in terms):
+                rects.append(fitz.Rect(*boxes[4 * k:4 * k + 4]))
+        return rects
+
+    def memory_bytes(self):
+        """Rough size: boxes plus about 60 bytes per stored word (list slot, shared strings, postings)."""
+        return sum(len(b) * 4 for b in self.boxes.values()) + 60 * sum(len(w) for w in self.words.values())
+
+    def report(self):
+        """{'pages', 'indexed', 'pending', 'words', 'seconds'}"""
+        return {
+            'pages': len(self.slots),
+            'indexed': sum(1 for page_id in self.slots if page_id in self.words),
+            'pending': len(self.pending) + len(self.remote),
+            'words': len(self.postings),
+            'seconds': self.build_seconds,
+        }
+
+    # --- persistence ---
+
+    def _path(self, key):
+        return os.path.join(SEARCH_INDEX_DIR, f"{key}.idx")
+
+    def _save(self, key):
+        """Stores the index of an unedited file (page number -> words, boxes)."""
+        try:
+            os.makedirs(SEARCH_INDEX_DIR, exist_ok=True)
+            pages = [[self.words.get(page_id, []), base64.b64encode(self.boxes.get(page_id, array('f')).tobytes()).decode('ascii')]
+                     for page_id in self.slots]
+            data = zlib.compress(json.dumps({'version': INDEX_VERSION, 'pages': pages},
+                                            ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            tmp = self._path(key) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+            self._prune()
+        except OSError as e:
+            print(f"Search index not saved: {e}")
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                data = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, zlib.error) as e:
+            print(f"Search index unreadable, rebuilding: {e}")
+            return False
+        if data.get('version') != INDEX_VERSION or len(data['pages']) != len(self.slots):
+            return False
+        for page_id, (words, boxes) in zip(self.slots, data['pages']):
+            self._store(page_id, words, array('f', base64.b64decode(boxes)))
+        os.utime(self._path(key))
+        return True
+
+    def _prune(self):
+        files = [os.path.join(SEARCH_INDEX_DIR, name) for name in os.listdir(SEARCH_INDEX_DIR) if name.endswith(".idx")]
+        if len(files) <= KEEP_INDEXES:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - KEEP_INDEXES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
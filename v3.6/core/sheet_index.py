@@ -0,0 +1,169 @@
+import csv
+import json
+import os
+import time
+import fitz  # PyMuPDF
+from config.settings import SHEET_REGIONS_FILE
+from core.workers import get_process_pool, default_worker_count
+
+# Title-block fields of a drawing set: name -> region as fractions of the page as shown
+# (x0, y0, x1, y1, 0..1), so one definition fits every sheet size and orientation
+DEFAULT_FIELDS = [["도면번호", None], ["도면명", None], ["리비전", None]]
+
+# Drawing pages are heavy to interpret; smaller chunks than the text export keep the workers even
+SHEET_CHUNK = 50
+IN_FLIGHT_PER_WORKER = 2
+# Only the characters are needed: no images; characters outside the clip are dropped
+CLIP_FLAGS = fitz.TEXT_MEDIABOX_CLIP
+
+
+def load_fields():
+    """The saved title-block fields, or the defaults (no regions yet)."""
+    try:
+        with open(SHEET_REGIONS_FILE, "r", encoding="utf-8") as f:
+            fields = json.load(f)
+        if isinstance(fields, list) and all(len(item) == 2 for item in fields):
+            return fields
+    except (OSError, ValueError):
+        pass
+    return [list(item) for item in DEFAULT_FIELDS]
+
+
+def save_fields(fields):
+    os.makedirs(os.path.dirname(SHEET_REGIONS_FILE), exist_ok=True)
+    with open(SHEET_REGIONS_FILE, "w", encoding="utf-8") as f:
+        json.dump(fields, f, ensure_ascii=False, indent=2)
+
+
+def clip_rect(page, region):
+    """A region (fractions of the page as shown) in unrotated page space, where text is extracted."""
+    r = page.rect
+    shown = fitz.Rect(r.x0 + region[0] * r.width, r.y0 + region[1] * r.height,
+                      r.x0 + region[2] * r.width, r.y0 + region[3] * r.height)
+    return shown * page.derotation_matrix
+
+
+def read_title_block(page, fields):
+    """Text of each field on one page. The text page is built for the title block only (clip=),
+    so the rest of the sheet never becomes text; each field is then cut from it."""
+    rects = [clip_rect(page, region) for name, region in fields]
+    area = fitz.Rect(rects[0])
+    for r in rects[1:]:
+        area |= r
+    textpage = page.get_textpage(clip=area, flags=CLIP_FLAGS)
+    return [" ".join(textpage.extractTextbox(r).split()) for r in rects]
+
+
+def read_sheets(path, indices, fields):
+    """Runs in a worker process: [[field texts]] for pages of a file."""
+    out = []
+    with fitz.open(path) as doc:
+        for i in indices:
+            try:
+                out.append(read_title_block(doc[i], fields))
+            except Exception as e:
+                print(f"Title block failed on page {i + 1}: {e}")
+                out.append([""] * len(fields))
+    return out
+
+
+def write_csv(path, fields, rows):
+    """rows: [(page number, [field texts])]. UTF-8 with BOM so Excel shows Korean correctly."""
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["페이지"] + [name for name, region in fields])
+        for number, values in rows:
+            writer.writerow([number] + values)
+
+
+def toc_entries(rows):
+    """One bookmark per sheet: drawing number and title (the first two fields)."""
+    toc = []
+    for number, values in rows:
+        title = " ".join(v for v in values[:2] if v)
+        toc.append([1, title or f"{number} 페이지", number])
+    return toc
+
+
+class SheetIndexJob:
+    """Reads the title block of every page of a drawing set.
+
+    Same scheme as core.text_export: pages of the file as opened go to the
+    'text' worker pool in chunks (a bounded number in flight), pages that
+    exist only in memory are read here in short slices by pump(). The result
+    is rows: [(page number, [field texts])] in page order.
+    """
+
+    def __init__(self, engine, fields):
+        self.engine = engine
+        self.fields = [(name, tuple(region)) for name, region in fields if region]
+        self.count = len(engine.doc)
+        self.serial = engine.change_serial
+        self._results = [None] * self.count
+        self._next = 0
+        self._done = 0
+        self._futures = []
+        self.seconds = 0.0
+        self._started = time.perf_counter()
+        doc = engine.doc
+        self.source = None
+        if not (engine.is_virtual or engine.memory_backed or engine.changes) and os.path.exists(doc.name):
+            self.source = doc.name
+
+    def pump(self, budget_seconds=0.04):
+        """Moves the job forward. Called from the UI loop; True while work remains."""
+        t0 = time.perf_counter()
+        if self.source:
+            running = []
+            for future in self._futures:
+                if not future.done():
+                    running.append(future)
+                    continue
+                try:
+                    values = future.result()
+                except Exception as e:
+                    print(f"Title block worker failed: {e}")
+                    values = [[""] * len(self.fields)] * future.count
+                self._results[future.start:future.start + len(values)] = values
+                self._done += len(values)
+            self._futures = running
+            limit = default_worker_count() * IN_FLIGHT_PER_WORKER
+            pool = get_process_pool("text")
+            while self._next < self.count and len(self._futures) < limit:
+                indices = list(range(self._next, min(self.count, self._next + SHEET_CHUNK)))
+                future = pool.submit(read_sheets, self.source, indices, self.fields)
+                future.start, future.count = self._next, len(indices)
+                self._futures.append(future)
+                self._next += len(indices)
+        else:
+            doc = self.engine.doc
+            if doc is None or self.engine.change_serial != self.serial:
+                self.cancel()
+                raise RuntimeError("목록을 만드는 동안 문서가 변경되어 중단했습니다.")
+            while self._next < self.count and time.perf_counter() - t0 < budget_seconds:
+                try:
+                    self._results[self._next] = read_title_block(doc[self._next], self.fields)
+                except Exception as e:
+                    print(f"Title block failed on page {self._next + 1}: {e}")
+                    self._results[self._next] = [""] * len(self.fields)
+                self._next += 1
+                self._done += 1
+        if self._done < self.count:
+            return True
+        if self._started is not None:
+            self.seconds = time.perf_counter() - self._started
+            self._started = None
+            print(f"[timing] sheet index: {self.count} pages, {len(self.fields)} fields, {self.seconds:.2f}s")
+        return False
+
+    def progress(self):
+        return self._done, self.count
+
+    @property
+    def rows(self):
+        return [(i + 1, values) for i, values in enumerate(self._results)]
+
+    def cancel(self):
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
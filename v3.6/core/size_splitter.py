@@ -0,0 +1,303 @@
+import os
+import re
+import tempfile
+import threading
+import time
+import fitz  # PyMuPDF
+from core.workers import get_process_pool
+from core.virtual_document import build_from_plan
+
+# Object references inside a PDF object definition, e.g. "12 0 R"
+_REF_RE = re.compile(r"(\d+) 0 R")
+# Back-references we must not follow, otherwise one page would "own" the whole page tree / outline
+_BACKREF_RE = re.compile(r"/(Parent|P|Prev|Next|First|Last)\s*\d+ 0 R")
+_PAGE_TYPE_RE = re.compile(r"/Type\s*/Pages?\b")
+
+# Rough per-object overhead in the output file (xref entry, "obj/endobj", whitespace)
+OBJECT_OVERHEAD = 40
+# Fixed per-file overhead (header, catalog, page tree, trailer)
+FILE_OVERHEAD = 2048
+
+
+class PageSizeEstimator:
+    """Estimates how many bytes each page contributes to a file.
+
+    A page's contribution is the size of every object reachable from it
+    (contents, fonts, images, XObjects, annotations). Objects shared by
+    several pages (fonts, logos) are only counted once per part.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._sizes = {}   # xref -> bytes
+        self._refs = {}    # xref -> [child xrefs]
+        self._is_page = {}  # xref -> bool
+
+    def _load(self, xref):
+        try:
+            obj = self.doc.xref_object(xref, compressed=True)
+        except Exception:
+            obj = ""
+        self._is_page[xref] = bool(_PAGE_TYPE_RE.search(obj))
+
+        size = len(obj) + OBJECT_OVERHEAD
+        if self.doc.xref_is_stream(xref):
+            # Use /Length instead of reading the stream, so huge images are never loaded
+            kind, value = self.doc.xref_get_key(xref, "Length")
+            if kind == "int":
+                size += int(value)
+            elif kind == "xref":
+                try:
+                    size += int(self.doc.xref_object(int(value.split()[0])).strip())
+                except (ValueError, IndexError):
+                    pass
+        self._sizes[xref] = size
+
+        children = _REF_RE.findall(_BACKREF_RE.sub("", obj))
+        self._refs[xref] = [int(c) for c in children]
+
+    def page_objects(self, page_index):
+        """Returns the set of xrefs reachable from a page."""
+        root = self.doc.page_xref(page_index)
+        seen = set()
+        stack = [root]
+        while stack:
+            xref = stack.pop()
+            if xref in seen or xref <= 0:
+                continue
+            if xref not in self._sizes:
+                self._load(xref)
+            # Do not walk into other pages (links, /Dest arrays)
+            if xref != root and self._is_page[xref]:
+                continue
+            seen.add(xref)
+            stack.extend(self._refs[xref])
+        return seen
+
+    def object_size(self, xref):
+        if xref not in self._sizes:
+            self._load(xref)
+        return self._sizes[xref]
+
+
+class SizeSplitter:
+    """Splits a document into page ranges whose saved size stays under a byte limit.
+
+    Boundaries come from the object-size estimate; only a handful of trial
+    in-memory saves per part are used to correct them.
+    """
+
+    def __init__(self, doc, max_bytes, max_trials=6, progress_callback=None):
+        self.doc = doc
+        self.max_bytes = int(max_bytes)
+        self.max_trials = max_trials
+        self.progress_callback = progress_callback
+        self.estimator = PageSizeEstimator(doc)
+        self.ratio = 1.0  # actual / estimated object bytes, calibrated from trial saves
+        self.trial_count = 0
+        self._measured = {}  # (start, end) -> saved size, so no range is saved twice
+        self._fitting = {}   # (start, end) -> data of trials under the limit, for the current part
+        self._last_trial = (None, None, b"")
+
+    def _report(self, done, message):
+        if self.progress_callback:
+            self.progress_callback(done, len(self.doc), message)
+
+    def _predict(self, object_bytes):
+        return FILE_OVERHEAD + object_bytes * self.ratio
+
+    def _prefix_estimates(self, start, budget):
+        """Walks pages from start, returning cumulative object bytes until budget is exceeded."""
+        objs = set()
+        total = 0
+        estimates = []
+        for pno in range(start, len(self.doc)):
+            new = self.estimator.page_objects(pno) - objs
+            added = sum(self.estimator.object_size(x) for x in new)
+            if estimates and self._predict(total + added) > budget:
+                break
+            objs |= new
+            total += added
+            estimates.append(total)
+        return estimates
+
+    def _subset_bytes(self, start, end):
+        sub = fitz.open()
+        try:
+            sub.insert_pdf(self.doc, from_page=start, to_page=end)
+            return sub.tobytes(deflate=True, garbage=0)
+        finally:
+            sub.close()
+
+    def _trial(self, start, end):
+        if (start, end) in self._measured:
+            return self._measured[(start, end)]
+        self.trial_count += 1
+        data = self._subset_bytes(start, end)
+        self._measured[(start, end)] = len(data)
+        self._last_trial = (start, end, data)
+        if len(data) <= self.max_bytes:
+            self._fitting[(start, end)] = data
+        return len(data)
+
+    def _part_data(self, start, end):
+        """Returns the serialized range, reusing a trial save when one exists."""
+        if (start, end) in self._fitting:
+            return self._fitting[(start, end)]
+        if self._last_trial[:2] == (start, end):
+            return self._last_trial[2]
+        self._measured.pop((start, end), None)
+        self._trial(start, end)
+        return self._last_trial[2]
+
+    def iter_parts(self):
+        """Yields (part, data) per part; data is the serialized part from the last trial save.
+
+        part is a dict: {'start', 'end', 'size', 'oversize'}.
+        """
+        start = 0
+        page_count = len(self.doc)
+        while start < page_count:
+            self._report(start, f"분할 지점 계산 중... ({start + 1}/{page_count})")
+            self._fitting = {}
+            estimates = self._prefix_estimates(start, self.max_bytes)
+            end = start + len(estimates) - 1
+
+            size = self._trial(start, end)
+            self.ratio = max(0.001, (size - FILE_OVERHEAD) / float(max(1, estimates[-1])))
+
+            if size < self.max_bytes * 0.85 and end < page_count - 1:
+                # Underfilled because the estimate was pessimistic: retry once with the calibrated ratio
+                longer = self._prefix_estimates(start, self.max_bytes)
+                if len(longer) > len(estimates):
+                    if self._trial(start, start + len(longer) - 1) <= self.max_bytes:
+                        estimates = longer
+                        end = start + len(longer) - 1
+
+            if size > self.max_bytes and end > start:
+                # Overshoot: search the largest range that still fits,
+                # starting near the calibrated estimate instead of the midpoint
+                guess = start
+                for k, est in enumerate(estimates):
+                    if self._predict(est) <= self.max_bytes:
+                        guess = start + k
+                best_end = None
+                # end itself was just measured and did not fit
+                lo, hi = start, end - 1
+                mid = min(guess, hi)
+                trials = 0
+                while lo <= hi and trials < self.max_trials:
+                    trials += 1
+                    if self._trial(start, mid) <= self.max_bytes:
+                        best_end = mid
+                        lo = mid + 1
+                    else:
+                        hi = mid - 1
+                    mid = (lo + hi) // 2
+                end = best_end if best_end is not None else start
+
+            data = self._part_data(start, end)
+            part = {
+                'start': start,
+                'end': end,
+                'size': len(data),
+                'oversize': len(data) > self.max_bytes,
+            }
+            yield part, data
+            start = end + 1
+
+        self._report(page_count, "분할 계산 완료")
+
+
+def split_by_size(doc, max_bytes, output_base, progress_callback=None, max_trials=6):
+    """Writes output_base_partNN.pdf files, each at most max_bytes where possible.
+
+    Returns (parts, stats). Each part dict gets a 'path' key; a page that is
+    larger than the limit on its own ends up alone in a part marked 'oversize'.
+    """
+    t0 = time.perf_counter()
+    splitter = SizeSplitter(doc, max_bytes, max_trials=max_trials, progress_callback=progress_callback)
+
+    parts = []
+    for n, (part, data) in enumerate(splitter.iter_parts(), start=1):
+        path = f"{output_base}_part{n:02d}.pdf"
+        with open(path, "wb") as f:
+            f.write(data)
+        part['path'] = path
+        parts.append(part)
+
+    stats = {
+        'parts': len(parts),
+        'trial_saves': splitter.trial_count,
+        'seconds': time.perf_counter() - t0,
+    }
+    return parts, stats
+
+
+def split_file_worker(source_path, plan, max_bytes, output_base):
+    """Runs in a worker process: splits a file (or a reference-assembled plan) with split_by_size."""
+    if plan is not None:
+        with build_from_plan(plan) as doc:
+            return split_by_size(doc, max_bytes, output_base)
+    with fitz.open(source_path) as doc:
+        return split_by_size(doc, max_bytes, output_base)
+
+
+class SizeSplitJob:
+    """One split by size in progress: snapshot on the caller's thread, trial saves in a worker process.
+
+    Like BackgroundSave, an unmodified file is split straight from disk, a
+    reference-assembled document is sent as its save plan, and anything else
+    is snapshotted to a temporary file first, so the UI keeps running while
+    the parts are measured and written.
+    """
+
+    def __init__(self, doc, max_bytes, output_base, source_path=None):
+        self.max_bytes = int(max_bytes)
+        self.output_base = output_base
+        self.started = time.perf_counter()
+        self.result = None # (parts, stats) when done
+        self.error = None
+        self._done = threading.Event()
+
+        self._source_path = source_path
+        self._snapshot = None
+        self._plan = None
+        if source_path is None:
+            if hasattr(doc, 'save_plan'):
+                self._plan = doc.save_plan()
+            else:
+                self._snapshot = doc.tobytes(garbage=0, deflate=False)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        snapshot_path = None
+        try:
+            source_path = self._source_path
+            if self._snapshot is not None:
+                fd, snapshot_path = tempfile.mkstemp(prefix="kunhwa_split_", suffix=".pdf")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(self._snapshot)
+                self._snapshot = None
+                source_path = snapshot_path
+            future = get_process_pool("save", max_workers=1).submit(
+                split_file_worker, source_path, self._plan, self.max_bytes, self.output_base)
+            self._plan = None
+            self.result = future.result()
+        except Exception as e:
+            self.error = e
+        finally:
+            if snapshot_path and os.path.exists(snapshot_path):
+                try:
+                    os.remove(snapshot_path)
+                except OSError:
+                    pass
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
@@ -0,0 +1,201 @@
+import os
+import tempfile
+import threading
+import time
+import fitz  # PyMuPDF
+from core.render_profiles import render_page, RENDER_DEFAULT
+from core.thumb_store import ThumbnailStore
+from core.workers import get_process_pool
+from core.local_copy import LocalCopy
+
+# Thumbnails per worker task: small enough that the first ones arrive quickly
+THUMB_CHUNK = 12
+
+
+def probe_file(path, fit_box, thumb_scale):
+    """Runs in a worker process: opens (and repairs) path, renders page 1 and measures every page.
+
+    fit_box is the preview area (width, height); page 1 is rendered to fit it.
+    A damaged file is repaired here instead of on the UI thread, and the
+    repaired copy is written to a temporary file for the UI to open.
+    Returns {'pages', 'needs_pass', 'repaired_path', 'first', 'first_scale', 'sizes', 'seconds'}.
+    """
+    t0 = time.perf_counter()
+    result = {'pages': 0, 'needs_pass': False, 'repaired_path': None, 'first': None,
+              'first_scale': 1.0, 'sizes': [], 'seconds': 0.0}
+    with fitz.open(path) as doc:
+        if doc.needs_pass:
+            result['needs_pass'] = True
+            return result
+        result['pages'] = len(doc)
+        if doc.is_repaired:
+            fd, tmp_path = tempfile.mkstemp(prefix="kunhwa_repaired_", suffix=".pdf")
+            os.close(fd)
+            doc.save(tmp_path, garbage=0)
+            result['repaired_path'] = tmp_path
+        if len(doc):
+            r = doc[0].rect
+            scale = min(fit_box[0] / r.width, fit_box[1] / r.height)
+            if scale <= 0:
+                scale = 1.0
+            img = render_page(doc[0], scale, RENDER_DEFAULT)
+            result['first'] = (img.mode, img.size, img.tobytes())
+            result['first_scale'] = scale
+        # Thumbnail placeholders need every page's size; loading pages is the slow part of a large open
+        matrix = fitz.Matrix(thumb_scale, thumb_scale)
+        for page in doc:
+            r = (page.rect * matrix).irect
+            result['sizes'].append((r.width, r.height))
+    result['seconds'] = time.perf_counter() - t0
+    return result
+
+
+def render_thumbnails(path, indices, scale, profile):
+    """Runs in a worker process: returns [(index, ThumbnailStore entry)] for pages of an unchanged file."""
+    store = ThumbnailStore()
+    with fitz.open(path) as doc:
+        for i in indices:
+            store.put(i, render_page(doc[i], scale, profile))
+    return list(store.entries.items())
+
+
+class StagedOpen:
+    """One document being opened in stages, polled from the UI thread.
+
+    0. copy (network files, see core.local_copy): sequential copy to a local file in a thread
+    1. probe: open/repair, first page and page sizes in the 'open' worker
+    2. the UI shows page 1 and opens the (now known good) file itself
+    3. thumbnails: rendered in chunks by the 'render' pool and streamed back
+
+    Times are kept in timings (seconds since start) for the time-to-first-page report.
+    """
+
+    def __init__(self, path, fit_box, thumb_scale, thumb_profile, copy_local=False):
+        self.path = path
+        self.fit_box = fit_box
+        self.thumb_scale = thumb_scale
+        self.thumb_profile = thumb_profile
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.info = None
+        self.serial = None # engine change serial the thumbnails are valid for
+        self._thumb_futures = []
+        self.local_copy = None
+        self.copy_progress = (0, 0) # (done, total) bytes while copying
+        self._copy_error = None
+        self._closed = False
+        self.probe = None
+        if copy_local:
+            threading.Thread(target=self._copy, daemon=True).start()
+        else:
+            self._start_probe(path)
+
+    @property
+    def source(self):
+        """The file workers read: the local copy of a network file, or the file itself."""
+        return self.local_copy.local_path if self.local_copy else self.path
+
+    def _start_probe(self, path):
+        self.probe = get_process_pool("open", max_workers=1).submit(probe_file, path, self.fit_box, self.thumb_scale)
+
+    def _copy(self):
+        try:
+            copy = LocalCopy.create(self.path, self._copy_progressed)
+        except Exception as e:
+            self._copy_error = e
+            return
+        if self._closed:
+            copy.remove()
+            return
+        self.local_copy = copy
+        self.mark('copy')
+        self._start_probe(copy.local_path)
+
+    def _copy_progressed(self, done, total):
+        self.copy_progress = (done, total)
+
+    @property
+    def copying(self):
+        return self.probe is None and self._copy_error is None
+
+    def probe_done(self):
+        return self._copy_error is not None or (self.probe is not None and self.probe.done())
+
+    def take_local_copy(self):
+        """Hands the local copy to the engine (it is no longer removed by close())."""
+        copy, self.local_copy = self.local_copy, None
+        return copy
+
+    def mark(self, stage):
+        self.timings[stage] = time.perf_counter() - self.started
+        return self.timings[stage]
+
+    def probe_result(self):
+        """The probe dict (raises what the worker raised)."""
+        if self._copy_error is not None:
+            raise self._copy_error
+        if self.info is None:
+            self.info = self.probe.result()
+            self.mark('probe')
+        return self.info
+
+    def start_thumbnails(self, indices, serial):
+        self.serial = serial
+        source = self.info['repaired_path'] or self.source
+        pool = get_process_pool("render")
+        for k in range(0, len(indices), THUMB_CHUNK):
+            self._thumb_futures.append(pool.submit(render_thumbnails, source, indices[k:k + THUMB_CHUNK],
+                                                   self.thumb_scale, self.thumb_profile))
+
+    def collect(self):
+        """Returns the thumbnails finished since the last call as [(index, entry)]."""
+        entries = []
+        pending = []
+        for future in self._thumb_futures:
+            if not future.done():
+                pending.append(future)
+                continue
+            try:
+                entries.extend(future.result())
+            except Exception as e:
+                print(f"Thumbnail worker failed: {e}")
+        self._thumb_futures = pending
+        return entries
+
+    @property
+    def thumbnails_done(self):
+        return not self._thumb_futures
+
+    def cancel(self):
+        for future in self._thumb_futures:
+            future.cancel()
+        self._thumb_futures = []
+
+    def close(self):
+        """Cancels outstanding work and removes the repaired copy (and a local copy nobody took)."""
+        self._closed = True
+        self.cancel()
+        if self.local_copy:
+            self.take_local_copy().remove()
+        if self.probe is None:
+            return # still copying (the copy thread cleans up) or the copy failed
+        if self.info is None:
+            # Closed while probing: clean up whenever the probe finishes
+            self.probe.cancel()
+            self.probe.add_done_callback(_discard_probe)
+        else:
+            _remove_repaired(self.info)
+
+
+def _remove_repaired(info):
+    path = info and info['repaired_path']
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass # still open in a worker (Windows); left for the temp cleaner
+
+
+def _discard_probe(future):
+    if not future.cancelled() and future.exception() is None:
+        _remove_repaired(future.result())
@@ -0,0 +1,198 @@
+import atexit
+import hashlib
+import json
+import os
+import time
+import zlib
+from config.settings import THUMB_CACHE_DIR, THUMB_CACHE_MB
+
+INDEX_VERSION = 1
+# After eviction the cache is trimmed to this fraction of the budget, so it does not evict on every put
+EVICT_TO = 0.75
+# The pack is rewritten once dead records (evicted, replaced) exceed this fraction of live bytes
+COMPACT_SLACK = 0.5
+
+
+class ThumbnailDiskCache:
+    """Per-user disk cache of rendered thumbnails, shared by all windows.
+
+    Thumbnails are stored exactly as ThumbnailStore keeps them (zlib-compressed
+    pixels) and appended to one pack file; a JSON index maps each key to
+    (offset, length, mode, width, height, crc, last used). Keys combine the
+    file content, the page object, scale and render profile (see
+    PDFEngine.thumbnail_key), so a renamed or copied file still hits.
+    When the pack exceeds the budget the least recently used entries are
+    dropped and the pack is compacted.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ThumbnailDiskCache, cls).__new__(cls)
+            cls._instance._init(THUMB_CACHE_DIR, THUMB_CACHE_MB * 1024 * 1024)
+            atexit.register(cls._instance.flush)
+        return cls._instance
+
+    def _init(self, directory, budget_bytes):
+        self.directory = directory
+        self.pack_path = os.path.join(directory, "thumbs.pack")
+        self.index_path = os.path.join(directory, "thumbs.json")
+        self.budget_bytes = budget_bytes
+        self.index = {} # key -> [offset, length, mode, width, height, crc, last_used]
+        self.live_bytes = 0
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._pack = None
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self.index = data['entries']
+                self.live_bytes = sum(rec[1] for rec in self.index.values())
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Thumbnail cache index unreadable, starting empty: {e}")
+
+    @staticmethod
+    def make_key(page_key, scale, profile):
+        return hashlib.sha1(f"{page_key}|{scale:.3f}|{profile}".encode("utf-8")).hexdigest()
+
+    def _open_pack(self):
+        if self._pack is None:
+            os.makedirs(self.directory, exist_ok=True)
+            # Append mode: every write goes to the end, reads can seek anywhere
+            self._pack = open(self.pack_path, "a+b")
+        return self._pack
+
+    def get(self, page_key, scale, profile):
+        """Returns a stored entry (mode, (width, height), compressed bytes) or None."""
+        key = self.make_key(page_key, scale, profile)
+        rec = self.index.get(key)
+        if rec is None:
+            self.misses += 1
+            return None
+        offset, length, mode, width, height, crc = rec[:6]
+        try:
+            f = self._open_pack()
+            f.seek(offset)
+            data = f.read(length)
+        except OSError as e:
+            print(f"Thumbnail cache read failed: {e}")
+            data = b""
+        if len(data) != length or zlib.crc32(data) != crc:
+            # Pack rewritten by another editor process, or truncated
+            self._forget(key)
+            self.misses += 1
+            return None
+        rec[6] = time.time()
+        self.dirty = True
+        self.hits += 1
+        return (mode, (width, height), data)
+
+    def put(self, page_key, scale, profile, entry):
+        """Stores a ThumbnailStore entry (mode, (width, height), compressed bytes)."""
+        key = self.make_key(page_key, scale, profile)
+        mode, (width, height), data = entry
+        try:
+            f = self._open_pack()
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            f.write(data)
+        except OSError as e:
+            print(f"Thumbnail cache write failed: {e}")
+            return
+        self._forget(key)
+        self.index[key] = [offset, len(data), mode, width, height, zlib.crc32(data), time.time()]
+        self.live_bytes += len(data)
+        self.dirty = True
+        if self.live_bytes > self.budget_bytes:
+            self.evict()
+
+    def _forget(self, key):
+        rec = self.index.pop(key, None)
+        if rec:
+            self.live_bytes -= rec[1]
+            self.dirty = True
+
+    def evict(self):
+        """Drops least recently used entries down to EVICT_TO of the budget and compacts the pack."""
+        target = self.budget_bytes * EVICT_TO
+        for key, rec in sorted(self.index.items(), key=lambda item: item[1][6]):
+            if self.live_bytes <= target:
+                break
+            self._forget(key)
+        self.compact()
+
+    def compact(self):
+        """Rewrites the pack with live records only. Returns True if it was rewritten."""
+        if self._pack is None and not os.path.exists(self.pack_path):
+            return False
+        t0 = time.perf_counter()
+        tmp_path = self.pack_path + ".tmp"
+        offsets = {}
+        try:
+            src = self._open_pack()
+            src.flush()
+            with open(tmp_path, "wb") as out:
+                for key, rec in sorted(self.index.items(), key=lambda item: item[1][0]):
+                    src.seek(rec[0])
+                    offsets[key] = out.tell()
+                    out.write(src.read(rec[1]))
+            src.close()
+            self._pack = None
+            os.replace(tmp_path, self.pack_path)
+        except OSError as e:
+            # e.g. another editor process has the pack open (Windows); the old pack stays valid
+            print(f"Thumbnail cache compaction skipped: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        for key, offset in offsets.items():
+            self.index[key][0] = offset
+        self.dirty = True
+        self.flush()
+        print(f"[timing] thumbnail cache: compacted to {len(self.index)} entries, "
+              f"{self.live_bytes / 1024 / 1024:.1f} MB in {time.perf_counter() - t0:.2f}s")
+        return True
+
+    def flush(self):
+        """Writes the index (atomically) if it changed; compacts a pack with too much dead space."""
+        if self._pack is not None:
+            self._pack.flush()
+            pack_size = os.path.getsize(self.pack_path)
+            if pack_size > self.live_bytes * (1 + COMPACT_SLACK) + 1024 * 1024 and self.compact():
+                return
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({'version': INDEX_VERSION, 'entries': self.index}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Thumbnail cache index write failed: {e}")
+
+    def clear(self):
+        if self._pack is not None:
+            self._pack.close()
+            self._pack = None
+        for path in (self.pack_path, self.index_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.index.clear()
+        self.live_bytes = 0
+        self.dirty = False
+
+    def report(self):
+        """{'entries', 'bytes', 'budget', 'hits', 'misses'}"""
+        return {
+            'entries': len(self.index),
+            'bytes': self.live_bytes,
+            'budget': self.budget_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,83 @@
+import zlib
+from PIL import Image, ImageChops
+
+# Thumbnails are mostly white paper and compress very well even at a fast level
+ZLIB_LEVEL = 3
+
+
+def is_monochrome(img):
+    """True if an RGB image has no colour (every pixel has R == G == B)."""
+    if img.mode != "RGB":
+        return img.mode in ("L", "1")
+    r, g, b = img.split()
+    return ImageChops.difference(r, g).getbbox() is None and ImageChops.difference(g, b).getbbox() is None
+
+
+class ThumbnailStore:
+    """Rendered thumbnails kept zlib-compressed (grayscale when the page has no colour).
+
+    The panel decodes an entry into a PhotoImage only while it is on screen.
+    Raw size is what the thumbnail costs as a Tk PhotoImage (4 bytes/pixel).
+    """
+
+    def __init__(self):
+        self.entries = {} # index -> (mode, size, compressed bytes)
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.gray = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def put(self, index, img):
+        if is_monochrome(img):
+            img = img.convert("L")
+        entry = (img.mode, img.size, zlib.compress(img.tobytes(), ZLIB_LEVEL))
+        return self.put_entry(index, entry)
+
+    def put_entry(self, index, entry):
+        """Adds an already compressed (mode, size, bytes) entry, e.g. from the disk cache."""
+        self.discard(index)
+        mode, (width, height), data = entry
+        self.entries[index] = entry
+        self.raw_bytes += width * height * 4
+        self.stored_bytes += len(data)
+        if mode == "L":
+            self.gray += 1
+        return entry
+
+    def get(self, index):
+        """Decodes a stored thumbnail back into a PIL image (None if missing)."""
+        entry = self.entries.get(index)
+        if entry is None:
+            return None
+        mode, size, data = entry
+        return Image.frombytes(mode, size, zlib.decompress(data))
+
+    def size(self, index):
+        entry = self.entries.get(index)
+        return entry[1] if entry else None
+
+    def discard(self, index):
+        entry = self.entries.pop(index, None)
+        if entry:
+            self.raw_bytes -= entry[1][0] * entry[1][1] * 4
+            self.stored_bytes -= len(entry[2])
+            if entry[0] == "L":
+                self.gray -= 1
+
+    def clear(self):
+        self.entries.clear()
+        self.raw_bytes = self.stored_bytes = self.gray = 0
+
+    def report(self):
+        """{'thumbnails', 'gray', 'raw_bytes', 'stored_bytes', 'raw_per_thumb', 'stored_per_thumb'}"""
+        n = len(self.entries)
+        return {
+            'thumbnails': n,
+            'gray': self.gray,
+            'raw_bytes': self.raw_bytes,
+            'stored_bytes': self.stored_bytes,
+            'raw_per_thumb': self.raw_bytes // n if n else 0,
+            'stored_per_thumb': self.stored_bytes // n if n else 0,
+        }
@@ -0,0 +1,191 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import zlib
+
+# In-memory snapshots beyond this total are spilled to disk, oldest first
+UNDO_MEMORY_BUDGET = 256 * 1024 * 1024
+# Spilled snapshots beyond this total are dropped, oldest first
+UNDO_DISK_BUDGET = 2 * 1024 * 1024 * 1024
+# Upper bound on steps even when snapshots are tiny
+UNDO_MAX_STEPS = 100
+# Spill files are written by a background thread; level 1 keeps that cheap
+SPILL_COMPRESS_LEVEL = 1
+
+
+class _State:
+    __slots__ = ("data", "path", "size", "disk_size", "queued", "extras")
+
+    def __init__(self, data, size=None, extras=None):
+        self.data = data # bytes (or a small state object) while in memory
+        self.extras = extras or {} # small per-state values of other components; never spilled
+        self.path = None # spill file once written
+        self.size = len(data) if size is None else size
+        self.disk_size = 0
+        self.queued = False # handed to the spill thread
+
+
+class UndoHistory:
+    """Undo snapshots (PDF bytes) governed by byte budgets instead of a fixed count.
+
+    The newest snapshots stay in memory. When they exceed memory_budget the
+    oldest are compressed to temporary files by a background thread and read
+    back lazily on undo. When spilled files exceed disk_budget the oldest
+    states are dropped. Supports len() / clear() like the list it replaces.
+    """
+
+    def __init__(self, memory_budget=UNDO_MEMORY_BUDGET, disk_budget=UNDO_DISK_BUDGET, max_steps=UNDO_MAX_STEPS):
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.max_steps = max_steps
+        self._states = []
+        self._lock = threading.Lock()
+        self._dir = None
+        self._seq = 0
+        self._spill_queue = queue.Queue()
+        self._spiller = None
+
+    def __len__(self):
+        return len(self._states)
+
+    @property
+    def memory_bytes(self):
+        with self._lock:
+            return sum(s.size for s in self._states if s.data is not None)
+
+    @property
+    def disk_bytes(self):
+        with self._lock:
+            return sum(s.disk_size for s in self._states if s.path)
+
+    def report(self):
+        """{'depth', 'memory_bytes', 'disk_bytes', 'spilled'} for the status bar."""
+        with self._lock:
+            return {
+                'depth': len(self._states),
+                'memory_bytes': sum(s.size for s in self._states if s.data is not None),
+                'disk_bytes': sum(s.disk_size for s in self._states if s.path),
+                'spilled': sum(1 for s in self._states if s.data is None),
+            }
+
+    def push(self, data, size=None, extras=None):
+        """Adds a state. Only bytes are spilled; other objects (e.g. a virtual
+        document's page list) stay in memory and count as size bytes. extras
+        ({name: value}) is handed back by pop(with_extras=True)."""
+        state = _State(data, size, extras)
+        with self._lock:
+            self._states.append(state)
+            while len(self._states) > self.max_steps:
+                self._drop(self._states.pop(0))
+            in_memory = sum(s.size for s in self._states if s.data is not None and not s.queued)
+            queued = self._pick_spill(in_memory - self.memory_budget)
+        for s in queued:
+            self._spill(s)
+
+    def spill(self, needed):
+        """Moves the oldest in-memory snapshots to disk (memory pressure). Returns the bytes handed off."""
+        with self._lock:
+            queued = self._pick_spill(needed)
+        for s in queued:
+            self._spill(s)
+        return sum(s.size for s in queued)
+
+    def _pick_spill(self, needed):
+        # Oldest first; the newest state stays in memory (it is the next one undone)
+        queued = []
+        for s in self._states[:-1]:
+            if needed <= 0:
+                break
+            if isinstance(s.data, bytes) and not s.queued:
+                s.queued = True
+                needed -= s.size
+                queued.append(s)
+        return queued
+
+    def pop(self, with_extras=False):
+        """Removes the newest state and returns its bytes (None if empty), or (bytes, extras)."""
+        with self._lock:
+            if not self._states:
+                return (None, {}) if with_extras else None
+            state = self._states.pop()
+            data = state.data
+        if data is None:
+            with open(state.path, "rb") as f:
+                data = zlib.decompress(f.read())
+        extras = state.extras
+        self._drop(state)
+        return (data, extras) if with_extras else data
+
+    def extras(self, name):
+        """The extras stored under name by the states still held, oldest first."""
+        with self._lock:
+            return [s.extras[name] for s in self._states if name in s.extras]
+
+    def clear(self):
+        with self._lock:
+            states, self._states = self._states, []
+        for s in states:
+            self._drop(s)
+
+    def close(self):
+        """Clears the history and removes the spill directory."""
+        self.clear()
+        if self._spiller:
+            self._spill_queue.put(None)
+            self._spiller.join(timeout=5)
+            self._spiller = None
+        if self._dir:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def _spill(self, state):
+        if self._spiller is None:
+            self._dir = tempfile.mkdtemp(prefix="kunhwa_undo_")
+            self._spiller = threading.Thread(target=self._run_spiller, daemon=True)
+            self._spiller.start()
+        self._spill_queue.put(state)
+
+    def _run_spiller(self):
+        while True:
+            state = self._spill_queue.get()
+            if state is None:
+                return
+            data = state.data
+            if data is None:
+                continue # already dropped or popped
+            try:
+                packed = zlib.compress(data, SPILL_COMPRESS_LEVEL)
+                self._seq += 1
+                path = os.path.join(self._dir, f"undo_{self._seq:05d}.z")
+                with open(path, "wb") as f:
+                    f.write(packed)
+            except Exception as e:
+                print(f"Undo spill failed: {e}")
+                state.queued = False # stays in memory
+                continue
+
+            with self._lock:
+                if state not in self._states:
+                    os.remove(path) # undone or dropped while compressing
+                    continue
+                state.path = path
+                state.disk_size = len(packed)
+                state.data = None
+                # Keep the spilled states within the disk budget
+                while self._states and sum(s.disk_size for s in self._states if s.path) > self.disk_budget:
+                    oldest = self._states.pop(0)
+                    self._remove_file(oldest)
+
+    def _drop(self, state):
+        state.data = None
+        self._remove_file(state)
+
+    def _remove_file(self, state):
+        if state.path:
+            try:
+                os.remove(state.path)
+            except OSError:
+                pass
+            state.path = None
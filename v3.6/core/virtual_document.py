@@ -0,0 +1,360 @@
+import os
+import time
+from collections import namedtuple
+import fitz  # PyMuPDF
+from core.merge_engine import PrefetchLoader, open_source, insert_page_runs, fidelity_options, FIDELITY_FULL
+from core.zip_sources import is_member_path, split_member, read_member
+
+# One output page: page pno of source, shown with an absolute rotation.
+# Refs are immutable, so undo snapshots are just copies of the list.
+PageRef = namedtuple("PageRef", "source pno rotation fidelity")
+
+
+def _file_stat(path):
+    """(size, mtime_ns) of a file, or of the archive holding a member; None if it is gone."""
+    if is_member_path(path):
+        path = split_member(path)[0]
+    try:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    except OSError:
+        return None
+
+
+class Source:
+    """A read-only document that virtual pages point into.
+
+    Sources are shared between windows (drag/paste copies refs, not pages)
+    and are closed by garbage collection once no document or undo snapshot
+    refers to them.
+    """
+
+    def __init__(self, doc, label, path=None):
+        self.doc = doc
+        self.label = label # file name, for reports
+        self.path = path # file (or archive member) the document was read from, if any
+        self.stat = _file_stat(path) if path else None
+
+    def save_input(self):
+        """What a worker process opens to read this source: the file while it is unchanged
+        on disk, else the document's bytes (as read, or written out for the scratch document)."""
+        if self.path and self.stat and _file_stat(self.path) == self.stat:
+            return self.path
+        if isinstance(getattr(self.doc, 'stream', None), bytes):
+            return self.doc.stream
+        return self.doc.tobytes(garbage=0, deflate=False)
+
+
+def _runs(refs):
+    """Groups refs into [source, first pno, last pno, fidelity] runs of consecutive pages."""
+    runs = []
+    for ref in refs:
+        last = runs[-1] if runs else None
+        if last and last[0] is ref.source and last[3] == ref.fidelity and ref.pno == last[2] + 1:
+            last[2] = ref.pno
+        else:
+            runs.append([ref.source, ref.pno, ref.pno, ref.fidelity])
+    return runs
+
+
+def _last_runs(runs):
+    """Indices of the last run of each source: only there may insert_pdf drop the source's graft map
+    (final=1); earlier runs keep it, so fonts and images the runs share are copied once."""
+    last = {}
+    for i, run in enumerate(runs):
+        last[id(run[0]) if isinstance(run[0], Source) else run[0]] = i
+    return set(last.values())
+
+
+def _open_input(source_input):
+    if isinstance(source_input, bytes):
+        return fitz.open(stream=source_input, filetype="pdf")
+    if is_member_path(source_input):
+        return fitz.open(stream=read_member(source_input), filetype="pdf")
+    return fitz.open(source_input)
+
+
+def build_from_plan(plan):
+    """Builds the PDF described by VirtualDocument.save_plan() (runs in a worker process).
+
+    Returns a new fitz.Document; the sources are closed.
+    """
+    out = fitz.open()
+    sources = {}
+    final = _last_runs(plan['runs'])
+    try:
+        for i, (key, first, last, fidelity) in enumerate(plan['runs']):
+            if key not in sources:
+                sources[key] = _open_input(plan['sources'][key])
+            out.insert_pdf(sources[key], from_page=first, to_page=last, final=int(i in final),
+                           **fidelity_options(fidelity))
+        for page, rotation in zip(out, plan['rotations']):
+            if page.rotation != rotation:
+                page.set_rotation(rotation)
+    finally:
+        for doc in sources.values():
+            doc.close()
+    return out
+
+
+class VirtualPage:
+    """The subset of fitz.Page the editor uses, for a page of a VirtualDocument."""
+
+    def __init__(self, vdoc, index):
+        self.parent = vdoc
+        self.number = index
+        self.ref = vdoc._refs[index]
+        self._page = self.ref.source.doc[self.ref.pno]
+
+    @property
+    def rotation(self):
+        return self.ref.rotation
+
+    @property
+    def _delta(self):
+        return (self.ref.rotation - self._page.rotation) % 360
+
+    @property
+    def rect(self):
+        r = self._page.rect
+        return fitz.Rect(0, 0, r.height, r.width) if self._delta in (90, 270) else r
+
+    def set_rotation(self, rotation):
+        self.ref = self.ref._replace(rotation=rotation % 360)
+        self.parent._refs[self.number] = self.ref
+
+    def get_pixmap(self, matrix=fitz.Identity, **kwargs):
+        # Render straight from the source; an extra rotation stands in for /Rotate
+        if self._delta:
+            matrix = fitz.Matrix(self._delta) * matrix
+        return self._page.get_pixmap(matrix=matrix, **kwargs)
+
+    def get_text(self, *args, **kwargs):
+        return self._page.get_text(*args, **kwargs)
+
+    def get_fonts(self, *args, **kwargs):
+        return self._page.get_fonts(*args, **kwargs)
+
+    def get_textpage(self, *args, **kwargs):
+        return self._page.get_textpage(*args, **kwargs)
+
+    @property
+    def derotation_matrix(self):
+        """This page as shown -> the source page as shown -> the unrotated source page."""
+        m = fitz.Matrix(self._delta)
+        shown = self._page.rect * m
+        to_shown = m * fitz.Matrix(1, 0, 0, 1, -shown.x0, -shown.y0)
+        return ~to_shown * self._page.derotation_matrix
+
+
+class VirtualDocument:
+    """A document held as an ordered list of page references into source documents.
+
+    Move, copy, delete and rotate are list operations and rendering reads
+    from the sources, so assembling a binder from large files is instant and
+    costs no page copies. A real PDF is only built by materialize() - when
+    saving or exporting. Implements the part of the fitz.Document interface
+    the engine and panels use (len, indexing, select, move_page, ...).
+    """
+
+    def __init__(self):
+        self._refs = []
+        # Append-only scratch document for blank pages and pages copied from
+        # documents that may still change (a normal window's live document)
+        self._scratch = None
+        self.is_closed = False
+        self.name = None
+        self.needs_pass = False
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._refs)
+        if not 0 <= index < len(self._refs):
+            raise IndexError("page not in document")
+        return VirtualPage(self, index)
+
+    @property
+    def page_count(self):
+        return len(self._refs)
+
+    @property
+    def sources(self):
+        """Distinct sources in page order."""
+        seen = {}
+        for ref in self._refs:
+            seen.setdefault(id(ref.source), ref.source)
+        return list(seen.values())
+
+    # --- list operations ---
+
+    def snapshot(self):
+        return list(self._refs)
+
+    def restore(self, refs):
+        self._refs = list(refs)
+        self.is_closed = False
+
+    def select(self, order):
+        self._refs = [self._refs[i] for i in order]
+
+    def delete_page(self, index):
+        del self._refs[index]
+
+    def move_page(self, pno, to=-1):
+        """Same meaning as fitz: move page pno in front of page to (-1 = to the end)."""
+        ref = self._refs.pop(pno)
+        if to == -1 or to > len(self._refs):
+            self._refs.append(ref)
+        else:
+            self._refs.insert(to - 1 if to > pno else to, ref)
+
+    def new_page(self, pno=-1, width=595, height=842):
+        scratch = self._scratch_source()
+        scratch.doc.new_page(width=width, height=height)
+        ref = PageRef(scratch, len(scratch.doc) - 1, 0, FIDELITY_FULL)
+        index = len(self._refs) if pno < 0 else pno
+        self._refs.insert(index, ref)
+        return self[index]
+
+    def insert_refs(self, refs, start_at=-1):
+        index = len(self._refs) if start_at < 0 else start_at
+        self._refs[index:index] = refs
+        return len(refs)
+
+    def insert_pages(self, src_doc, page_indices, start_at=-1, fidelity=FIDELITY_FULL):
+        """Adds pages of another document. Pages of a VirtualDocument are shared
+        by reference; pages of a normal (editable) document are copied once into
+        the scratch document, because that document can still change."""
+        if isinstance(src_doc, VirtualDocument):
+            refs = [src_doc._refs[i] for i in page_indices]
+        else:
+            scratch = self._scratch_source()
+            first = len(scratch.doc)
+            insert_page_runs(scratch.doc, src_doc, page_indices, fidelity=fidelity)
+            refs = [PageRef(scratch, pno, scratch.doc[pno].rotation, FIDELITY_FULL)
+                    for pno in range(first, len(scratch.doc))]
+        return self.insert_refs(refs, start_at)
+
+    def add_source(self, doc, label, start_at=-1, fidelity=FIDELITY_FULL, path=None):
+        """References every page of an opened, read-only document (read from path, if given)."""
+        source = Source(doc, label, path)
+        refs = [PageRef(source, pno, doc[pno].rotation, fidelity) for pno in range(len(doc))]
+        return self.insert_refs(refs, start_at)
+
+    def _scratch_source(self):
+        if self._scratch is None:
+            self._scratch = Source(fitz.open(), "scratch")
+        return self._scratch
+
+    # --- output ---
+
+    def materialize(self, page_indices=None):
+        """Builds a real PDF (new fitz.Document) from the refs.
+
+        Consecutive pages of one source are grafted with one insert_pdf call.
+        The graft map of a source is kept until its last run (final=0), so
+        fonts and images shared by its pages are copied once however the
+        pages are ordered.
+        """
+        refs = self._refs if page_indices is None else [self._refs[i] for i in page_indices]
+        out = fitz.open()
+        runs = _runs(refs)
+        final = _last_runs(runs)
+        for i, (source, first, last, fidelity) in enumerate(runs):
+            out.insert_pdf(source.doc, from_page=first, to_page=last, final=int(i in final),
+                           **fidelity_options(fidelity))
+        for page, ref in zip(out, refs):
+            if page.rotation != ref.rotation:
+                page.set_rotation(ref.rotation)
+        return out
+
+    def save_plan(self):
+        """A picklable description of the document for build_from_plan() in a worker process:
+        {'sources': [path or bytes], 'runs': [(source, first, last, fidelity)], 'rotations': [...]}.
+
+        Sources unchanged on disk are passed by path, so nothing is built or
+        serialized here; only the scratch document (pasted and blank pages)
+        is written out.
+        """
+        keys = {}
+        inputs = []
+        runs = []
+        for source, first, last, fidelity in _runs(self._refs):
+            if id(source) not in keys:
+                keys[id(source)] = len(inputs)
+                inputs.append(source.save_input())
+            runs.append((keys[id(source)], first, last, fidelity))
+        return {'sources': inputs, 'runs': runs, 'rotations': [ref.rotation for ref in self._refs]}
+
+    def tobytes(self, **kwargs):
+        with self.materialize() as out:
+            return out.tobytes(**kwargs)
+
+    def save(self, path, **kwargs):
+        with self.materialize() as out:
+            out.save(path, **kwargs)
+
+    def can_save_incrementally(self):
+        return False
+
+    def close(self):
+        # Sources are shared with other windows and undo snapshots; drop our refs only
+        self._refs = []
+        self.is_closed = True
+
+
+def reference_files(vdoc, paths, insert_at=-1, prefetch_depth=2, progress_callback=None, fidelity=FIDELITY_FULL):
+    """Adds the pages of each file to vdoc by reference, in order (the virtual counterpart of merge_files).
+
+    Files are read ahead and validated like a merge, but no pages are copied.
+    Returns a report dict with the same keys as merge_files.
+    """
+    t0 = time.perf_counter()
+    report = {
+        'fidelity': fidelity,
+        'merged': [],
+        'skipped': [],
+        'pages': 0,
+        'seconds': 0.0,
+        'wait_seconds': 0.0,
+        'graft_seconds': 0.0,
+        'virtual': True,
+    }
+    loader = PrefetchLoader(paths, depth=prefetch_depth)
+    loader.start()
+    position = insert_at
+    try:
+        done = 0
+        while True:
+            t_wait = time.perf_counter()
+            item = loader.items.get()
+            report['wait_seconds'] += time.perf_counter() - t_wait
+            if item is None:
+                break
+            done += 1
+            if progress_callback:
+                progress_callback(done, len(paths), os.path.basename(item.path))
+            if item.error:
+                report['skipped'].append((item.path, item.error))
+                continue
+
+            # Small files stay in memory, large ones are read from disk on demand
+            src, error = open_source(item)
+            item.data = None
+            if error:
+                report['skipped'].append((item.path, error))
+                continue
+            pages = vdoc.add_source(src, os.path.basename(item.path), start_at=position, fidelity=fidelity,
+                                    path=item.path)
+            report['merged'].append(item.path)
+            report['pages'] += pages
+            if position != -1:
+                position += pages
+    finally:
+        loader.cancel()
+
+    report['seconds'] = time.perf_counter() - t0
+    return report
@@ -0,0 +1,69 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# PyMuPDF is not thread-safe and holds the GIL while saving/rendering, so heavy
+# MuPDF work that must not freeze the UI runs in worker processes instead.
+
+_lock = threading.Lock()
+_pools = {}
+_sizes = {}          # name -> worker count of the running pool
+_fixed = set()       # pools created with an explicit max_workers (not resized by the profile)
+_worker_count = None # set by the performance profile
+
+
+def default_worker_count():
+    if _worker_count:
+        return _worker_count
+    return max(1, min(8, (os.cpu_count() or 2) - 1))
+
+
+def set_worker_count(count):
+    """Sets the worker count of the pools sized by default and resizes the running ones.
+
+    A running pool of another size is shut down without waiting (work already
+    submitted still finishes in its processes) and started again at the new
+    size, so the next task does not wait for workers to spawn.
+    """
+    global _worker_count
+    _worker_count = max(1, int(count)) if count else None
+    size = default_worker_count()
+    with _lock:
+        resized = [name for name, pool in _pools.items() if name not in _fixed and _sizes[name] != size]
+        for name in resized:
+            _pools.pop(name).shutdown(wait=False)
+    for name in resized:
+        warm_up(name)
+
+
+def get_process_pool(name="default", max_workers=None):
+    """Returns a lazily created, process-wide pool. Separate names get separate pools
+    (e.g. a single-worker 'save' pool so a long save never queues behind indexing)."""
+    with _lock:
+        pool = _pools.get(name)
+        if pool is None:
+            size = max_workers or default_worker_count()
+            pool = ProcessPoolExecutor(max_workers=size)
+            _pools[name] = pool
+            _sizes[name] = size
+            if max_workers:
+                _fixed.add(name)
+        return pool
+
+
+def warm_up(name="default", max_workers=None):
+    """Starts a pool's worker processes ahead of time (a spawned worker takes a moment to import MuPDF)."""
+    get_process_pool(name, max_workers).submit(os.getpid)
+
+
+def shutdown_pools(wait=False):
+    with _lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=wait, cancel_futures=True)
+        _pools.clear()
+        _sizes.clear()
+        _fixed.clear()
+
+
+atexit.register(shutdown_pools)
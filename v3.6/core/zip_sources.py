@@ -0,0 +1,116 @@
+import os
+import zipfile
+
+# Separates the archive from the member in a source path: "D:\deliverables\set.zip|sheets/A-101.pdf".
+# '|' cannot occur in Windows file names, so the split is unambiguous.
+MEMBER_SEP = "|"
+
+
+def is_archive(path):
+    return path.lower().endswith(".zip") and MEMBER_SEP not in path
+
+
+def is_member_path(path):
+    return MEMBER_SEP in path
+
+
+def split_member(path):
+    """(archive path, member name) of a member path."""
+    archive, member = path.split(MEMBER_SEP, 1)
+    return archive, member
+
+
+def member_path(archive, member):
+    return f"{archive}{MEMBER_SEP}{member}"
+
+
+def list_pdf_members(archive):
+    """Member paths of the PDFs in archive, sorted by name (folders inside the archive included)."""
+    with zipfile.ZipFile(archive) as zf:
+        names = [info.filename for info in zf.infolist()
+                 if not info.is_dir() and info.filename.lower().endswith(".pdf")
+                 and not os.path.basename(info.filename).startswith("._")] # macOS resource forks
+    return [member_path(archive, name) for name in sorted(names, key=str.lower)]
+
+
+def expand_archives(paths):
+    """Replaces every .zip in paths by its PDF members, keeping the order. Unreadable archives stay as they are
+    (the merge reports them)."""
+    expanded = []
+    for path in paths:
+        if is_archive(path):
+            try:
+                expanded.extend(list_pdf_members(path))
+                continue
+            except (OSError, zipfile.BadZipFile) as e:
+                print(f"Cannot read archive {path}: {e}")
+        expanded.append(path)
+    return expanded
+
+
+def member_size(path):
+    """Uncompressed size of a member, 0 if it cannot be read."""
+    archive, member = split_member(path)
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            return zf.getinfo(member).file_size
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return 0
+
+
+def source_size(path):
+    """Size of a merge source: a file, or an archive member (uncompressed)."""
+    if is_member_path(path):
+        return member_size(path)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def check_member(path):
+    """check_file (core.merge_engine) for an archive member: reads only the member header and its first bytes.
+
+    Returns None if the member looks like a PDF, else a reason string.
+    """
+    archive, member = split_member(path)
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            info = zf.getinfo(member)
+            if info.flag_bits & 0x1:
+                return "암호화된 압축 파일"
+            if info.file_size == 0:
+                return "빈 파일"
+            with zf.open(info) as f:
+                head = f.read(1024)
+    except KeyError:
+        return "압축 파일에 없음"
+    except (OSError, zipfile.BadZipFile, NotImplementedError) as e:
+        return f"압축 파일을 읽을 수 없음 ({e})"
+    if b"%PDF" not in head:
+        return "PDF 파일이 아님"
+    return None
+
+
+def load_member(path):
+    """Reads a member into memory in one pass and validates it like check_file. Returns (data, reason)."""
+    archive, member = split_member(path)
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            info = zf.getinfo(member)
+            if info.flag_bits & 0x1:
+                return None, "암호화된 압축 파일"
+            data = zf.read(info)
+    except KeyError:
+        return None, "압축 파일에 없음"
+    except (OSError, zipfile.BadZipFile, NotImplementedError) as e:
+        return None, f"압축 파일을 읽을 수 없음 ({e})"
+    if not data:
+        return None, "빈 파일"
+    if b"%PDF" not in data[:1024]:
+        return None, "PDF 파일이 아님"
+    return data, None
+
+
+def read_member(path):
+    """Decompresses a member into memory (nothing is written to disk). Returns bytes."""
+    archive, member = split_member(path)
+    with zipfile.ZipFile(archive) as zf:
+        return zf.read(member)
@@ -4,11 +4,15 @@ import os
 # Ensure project root is in path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+import multiprocessing
 import tkinter as tk
 from tkinterdnd2 import TkinterDnD
 from ui.main_window import MainWindow, WindowManager
 
 if __name__ == "__main__":
+    # Worker processes (background save, indexing) in the frozen build
+    multiprocessing.freeze_support()
+    
     # Create the root window but hide it
     root = TkinterDnD.Tk()
     root.withdraw() # Hide root window
@@ -0,0 +1,64 @@
+import sys
+import os
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from core.render_profiles import render_page, RENDER_DEFAULT, RENDER_DRAFT, RENDER_DRAFT_GRAY, RENDER_LABELS
+
+SCALES = (0.1, 0.2, 0.3)
+ROUNDS = 3
+
+
+def make_vector_sheet(pages=5):
+    """A stand-in for a vector-heavy drawing sheet: thousands of thin lines and some text."""
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page(width=1684, height=1191) # A2 landscape
+        shape = page.new_shape()
+        for i in range(4000):
+            x = (i * 37 + p * 11) % 1600 + 40
+            y = (i * 53) % 1100 + 40
+            shape.draw_line((x, y), (x + (i % 90), y + (i % 70)))
+        shape.finish(width=0.2, color=(0, 0, 0))
+        shape.commit()
+        for row in range(40):
+            page.insert_text((50, 40 + row * 28), f"SHEET {p + 1}  ROW {row}  " + "DIM 1250 " * 8, fontsize=7)
+        page.add_text_annot((100, 100), "review note")
+    return doc
+
+
+def bench(doc, profile, scale):
+    best = None
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        for page in doc:
+            img = render_page(page, scale, profile)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(doc), img.width * img.height * len(img.getbands())
+
+
+def main():
+    if len(sys.argv) > 1:
+        doc = fitz.open(sys.argv[1])
+        print(f"File: {sys.argv[1]} ({len(doc)} pages)")
+    else:
+        doc = make_vector_sheet()
+        print(f"Synthetic vector sheet ({len(doc)} pages); pass a PDF path to benchmark a real drawing")
+
+    fitz.TOOLS.store_shrink(100)
+    for scale in SCALES:
+        base = None
+        for profile in (RENDER_DEFAULT, RENDER_DRAFT, RENDER_DRAFT_GRAY):
+            per_page, size = bench(doc, profile, scale)
+            base = base or per_page
+            print(f"  scale {scale:.1f}  {RENDER_LABELS[profile]:<12} {per_page * 1000:7.1f} ms/page  "
+                  f"{size / 1024:6.0f} KB  x{base / per_page:.2f}")
+    doc.close()
+
+
+if __name__ == "__main__":
+    main()
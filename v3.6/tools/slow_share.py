@@ -0,0 +1,140 @@
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from core.local_copy import LocalCopy, IO_LOCAL_COPY, COPY_BLOCK
+from core.pdf_engine import PDFEngine
+
+# A busy office SMB share: 2 ms per request, ~50 MB/s, at most 1 MB per request (SMB2 MaxReadSize)
+LATENCY = 0.002
+BANDWIDTH = 50 * 1024 * 1024
+MAX_REQUEST = 1024 * 1024
+# MuPDF reads through a small buffer and seeks between objects
+DIRECT_READ = 4096
+
+
+class SlowFile:
+    """A local file that is charged like a network share: latency per request plus bandwidth.
+
+    Stand-in for a share in tests and benchmarks (MuPDF itself cannot read
+    through Python file objects, so only our own reads can be slowed down).
+    """
+
+    def __init__(self, path, mode="rb", latency=LATENCY, bandwidth=BANDWIDTH):
+        self.f = open(path, mode)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.requests = 0
+        self.waited = 0.0
+
+    def _charge(self, n):
+        requests = max(1, -(-n // MAX_REQUEST))
+        delay = requests * self.latency + n / self.bandwidth
+        self.requests += requests
+        self.waited += delay
+        time.sleep(delay)
+
+    def readinto(self, buf):
+        n = self.f.readinto(buf)
+        self._charge(n)
+        return n
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self._charge(len(data))
+        return data
+
+    def seek(self, offset, whence=0):
+        return self.f.seek(offset, whence)
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def slow_opener(latency=LATENCY, bandwidth=BANDWIDTH):
+    """An opener for core.local_copy.copy_file that reads like a share."""
+    return lambda path, mode="rb": SlowFile(path, mode, latency, bandwidth)
+
+
+def simulate_direct(path, latency=LATENCY, bandwidth=BANDWIDTH):
+    """Estimated time for MuPDF to read every byte of path from the share in small buffered reads."""
+    size = os.path.getsize(path)
+    requests = -(-size // DIRECT_READ)
+    return requests * latency + size / bandwidth, requests
+
+
+def make_sample(path, pages=200):
+    """A large-ish drawing set with incompressible image data on every page."""
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page(width=1684, height=1191)
+        pix = fitz.Pixmap(fitz.csRGB, 256, 256, os.urandom(256 * 256 * 3), False)
+        page.insert_image(fitz.Rect(40, 40, 1000, 1000), pixmap=pix)
+        page.insert_text((50, 1100), f"SHEET {p + 1}", fontsize=20)
+        page.insert_text((1100, 1100), os.urandom(2048).hex(), fontsize=2)
+    doc.save(path, deflate=False)
+    doc.close()
+
+
+def round_trip(share_path):
+    """Opens share_path through a slow local copy, edits, saves back and checks the share file."""
+    copy = LocalCopy.create(share_path, opener=slow_opener())
+    engine = PDFEngine()
+    engine.io_mode = IO_LOCAL_COPY
+    success, msg = engine.open_pdf(share_path, local_copy=copy)
+    assert success, msg
+    assert engine.file_path == share_path and engine.doc.name == copy.local_path
+    engine.rotate_page(0, 90)
+    success, msg = engine.save_pdf()
+    assert success, msg
+    with fitz.open(share_path) as doc:
+        assert doc[0].rotation == 90, "edit did not reach the share"
+    assert engine.doc.name == copy.local_path
+    engine.close()
+    assert not os.path.exists(copy.local_path), "local copy left behind"
+    return copy, msg
+
+
+def main():
+    share = tempfile.mkdtemp(prefix="kunhwa_share_")
+    try:
+        if len(sys.argv) > 1:
+            share_path = os.path.join(share, os.path.basename(sys.argv[1]))
+            shutil.copyfile(sys.argv[1], share_path)
+        else:
+            share_path = os.path.join(share, "sample.pdf")
+            make_sample(share_path)
+        size = os.path.getsize(share_path)
+        print(f"Share stand-in: {size / 1024 / 1024:.1f} MB, {LATENCY * 1000:.0f} ms/request, "
+              f"{BANDWIDTH / 1024 / 1024:.0f} MB/s")
+
+        direct, requests = simulate_direct(share_path)
+        print(f"  direct (estimate)   {direct:6.2f}s  {requests} requests of {DIRECT_READ // 1024} KB")
+        t0 = time.perf_counter()
+        with SlowFile(share_path) as f:
+            buf = bytearray(COPY_BLOCK)
+            while f.readinto(buf):
+                pass
+            requests = f.requests
+        print(f"  local copy          {time.perf_counter() - t0:6.2f}s  {requests} requests ({COPY_BLOCK // 1024 // 1024} MB reads)")
+
+        copy, msg = round_trip(share_path)
+        print(f"  round trip: copy {copy.copy_seconds:.2f}s, publish {copy.publish_seconds:.2f}s - {msg}")
+    finally:
+        shutil.rmtree(share, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,35 @@
 import os
+import time
 import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, simpledialog
 from core.pdf_engine import PDFEngine
 from core.auth import AuthManager
 from core.clipboard import WindowManager, ClipboardManager, DragManager
+from core.merge_engine import preflight, FIDELITY_LABELS, FIDELITY_FULL
+from core.save_profiles import PROFILE_AUTO, PROFILE_INCREMENTAL, PROFILE_COMPACT, PROFILE_THUMBNAILS, PROFILE_LABELS
+from core.recovery import RecoveryJournal, find_orphaned_sessions, discard_session
+from core.memory_budget import MemoryBudget, PRIORITY_UNDO, PRIORITY_THUMBNAILS, PRIORITY_PREVIEW
+from core.performance import PerformanceSettings, PERF_LABELS, apply_global, apply_engine
+from core.render_profiles import RENDER_LABELS
+from core.staged_open import StagedOpen
+from core.local_copy import IO_LABELS, should_copy_local, cleanup_stale_copies
+from core.zip_sources import is_archive, is_member_path, expand_archives, split_member
+from core.image_import import IMAGE_EXTENSIONS
+from core.search_index import SearchIndex
+from core.folder_index import FolderIndex
+from core.text_export import TextExport, FORMAT_FILETYPES
+from core.sheet_index import SheetIndexJob, load_fields, save_fields, write_csv, toc_entries
+from core.workers import warm_up
 from config.settings import APP_NAME, VERSION, THEME_NAME
 from ui.panels.thumbnail_panel import ThumbnailPanel
 from ui.panels.preview_panel import PreviewPanel
 from tkinterdnd2 import TkinterDnD
+from PIL import Image
+
+# Open/merge dialogs: deliverables often arrive as ZIPs of PDFs (opened without extracting)
+PDF_FILETYPES = [("PDF 및 ZIP 파일", "*.pdf *.zip"), ("PDF 파일", "*.pdf"), ("ZIP 압축 파일", "*.zip")]
 class MainWindow(ttk.Toplevel):
     def __init__(self, master=None):
         super().__init__(master)
@@ -47,6 +67,8 @@ class MainWindow(ttk.Toplevel):
         
         # Bind Keys
         self.bind("<Control-o>", lambda e: self.on_open_pdf())
+        self.bind("<Control-f>", self.focus_search)
+        self.bind("<Control-F>", lambda e: self.on_folder_search())
         self.bind("<Control-s>", lambda e: self.on_save_pdf())
         self.bind("<Control-S>", lambda e: self.on_save_as_file()) # Shift+S usually maps to Capital S
         self.bind("<Control-Shift-s>", lambda e: self.on_save_as_file()) # Explicit just in case
@@ -58,6 +80,143 @@ class MainWindow(ttk.Toplevel):
         self.bind("<ButtonRelease-1>", self.on_global_release)
         
         self.setup_global_binds()
+        
+        # Staged open in progress (core.staged_open)
+        self.opening = None
+        self.open_at_page = None # page to show once the document is open (folder search hit)
+        self.folder_search = None
+        self.text_export = None # core.text_export job in progress
+        self.sheet_index = None
+        if len(self.manager.get_windows()) == 1:
+            cleanup_stale_copies()
+        
+        # Crash recovery: journal this window's edits, and offer to restore crashed sessions
+        self.journal = RecoveryJournal(self.pdf)
+        self.pdf.change_listeners.append(self.update_undo_label)
+        
+        # Full-text search: index kept up to date from the engine's change events
+        self.search_index = SearchIndex(self.pdf)
+        self.search_hits = []
+        self.search_words = 0
+        self._search_job = None
+        self.pdf.change_listeners.append(lambda change: self._schedule_search())
+        self.preview_panel.search_index = self.search_index
+        self.after(100, self._search_tick)
+        self.after(2000, self._journal_tick)
+        if len(self.manager.get_windows()) == 1:
+            self.after(500, self.offer_recovery)
+        
+        # Memory held by this window, under the editor-wide budget
+        budget = MemoryBudget()
+        budget.register("실행 취소", self, lambda: self.pdf.undo_stack.memory_bytes, self.pdf.undo_stack.spill, PRIORITY_UNDO)
+        budget.register("썸네일", self, self.thumbnail_panel.memory_bytes, None, PRIORITY_THUMBNAILS)
+        budget.register("미리보기", self, self.preview_panel.memory_bytes, None, PRIORITY_PREVIEW)
+        budget.register("검색 색인", self, self.search_index.memory_bytes, None, PRIORITY_PREVIEW)
+        self.after(2000, self._memory_tick)
+        
+        # Performance mode (persisted, tuned to this PC on first run)
+        profile = PerformanceSettings().profile()
+        apply_global(profile)
+        self.apply_performance_profile(profile)
+        if len(self.manager.get_windows()) == 1:
+            # After the profile: the render pool starts at the profile's worker count
+            warm_up("open", max_workers=1)
+            warm_up("render")
+    def _search_tick(self):
+        """Feeds the search index (worker results, in-memory pages) in short slices between UI events."""
+        if self.search_index.ready:
+            self.after(200, self._search_tick)
+            return
+        if not self.search_index.pump():
+            self.run_search() # index complete: show every hit
+        else:
+            self._update_search_label()
+        self.after(30, self._search_tick)
+    def _schedule_search(self, *args):
+        """Runs the search shortly after typing stops (or after an edit moved pages)."""
+        if self._search_job:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(150, self.run_search)
+    def run_search(self):
+        self._search_job = None
+        query = self.var_search.get().strip()
+        results = self.search_index.search(query) if query else []
+        self.search_hits = [index for index, hits in results]
+        self.search_words = sum(hits for index, hits in results)
+        self.thumbnail_panel.set_highlights(self.search_hits)
+        self.preview_panel.set_search(query)
+        self._update_search_label()
+    def _update_search_label(self):
+        if not self.var_search.get().strip():
+            self.lbl_search.config(text="")
+            return
+        text = f"{len(self.search_hits)}페이지 ({self.search_words}건)" if self.search_hits else "없음"
+        r = self.search_index.report()
+        if r['pending']:
+            text += f" | 색인 {r['pages'] - r['pending']}/{r['pages']}"
+        self.lbl_search.config(text=text)
+    def on_search_next(self, step=1):
+        """Shows the next (or previous) page with hits after the current one."""
+        if not self.search_hits:
+            return
+        current = self.preview_panel.current_page_index
+        if step > 0:
+            target = next((i for i in self.search_hits if i > current), self.search_hits[0])
+        else:
+            target = next((i for i in reversed(self.search_hits) if i < current), self.search_hits[-1])
+        self.thumbnail_panel.select_and_scroll_to(target)
+        self.preview_panel.show_page(target)
+    def focus_search(self, event=None):
+        self.ent_search.focus_set()
+        self.ent_search.select_range(0, END)
+        return "break"
+    def _memory_tick(self):
+        MemoryBudget().check()
+        self.after(2000, self._memory_tick)
+    def show_memory_report(self):
+        """Shows current memory use per window and for shared caches."""
+        r = MemoryBudget().report()
+        mb = lambda n: f"{n / 1024 / 1024:.0f} MB"
+        lines = [f"전체: {mb(r['total'])} / 한도 {mb(r['budget'])}", ""]
+        for owner, group in r['owners'].items():
+            name = "공용 (모든 창)" if owner is None else owner.title()
+            lines.append(f"[{name}] {mb(group['total'])}")
+            for consumer, size in group['consumers'].items():
+                lines.append(f"   {consumer}: {mb(size)}")
+        messagebox.showinfo("메모리 사용량", "\n".join(lines), parent=self)
+    def _journal_tick(self):
+        """Takes a recovery snapshot when the journal asks for one (undo of an assembled document, long journal)."""
+        if self.journal.needs_checkpoint and not self.pdf.background_save:
+            try:
+                self.journal.checkpoint()
+            except Exception as e:
+                print(f"Recovery checkpoint failed: {e}")
+        self.after(2000, self._journal_tick)
+    def offer_recovery(self):
+        """Offers to restore documents of sessions that did not shut down cleanly."""
+        for session in find_orphaned_sessions():
+            name = os.path.basename(session['path']) if session['path'] else "제목 없음"
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(session['modified']))
+            partial = "" if session['complete'] else "※ 마지막 편집 일부는 복구할 수 없습니다.\n\n"
+            if not messagebox.askyesno("작업 복구",
+                                       f"비정상 종료된 작업이 있습니다.\n\n문서: {name}\n마지막 편집: {when} (편집 {session['records']}건)\n\n"
+                                       f"{partial}복구하시겠습니까? (아니오를 누르면 복구 기록이 삭제됩니다)", parent=self):
+                discard_session(session)
+                continue
+            
+            target = self if not self.pdf.doc else MainWindow(master=self.master)
+            success, msg = target.pdf.recover_session(session)
+            discard_session(session)
+            if not success:
+                messagebox.showerror("복구 실패", msg, parent=self)
+                continue
+            target.thumbnail_panel.set_filename(name)
+            target.update_title()
+            target.status_bar.config(text=msg)
+            target.after(200, target._refresh_on_open)
+            report = target.pdf.last_recovery_report
+            if report and report['partial']:
+                messagebox.showwarning("일부 복구", msg, parent=target)
     def show_auth_failure_dialog(self, message):
         """Shows authentication failure dialog with Copy MAC button."""
         # Extract MAC if present in message
@@ -99,6 +258,21 @@ class MainWindow(ttk.Toplevel):
         # Wait window
         self.wait_window(dialog)
     def on_close(self):
+        if self.pdf.background_save:
+            messagebox.showinfo("저장 중", "저장이 끝날 때까지 기다려주세요.")
+            return
+        if self.opening:
+            self.opening.close()
+        if self.folder_search:
+            self.folder_search.on_close()
+        if self.text_export:
+            self.text_export.cancel()
+        if self.sheet_index:
+            self.sheet_index.on_close()
+        self.journal.close(discard=True)
+        self.pdf.undo_stack.close()
+        self.pdf.close() # lets go of documents shared with other windows
+        MemoryBudget().unregister_owner(self)
         self.manager.unregister(self)
         self.destroy() # Destroy Toplevel
         if not self.manager.get_windows():
@@ -230,7 +404,7 @@ class MainWindow(ttk.Toplevel):
                 all_pages_list.insert(insert_pos, idx)
                 
             # Apply
-            self.pdf.doc.select(all_pages_list)
+            self.pdf.reorder_pages(all_pages_list)
             self.thumbnail_panel.refresh()
             
             # Reselect moved items (they are now at insert_pos)
@@ -255,9 +429,7 @@ class MainWindow(ttk.Toplevel):
                  # So if we iterate, we just keep inserting at target_index + i
                  
                  sorted_indices = sorted(list(indices))
-                 for i, idx in enumerate(sorted_indices):
-                     self.pdf.doc.insert_pdf(src_pdf.doc, from_page=idx, to_page=idx, start_at=target_index+i)
-                     count += 1
+                 count = self.pdf.insert_pages_from(src_pdf.doc, sorted_indices, start_at=target_index, op="drop")
                  
                  self.thumbnail_panel.refresh()
                  # Select new pages
@@ -266,7 +438,7 @@ class MainWindow(ttk.Toplevel):
                  self.on_selection_change(new_selection)
                  self.thumbnail_panel.refresh_selection_visuals()
                  
-                 self.status_bar.config(text=f"Copied {count} pages from other window.")
+                 self.status_bar.config(text=f"Copied {count} pages from other window. {self._timing_text()}")
             except Exception as e:
                 print(f"Drop failed: {e}")
                 messagebox.showerror("Error", f"Drop failed: {e}")
@@ -305,13 +477,27 @@ class MainWindow(ttk.Toplevel):
             return
             
         # Paste logic similar to drop
-        count = 0
-        for idx in indices:
-            self.pdf.doc.insert_pdf(source_window.pdf.doc, from_page=idx, to_page=idx)
-            count += 1
+        count = self.pdf.insert_pages_from(source_window.pdf.doc, indices, op="paste")
             
         self.thumbnail_panel.refresh()
-        self.status_bar.config(text=f"Pasted {count} pages.")
+        self.status_bar.config(text=f"Pasted {count} pages. {self._timing_text()}")
+    def _timing_text(self):
+        """Short timing summary of the last graft (merge/paste/drop) for the status bar."""
+        t = self.pdf.last_timing
+        if not t: return ""
+        return f"[{FIDELITY_LABELS.get(t['fidelity'], t['fidelity'])}, {t['seconds'] * 1000:.0f} ms]"
+    def set_merge_fidelity(self, level):
+        self.pdf.merge_fidelity = level
+        self.status_bar.config(text=f"병합/붙여넣기 옵션: {FIDELITY_LABELS[level]}")
+    def set_virtual_mode(self, enabled):
+        self.pdf.virtual_mode = enabled
+        if enabled:
+            self.status_bar.config(text="참조 방식 조립: 새 문서의 병합/붙여넣기는 페이지를 복사하지 않고 저장할 때 만듭니다.")
+        else:
+            self.status_bar.config(text="참조 방식 조립 해제")
+    def set_io_mode(self, mode):
+        self.pdf.io_mode = mode
+        self.status_bar.config(text=f"네트워크 파일 열기: {IO_LABELS[mode]} (다음에 여는 파일부터 적용)")
     # ... (Rest of UI Setup) ...
     def setup_ui(self):
         # 0. Menu Bar
@@ -404,7 +590,15 @@ class MainWindow(ttk.Toplevel):
         file_menu.add_command(label="PDF 열기", command=self.on_open_pdf, accelerator="Ctrl+O")
         file_menu.add_command(label="저장", command=self.on_save_pdf, accelerator="Ctrl+S")
         file_menu.add_command(label="다른 이름으로 저장", command=self.on_save_as_file, accelerator="Ctrl+Shift+S")
+        file_menu.add_command(label="최적화하여 저장 (용량 축소)", command=lambda: self.on_save_pdf(profile=PROFILE_COMPACT))
+        file_menu.add_command(label="썸네일 포함 저장", command=lambda: self.on_save_pdf(profile=PROFILE_THUMBNAILS))
         file_menu.add_command(label="선택 저장", command=self.on_save_selected)
+        file_menu.add_command(label="이미지 가져오기", command=self.on_import_images)
+        file_menu.add_command(label="용량 기준 분할", command=self.on_split_by_size)
+        file_menu.add_command(label="텍스트 내보내기 (.txt/.jsonl)", command=self.on_export_text)
+        file_menu.add_separator()
+        file_menu.add_command(label="폴더에서 검색", command=self.on_folder_search, accelerator="Ctrl+Shift+F")
+        file_menu.add_command(label="도면 목록 만들기 (표제란)", command=self.on_sheet_index)
         file_menu.add_separator()
         file_menu.add_command(label="새 창", command=self.on_new_window, accelerator="Ctrl+N")
         file_menu.add_separator()
@@ -418,6 +612,37 @@ class MainWindow(ttk.Toplevel):
         edit_menu.add_command(label="페이지 삭제", command=self.on_delete_page, accelerator="Del")
         edit_menu.add_separator()
         edit_menu.add_command(label="빈 페이지 삽입", command=self.on_blank_page)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="중복 리소스 정리", command=self.on_dedupe_resources)
+        
+        # Merge / paste / drop fidelity
+        self.var_fidelity = tk.StringVar(value=self.pdf.merge_fidelity)
+        fidelity_menu = tk.Menu(edit_menu, tearoff=0)
+        edit_menu.add_cascade(label="병합/붙여넣기 옵션", menu=fidelity_menu)
+        for level, label in FIDELITY_LABELS.items():
+            fidelity_menu.add_radiobutton(label=label, value=level, variable=self.var_fidelity,
+                                          command=lambda l=level: self.set_merge_fidelity(l))
+        
+        # Assemble new documents by page reference (no copies until saved)
+        self.var_virtual = tk.BooleanVar(value=self.pdf.virtual_mode)
+        edit_menu.add_checkbutton(label="참조 방식 조립 (새 문서)", variable=self.var_virtual,
+                                  command=lambda: self.set_virtual_mode(self.var_virtual.get()))
+        
+        # Large files on network shares: work on a local copy
+        self.var_io = tk.StringVar(value=self.pdf.io_mode)
+        io_menu = tk.Menu(edit_menu, tearoff=0)
+        edit_menu.add_cascade(label="네트워크 파일 열기", menu=io_menu)
+        for mode, label in IO_LABELS.items():
+            io_menu.add_radiobutton(label=label, value=mode, variable=self.var_io,
+                                    command=lambda m=mode: self.set_io_mode(m))
+        
+        # Performance mode (all windows)
+        self.var_perf = tk.StringVar(value=PerformanceSettings().mode)
+        perf_menu = tk.Menu(edit_menu, tearoff=0)
+        edit_menu.add_cascade(label="성능 모드", menu=perf_menu)
+        for mode, label in PERF_LABELS.items():
+            perf_menu.add_radiobutton(label=label, value=mode, variable=self.var_perf,
+                                      command=lambda m=mode: self.set_performance_mode(m))
         
         # User Manager (사용자 관리)
         user_menu = tk.Menu(menubar, tearoff=0)
@@ -439,25 +664,13 @@ class MainWindow(ttk.Toplevel):
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="도움말", menu=help_menu)
         help_menu.add_command(label="사용법", command=self.show_usage_dialog)
+        help_menu.add_command(label="메모리 사용량", command=self.show_memory_report)
         help_menu.add_separator()
         help_menu.add_command(label="정보", command=lambda: messagebox.showinfo("정보", f"{APP_NAME} {VERSION}\nCreated by {AUTHOR}", parent=self))
     def on_open_pdf(self):
-        path = filedialog.askopenfilename(filetypes=[("PDF 파일", "*.pdf")])
+        path = filedialog.askopenfilename(filetypes=PDF_FILETYPES)
         if path:
-            success, msg = self.pdf.open_pdf(path)
-            if success:
-                self.status_bar.config(text=f"열림: {path}")
-                self.thumbnail_panel.set_filename(os.path.basename(path))
-                
-                # Update Title
-                filename = os.path.basename(path)
-                user = self.auth.get_current_user_name()
-                self.title(f"{filename} - {APP_NAME} {VERSION} [{user}]")
-                
-                # Delay refresh to ensure UI is ready
-                self.after(200, self._refresh_on_open)
-            else:
-                messagebox.showerror("오류", msg)
+            self.open_document(path)
     def create_toolbar_buttons(self):
         # Group 1: File (파일)
         grp_file = ttk.Labelframe(self.toolbar, text="파일", padding=5)
@@ -485,6 +698,19 @@ class MainWindow(ttk.Toplevel):
         grp_tools.pack(side=LEFT, padx=5, fill=Y)
         ttk.Button(grp_tools, text="텍스트", command=self.on_extract_text, bootstyle="info-outline").pack(side=LEFT, padx=2)
         ttk.Button(grp_tools, text="맞춤", command=self.on_fit_screen, bootstyle="secondary-outline").pack(side=LEFT, padx=2)
+        # Group 5: Search (검색)
+        grp_search = ttk.Labelframe(self.toolbar, text="검색 (Ctrl+F)", padding=5)
+        grp_search.pack(side=LEFT, padx=5, fill=Y)
+        self.var_search = tk.StringVar()
+        self.ent_search = ttk.Entry(grp_search, textvariable=self.var_search, width=18)
+        self.ent_search.pack(side=LEFT, padx=2)
+        self.ent_search.bind("<Return>", lambda e: self.on_search_next(1))
+        self.ent_search.bind("<Shift-Return>", lambda e: self.on_search_next(-1))
+        self.var_search.trace_add("write", self._schedule_search)
+        ttk.Button(grp_search, text="◀", width=2, command=lambda: self.on_search_next(-1), bootstyle="secondary-outline").pack(side=LEFT)
+        ttk.Button(grp_search, text="▶", width=2, command=lambda: self.on_search_next(1), bootstyle="secondary-outline").pack(side=LEFT, padx=2)
+        self.lbl_search = ttk.Label(grp_search, text="", width=22)
+        self.lbl_search.pack(side=LEFT, padx=2)
             
 
     def update_title(self):
@@ -517,6 +743,19 @@ class MainWindow(ttk.Toplevel):
         # Status
         self.status_bar = ttk.Label(footer_frame, text="준비", bootstyle="inverse-light", font=("맑은 고딕", 9))
         self.status_bar.pack(side=RIGHT, padx=10, pady=5)
+        
+        # Undo depth (budgeted by size, so it varies with the document)
+        self.undo_label = ttk.Label(footer_frame, text="", font=("맑은 고딕", 8), bootstyle="secondary")
+        self.undo_label.pack(side=RIGHT, padx=10, pady=5)
+    def update_undo_label(self, change=None):
+        r = self.pdf.undo_stack.report()
+        if not r['depth']:
+            self.undo_label.config(text="")
+            return
+        txt = f"실행 취소 {r['depth']}단계 (메모리 {r['memory_bytes'] / 1024 / 1024:.0f} MB"
+        if r['spilled']:
+            txt += f", 디스크 {r['disk_bytes'] / 1024 / 1024:.0f} MB"
+        self.undo_label.config(text=txt + ")")
     def on_selection_change(self, selected_indices):
         count = len(selected_indices)
         if count == 0:
@@ -542,17 +781,145 @@ class MainWindow(ttk.Toplevel):
             last_selected = list(selected_indices)[-1]
             self.preview_panel.show_page(last_selected, from_thumbnail=True)
     def on_open_pdf(self):
-        path = filedialog.askopenfilename(filetypes=[("PDF 파일", "*.pdf")])
+        path = filedialog.askopenfilename(filetypes=PDF_FILETYPES)
         if path:
-            success, msg = self.pdf.open_pdf(path)
-            if success:
-                self.status_bar.config(text=f"열림: {path}")
-                self.thumbnail_panel.set_filename(os.path.basename(path))
-                
-                # Delay refresh to ensure UI is ready
-                self.after(200, self._refresh_on_open)
-            else:
-                messagebox.showerror("오류", msg)
+            self.open_document(path)
+    def open_document(self, path, page=None):
+        """Opens path in stages so the window never waits for the whole file.
+
+        A worker opens (and if needed repairs) the file, renders page 1 and
+        measures the pages; page 1 is shown as soon as it arrives, then the
+        file is opened here and thumbnails stream in from the render workers.
+        page: index of the page to show once the document is open.
+        """
+        if self.opening:
+            self.opening.close()
+            self.opening = None
+        self.open_at_page = page
+        if is_archive(path) or is_member_path(path):
+            self.open_archive(path)
+            return
+        copy_local = should_copy_local(path, self.pdf.io_mode, self.pdf.local_copy_min_bytes)
+        self.opening = StagedOpen(path, self.preview_panel.fit_box(),
+                                  self.thumbnail_panel.scale, self.thumbnail_panel.render_profile,
+                                  copy_local=copy_local)
+        self.status_bar.config(text=f"여는 중: {path}")
+        self.after(20, self._poll_open)
+    def open_archive(self, path):
+        """Opens the PDFs of a ZIP (or one member) from memory, without extracting them.
+
+        A single PDF is opened as it is; several are merged into a new document
+        with the prefetching merge. Either way there is no file to save back to.
+        """
+        members = [path] if is_member_path(path) else [p for p in expand_archives([path]) if is_member_path(p)]
+        if not members:
+            messagebox.showerror("오류", f"압축 파일에 PDF가 없습니다.\n{path}")
+            return
+        t0 = time.perf_counter()
+        if len(members) == 1:
+            success, msg = self.pdf.open_archive_member(members[0])
+        else:
+            def on_progress(done, total, name):
+                self.status_bar.config(text=f"압축 파일 여는 중... ({done}/{total}) {name}")
+                self.update_idletasks()
+            self.pdf.open_memory()
+            success = self.pdf.merge_pdf_list(members, progress_callback=on_progress)
+            msg = "병합 실패."
+        if not success:
+            messagebox.showerror("오류", msg)
+            return
+        
+        archive = split_member(members[0])[0]
+        name = os.path.basename(members[0]) if len(members) == 1 else os.path.basename(archive)
+        self.thumbnail_panel.set_filename(name)
+        self.update_title()
+        self._refresh_on_open()
+        text = f"열림: {name} ({os.path.basename(archive)}, {self.pdf.get_page_count()}페이지, {time.perf_counter() - t0:.2f}초)"
+        report = self.pdf.last_merge_report if len(members) > 1 else None
+        if report and report['skipped']:
+            text += f" | {len(report['skipped'])}개 건너뜀"
+        self.status_bar.config(text=text)
+    def _poll_open(self):
+        job = self.opening
+        if job is None:
+            return
+        if job.info is None:
+            if not job.probe_done():
+                if job.copying:
+                    done, total = job.copy_progress
+                    elapsed = time.perf_counter() - job.started
+                    self.status_bar.config(text=f"네트워크 파일 복사 중: {job.path} "
+                                                f"({done * 100 // max(total, 1)}%, {done / 1024 / 1024:.0f}/{total / 1024 / 1024:.0f} MB, "
+                                                f"{done / 1024 / 1024 / max(elapsed, 0.001):.1f} MB/s)")
+                self.after(20, self._poll_open)
+                return
+            self._finish_probe(job)
+            if self.opening is not job:
+                return
+        
+        # Stage 3: thumbnails from the render workers, valid only while the document is unedited
+        # and the thumbnail size and profile are unchanged
+        panel = self.thumbnail_panel
+        if self.pdf.change_serial != job.serial or (panel.scale, panel.render_profile) != (job.thumb_scale, job.thumb_profile):
+            job.cancel()
+        for i, entry in job.collect():
+            panel.accept_rendered(i, entry)
+        if not job.thumbnails_done:
+            self.after(30, self._poll_open)
+            return
+        panel.end_stream()
+        job.mark('thumbnails')
+        job.close()
+        self.opening = None
+        print(f"[timing] open: {os.path.basename(job.path)}, local copy {job.timings.get('copy', 0):.2f}s, probe {job.timings['probe']:.2f}s, "
+              f"first page {job.timings.get('first_page', 0):.2f}s, ready {job.timings['ready']:.2f}s, "
+              f"thumbnails {job.timings['thumbnails']:.2f}s")
+    def _finish_probe(self, job):
+        """Stages 1-2: page 1 into the preview, then the document itself."""
+        try:
+            info = job.probe_result()
+        except Exception as e:
+            job.close()
+            self.opening = None
+            messagebox.showerror("오류", str(e))
+            return
+        
+        if info['first']:
+            mode, size, data = info['first']
+            self.preview_panel.show_image(0, Image.frombytes(mode, size, data), info['first_scale'])
+            job.mark('first_page')
+            self.status_bar.config(text=f"여는 중: {job.path} (첫 페이지 {job.timings['first_page']:.2f}초)")
+            self.update_idletasks()
+        
+        if info['repaired_path']:
+            success, msg = self.pdf.open_repaired(job.path, info['repaired_path'])
+        else:
+            success, msg = self.pdf.open_pdf(job.path, local_copy=job.take_local_copy())
+        if not success:
+            job.close()
+            self.opening = None
+            messagebox.showerror("오류", msg)
+            return
+        
+        self.thumbnail_panel.set_filename(os.path.basename(job.path))
+        self.update_title()
+        self.thumbnail_panel.start_stream()
+        self.thumbnail_panel.refresh(sizes=info['sizes'] if len(info['sizes']) == len(self.pdf.doc) else None)
+        if not info['first'] and self.pdf.get_page_count() > 0:
+            self.preview_panel.show_page(0)
+            self.preview_panel.fit_to_window()
+        if self.open_at_page:
+            self.go_to_page(self.open_at_page)
+        self.open_at_page = None
+        job.mark('ready')
+        job.start_thumbnails(sorted(self.thumbnail_panel.missing), self.pdf.change_serial)
+        
+        text = f"열림: {job.path} (첫 페이지 {job.timings.get('first_page', job.timings['ready']):.2f}초)"
+        if info['repaired_path']:
+            text += " | 손상된 파일을 복구하여 열었습니다"
+        elif self.pdf.local_copy:
+            text += f" | 로컬 복사본으로 작업 (복사 {job.timings.get('copy', 0):.1f}초)"
+        self.status_bar.config(text=text)
     def _refresh_on_open(self):
         """Called after delay"""
         self.update_idletasks()
@@ -562,16 +929,58 @@ class MainWindow(ttk.Toplevel):
             # Try to fit to window if panel is ready
             self.preview_panel.fit_to_window()
             
-    def on_save_pdf(self):
+    def on_save_pdf(self, profile=None):
         """Quick Save (Overwrite)"""
         # If file exists, overwrite. Else Save As.
         if self.pdf.file_path and os.path.exists(self.pdf.file_path):
-            success, msg = self.pdf.save_pdf(self.pdf.file_path)
-            self.status_bar.config(text=msg)
+            self.start_save(self.pdf.file_path, profile)
             # Show simple feedback?
             # messagebox.showinfo("저장", "저장되었습니다.")
         else:
             self.on_save_as_file()
+    def start_save(self, path, profile=None):
+        """Saves without blocking the UI.
+
+        Incremental appends are cheap and run immediately. Anything else is
+        serialized from a snapshot in a worker process while the user keeps
+        working; edits made meanwhile stay in the live document.
+        """
+        if self.pdf.background_save:
+            # Ctrl+S during a save: save again (with the newer edits) once this one finishes
+            self._save_again = (path, profile)
+            self.status_bar.config(text="저장 중... 완료 후 다시 저장합니다.")
+            return
+        
+        if self.pdf.choose_save_profile(path, profile or self.pdf.default_save_profile) == PROFILE_INCREMENTAL:
+            success, msg = self.pdf.save_pdf(path, profile=profile)
+            self.status_bar.config(text=msg)
+            if not success:
+                messagebox.showerror("오류", f"저장 실패: {msg}")
+            return
+        
+        started, msg = self.pdf.start_background_save(path, profile)
+        self.status_bar.config(text=msg)
+        if started:
+            self._save_again = None
+            self.after(100, self._poll_background_save)
+        else:
+            messagebox.showerror("오류", f"저장 실패: {msg}")
+    def _poll_background_save(self):
+        job = self.pdf.background_save
+        if not job: return
+        if not job.done():
+            self.status_bar.config(text=f"저장 중... ({time.perf_counter() - job.started:.0f}초)")
+            self.after(100, self._poll_background_save)
+            return
+        
+        success, msg = self.pdf.finish_background_save()
+        self.status_bar.config(text=msg)
+        if not success:
+            messagebox.showerror("오류", f"저장 실패: {msg}")
+        elif getattr(self, '_save_again', None):
+            path, profile = self._save_again
+            self._save_again = None
+            self.start_save(path, profile)
     def on_save_as_file(self):
         """Advanced Save As (PDF, JPG, PNG) with Page Selection."""
         if not self.pdf.doc:
@@ -664,12 +1073,14 @@ class MainWindow(ttk.Toplevel):
                     # save_pdf saves CURRENT doc.
                     
                     if len(page_indices) == total_pages:
-                         # Full Check
-                         success, msg = self.pdf.save_pdf(path)
+                         # Full Check (runs in the background; status bar reports completion)
+                         self.start_save(path, dialog.result['profile'])
+                         return
                     else:
                          success, msg = self.pdf.save_subset(page_indices, path)
                          
                     if success:
+                         self.status_bar.config(text=msg)
                          messagebox.showinfo("완료", "PDF 저장이 완료되었습니다.")
                     else:
                          messagebox.showerror("오류", msg)
@@ -772,6 +1183,39 @@ class MainWindow(ttk.Toplevel):
                      messagebox.showinfo("완료", "선택된 페이지가 저장되었습니다.")
                  else:
                      messagebox.showerror("오류", msg)
+    def go_to_page(self, index):
+        if 0 <= index < self.pdf.get_page_count():
+            self.thumbnail_panel.select_and_scroll_to(index)
+            self.preview_panel.show_page(index)
+    def on_folder_search(self):
+        if self.folder_search:
+            self.folder_search.lift()
+            self.folder_search.ent_query.focus_set()
+            return
+        self.folder_search = FolderSearchDialog(self)
+    def on_sheet_index(self):
+        if not self.pdf.doc:
+            messagebox.showwarning("경고", "먼저 PDF를 열어주세요.")
+            return
+        if self.sheet_index:
+            self.sheet_index.lift()
+            return
+        self.sheet_index = SheetIndexDialog(self)
+    def show_search_hit(self, path, page, query):
+        """Shows a folder search hit: in the window that has the file open, else here (if empty) or in a new window."""
+        key = os.path.normcase(os.path.abspath(path))
+        target = None
+        for win in self.manager.get_windows():
+            if win.pdf.file_path and os.path.normcase(os.path.abspath(win.pdf.file_path)) == key:
+                target = win
+                break
+        if target:
+            target.go_to_page(page)
+            target.lift()
+        else:
+            target = self if not self.pdf.doc and not self.opening else MainWindow(master=self.master)
+            target.open_document(path, page=page)
+        target.var_search.set(query) # outline the words in the preview
     def on_new_window(self):
         # Create new window in same process to share Clipboard/DragManager
         new_win = MainWindow(master=self.master)
@@ -783,32 +1227,93 @@ class MainWindow(ttk.Toplevel):
         if not self.pdf.doc:
             messagebox.showinfo("알림", "병합할 PDF를 먼저 열어주세요.")
             return
-        path = filedialog.askopenfilename(filetypes=[("PDF 파일", "*.pdf")])
+        path = filedialog.askopenfilename(filetypes=PDF_FILETYPES)
         if path:
             if self.pdf.insert_pdf(path):
                 self.thumbnail_panel.refresh()
                 self.status_bar.config(text="PDF 병합 완료.")
             else:
                 messagebox.showerror("오류", "병합 실패.")
+    def on_import_images(self):
+        patterns = " ".join(f"*{ext}" for ext in IMAGE_EXTENSIONS)
+        paths = filedialog.askopenfilenames(filetypes=[("이미지 파일", patterns)])
+        if paths:
+            self.import_images(list(paths))
+    def import_images(self, paths, insert_at=-1):
+        """Adds a page per image at insert_at: read in parallel, JPEGs unchanged, one insert and one refresh."""
+        if self.pdf.doc:
+            self.pdf.push_undo_state()
+        else:
+            self.pdf.open_memory()
+        
+        def on_progress(done, total, name):
+            if done % 10 == 0 or done == total:
+                self.status_bar.config(text=f"이미지 가져오는 중... ({done}/{total}) {name}")
+                self.update_idletasks()
+        
+        pages = self.pdf.insert_images(paths, insert_at=insert_at, progress_callback=on_progress)
+        report = self.pdf.last_image_report
+        if not pages:
+            messagebox.showerror("오류", "이미지를 가져오지 못했습니다.\n\n" + "\n".join(
+                f"{os.path.basename(p)}: {reason}" for p, reason in report['skipped'][:15]))
+            return
+        self.thumbnail_panel.refresh()
+        if self.pdf.get_page_count() == pages:
+            # The images are the whole (new) document
+            self.preview_panel.show_page(0)
+            self.preview_panel.fit_to_window()
+        self.update_title()
+        text = (f"이미지 {len(report['added'])}개 가져옴 ({pages}페이지, 무변환 {report['passthrough']}개, "
+                f"{report['seconds']:.2f}초)")
+        if report['skipped']:
+            text += f" | {len(report['skipped'])}개 건너뜀"
+        self.status_bar.config(text=text)
     def on_multi_merge(self):
-        paths = filedialog.askopenfilenames(filetypes=[("PDF 파일", "*.pdf")])
+        paths = filedialog.askopenfilenames(filetypes=PDF_FILETYPES)
         if not paths: return
+        # Every PDF inside a ZIP becomes its own entry in the ordering dialog
+        paths = expand_archives(paths)
         
         # Show Reordering Dialog
-        dialog = MergeOrderingDialog(self, paths)
+        dialog = MergeOrderingDialog(self, paths, fidelity=self.pdf.merge_fidelity)
         self.wait_window(dialog)
         
         if not dialog.result: return
         
         ordered_paths = dialog.result
+        fidelity = dialog.fidelity
+        
+        # Report broken/encrypted inputs before merging anything
+        problems = preflight(ordered_paths)
+        if problems:
+            lines = [f"{os.path.basename(p)}: {reason}" for p, reason in problems[:15]]
+            if len(problems) > 15:
+                lines.append(f"... 외 {len(problems) - 15}개")
+            if len(problems) == len(ordered_paths):
+                messagebox.showerror("오류", "병합할 수 있는 파일이 없습니다.\n\n" + "\n".join(lines))
+                return
+            if not messagebox.askyesno("확인", "다음 파일은 건너뜁니다:\n\n" + "\n".join(lines) + "\n\n나머지 파일을 병합하시겠습니까?"):
+                return
+        
+        def on_progress(done, total, name):
+            self.status_bar.config(text=f"병합 중... ({done}/{total}) {name}")
+            self.update_idletasks()
         
-        if self.pdf.merge_pdf_list(ordered_paths):
+        if self.pdf.merge_pdf_list(ordered_paths, progress_callback=on_progress, fidelity=fidelity):
+            report = self.pdf.last_merge_report
             self.thumbnail_panel.refresh()
             if self.pdf.get_page_count() > 0:
                  self.preview_panel.show_page(0) 
                  self.preview_panel.fit_to_window()
-            self.status_bar.config(text=f"{len(ordered_paths)}개 파일 병합 완료.")
-            messagebox.showinfo("완료", "파일 병합이 완료되었습니다.")
+            status = f"{len(report['merged'])}개 파일 병합 완료 ({report['pages']}페이지) {self._timing_text()}"
+            if report.get('dedupe'):
+                status += f" | 중복 리소스 {report['dedupe']['bytes_saved'] / 1024 / 1024:.1f} MB 절감"
+            self.status_bar.config(text=status)
+            msg = "파일 병합이 완료되었습니다."
+            if report['skipped']:
+                msg += f"\n\n건너뛴 파일 {len(report['skipped'])}개:\n" + "\n".join(
+                    f"{os.path.basename(p)}: {reason}" for p, reason in report['skipped'][:15])
+            messagebox.showinfo("완료", msg)
         else:
             messagebox.showerror("오류", "병합 실패.")
     def on_blank_page(self):
@@ -880,7 +1385,7 @@ class MainWindow(ttk.Toplevel):
             # Let's check pdf_manager. Or just use doc here.
             
             self.pdf.push_undo_state()
-            self.pdf.doc.new_page(pno=insert_pos, width=w, height=h)
+            self.pdf.create_blank_page(width=w, height=h, insert_at=insert_pos)
             
             dialog.destroy()
             
@@ -911,6 +1416,59 @@ class MainWindow(ttk.Toplevel):
              text_area.insert("1.0", text)
         else:
              messagebox.showinfo("알림", "텍스트가 없습니다.")
+    def on_export_text(self):
+        """Exports the text of every page (or of the selected pages) to a .txt or JSONL file."""
+        if not self.pdf.doc:
+            messagebox.showwarning("경고", "먼저 PDF를 열어주세요.")
+            return
+        if self.text_export:
+            messagebox.showinfo("알림", "텍스트를 내보내는 중입니다.")
+            return
+        indices = sorted(self.thumbnail_panel.selected_indices)
+        if len(indices) > 1:
+            answer = messagebox.askyesnocancel("텍스트 내보내기", f"선택한 {len(indices)}개 페이지만 내보내시겠습니까?\n(아니요: 전체 페이지)")
+            if answer is None:
+                return
+            if not answer:
+                indices = list(range(self.pdf.get_page_count()))
+        else:
+            indices = list(range(self.pdf.get_page_count()))
+        
+        base_name = "text_export"
+        if self.pdf.file_path:
+             base_name = os.path.splitext(os.path.basename(self.pdf.file_path))[0]
+        path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=FORMAT_FILETYPES, initialfile=base_name + ".txt")
+        if not path:
+            return
+        try:
+            self.text_export = TextExport(self.pdf, path, indices)
+        except OSError as e:
+            messagebox.showerror("오류", f"텍스트 저장 실패: {e}")
+            return
+        self.after(20, self._poll_text_export)
+    def _poll_text_export(self):
+        job = self.text_export
+        if not job: return
+        try:
+            busy = job.pump()
+        except Exception as e:
+            job.cancel()
+            self.text_export = None
+            self.status_bar.config(text="텍스트 내보내기 중단")
+            messagebox.showerror("오류", f"텍스트 저장 실패: {e}")
+            return
+        if busy:
+            done, total = job.progress()
+            self.status_bar.config(text=f"텍스트 내보내는 중... ({done}/{total}페이지)")
+            self.after(30, self._poll_text_export)
+            return
+        self.text_export = None
+        r = job.report
+        text = (f"텍스트 저장 완료: {r['pages']}페이지, {r['bytes'] / 1024 / 1024:.1f} MB, "
+                f"{r['seconds']:.1f}초 ({r['pages_per_second']:.0f}페이지/초)")
+        if r['skipped']:
+            text += f" | 텍스트 없는 페이지 {r['skipped']}개"
+        self.status_bar.config(text=text)
     def on_fit_screen(self):
         # Calculate scale to fit window
         self.preview_panel.fit_to_window()
@@ -950,11 +1508,95 @@ class MainWindow(ttk.Toplevel):
         path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF Files", "*.pdf")])
         if path:
              success = self.pdf.export_selection(sorted(list(indices)), path)
+    def on_dedupe_resources(self):
+        """Collapse identical fonts/images/XObjects (e.g. after merging template sheets)."""
+        if not self.pdf.doc: return
+        self.pdf.push_undo_state()
+        report = self.pdf.dedupe_resources()
+        if report is None:
+            messagebox.showerror("오류", "중복 리소스 정리에 실패했습니다.")
+            return
+        self.status_bar.config(text=f"중복 리소스 {report['duplicates']}개 정리, {report['bytes_saved'] / 1024 / 1024:.1f} MB 절감 ({report['seconds']:.1f}초)")
+
+    def on_split_by_size(self):
+        """Split the document into parts under a size limit (e.g. 20 MB portal uploads)."""
+        if not self.pdf.doc:
+            messagebox.showwarning("경고", "먼저 PDF를 열어주세요.")
+            return
+        if self.pdf.size_split:
+            messagebox.showinfo("알림", "용량 기준 분할이 진행 중입니다.")
+            return
+        limit_mb = simpledialog.askfloat("용량 기준 분할", "파일당 최대 용량 (MB):", initialvalue=20.0, minvalue=0.1, parent=self)
+        if not limit_mb: return
+
+        initial = "document"
+        if self.pdf.file_path:
+            initial = os.path.splitext(os.path.basename(self.pdf.file_path))[0]
+        path = filedialog.asksaveasfilename(
+            title="분할 파일 저장 (파일명_partNN.pdf)",
+            defaultextension=".pdf",
+            filetypes=[("PDF 파일", "*.pdf")],
+            initialfile=initial
+        )
+        if not path: return
+
+        started, msg = self.pdf.start_split_by_size(int(limit_mb * 1024 * 1024), os.path.splitext(path)[0])
+        self.status_bar.config(text=msg)
+        if not started:
+            messagebox.showerror("오류", f"분할 실패: {msg}")
+            return
+        self.after(100, self._poll_split_by_size)
+    def _poll_split_by_size(self):
+        job = self.pdf.size_split
+        if not job: return
+        if not job.done():
+            self.status_bar.config(text=f"분할 지점 계산 중... ({time.perf_counter() - job.started:.0f}초)")
+            self.after(100, self._poll_split_by_size)
+            return
+
+        success, parts, stats = self.pdf.finish_split_by_size()
+        if not success:
+            self.status_bar.config(text="용량 기준 분할 실패")
+            messagebox.showerror("오류", f"분할 실패: {parts}")
+            return
+
+        limit_mb = job.max_bytes / 1024 / 1024
+        lines = [f"{os.path.basename(p['path'])}: {p['start']+1}-{p['end']+1}p, {p['size']/1024/1024:.1f} MB" for p in parts[:20]]
+        if len(parts) > 20:
+            lines.append(f"... 외 {len(parts) - 20}개")
+        oversize = [p for p in parts if p['oversize']]
+        if oversize:
+            lines.append(f"\n⚠ 한 페이지만으로 {limit_mb:g} MB를 넘는 파일 {len(oversize)}개가 있습니다.")
+        self.status_bar.config(text=f"{stats['parts']}개 파일로 분할 완료 ({stats['seconds']:.1f}초, 시험 저장 {stats['trial_saves']}회)")
+        messagebox.showinfo("완료", "\n".join(lines))
+
     def set_performance_mode(self, mode):
-        # Placeholder for actual performance logic (caching strategies, etc.)
-        modes = {"high": "고성능 모드", "balanced": "균형 모드", "quality": "고품질 모드"}
-        self.perf_mode_lbl = modes.get(mode, "균형 모드")
-        messagebox.showinfo("성능 설정", f"{self.perf_mode_lbl}로 설정되었습니다.")
+        """Switches the performance profile for every window and remembers it."""
+        settings = PerformanceSettings()
+        if not settings.set_mode(mode):
+            return
+        profile = settings.profile()
+        apply_global(profile)
+        for window in self.manager.get_windows():
+            window.apply_performance_profile(profile)
+            window.var_perf.set(mode)
+        
+        label = PERF_LABELS[mode]
+        self.status_bar.config(text=f"{label}로 설정되었습니다.")
+        messagebox.showinfo("성능 설정",
+                            f"{label}로 설정되었습니다.\n\n"
+                            f"• 썸네일: {RENDER_LABELS[profile['thumb_profile']]}, 배율 {profile['thumb_scale']:g}\n"
+                            f"• 작업 프로세스: {profile['render_workers']}개\n"
+                            f"• 메모리 한도: {profile['memory_budget_mb']} MB (렌더 캐시 {profile['render_cache_mb']} MB)\n"
+                            f"• 실행 취소: 메모리 {profile['undo_memory_mb']} MB, 디스크 {profile['undo_disk_mb']} MB\n"
+                            f"• 병합 미리 읽기: {profile['prefetch_depth']}개 파일\n"
+                            f"• 저장 방식: {PROFILE_LABELS[profile['save_profile']]}", parent=self)
+    
+    def apply_performance_profile(self, profile):
+        """Applies the per-window part of a performance profile (engine and thumbnails)."""
+        apply_engine(self.pdf, profile)
+        self.thumbnail_panel.set_render_options(profile['thumb_scale'], profile['thumb_profile'])
+        
     def show_users_list(self):
         users = self.auth.get_all_users()
         if not users:
@@ -1201,7 +1843,7 @@ class ExportDialog(tk.Toplevel):
     def __init__(self, parent, total_pages, selected_count):
         super().__init__(parent)
         self.title("내보내기 옵션")
-        self.geometry("350x450")
+        self.geometry("350x600")
         self.resizable(False, False)
         
         # Center
@@ -1217,6 +1859,7 @@ class ExportDialog(tk.Toplevel):
         self.var_format = tk.StringVar(value="pdf")
         self.var_range = tk.StringVar(value="all")
         self.var_custom = tk.StringVar()
+        self.var_profile = tk.StringVar(value=PROFILE_AUTO)
         
         self.create_widgets()
         
@@ -1254,7 +1897,14 @@ class ExportDialog(tk.Toplevel):
         self.ent_custom.pack(side=LEFT, padx=5, fill=X, expand=YES)
         ttk.Label(lf_range, text="예: 1, 3-5, 8", font=("맑은 고딕", 8), bootstyle="secondary").pack(anchor=W, padx=25)
         
-        # 3. Buttons
+        # 3. PDF Save Profile (only used for full-document PDF saves)
+        lf_profile = ttk.Labelframe(self, text="PDF 저장 방식", padding=pad)
+        lf_profile.pack(fill=X, padx=pad, pady=pad)
+        for name, label in PROFILE_LABELS.items():
+            if name == PROFILE_INCREMENTAL: continue # Never valid for a new file
+            ttk.Radiobutton(lf_profile, text=label, variable=self.var_profile, value=name).pack(anchor=W, pady=2)
+        
+        # 4. Buttons
         f_btn = ttk.Frame(self, padding=pad)
         f_btn.pack(side=BOTTOM, fill=X)
         
@@ -1277,16 +1927,295 @@ class ExportDialog(tk.Toplevel):
         self.result = {
             'format': self.var_format.get(),
             'range': self.var_range.get(),
-            'custom_pages': self.var_custom.get()
+            'custom_pages': self.var_custom.get(),
+            'profile': self.var_profile.get()
         }
         self.destroy()
 
 
+class FolderSearchDialog(tk.Toplevel):
+    """Searches the PDFs of a folder (core.folder_index). Not modal: hits open in editor windows."""
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.title("폴더에서 검색")
+        self.geometry("760x520")
+        
+        self.index = FolderIndex()
+        self.var_folder = tk.StringVar()
+        self.var_query = tk.StringVar()
+        self._search_job = None
+        self.rows = {} # tree item -> (path, page)
+        
+        self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.ent_query.focus_set()
+        
+    def create_widgets(self):
+        f_top = ttk.Frame(self, padding=10)
+        f_top.pack(fill=X)
+        ttk.Label(f_top, text="폴더:").pack(side=LEFT)
+        ttk.Entry(f_top, textvariable=self.var_folder, state="readonly").pack(side=LEFT, fill=X, expand=YES, padx=5)
+        ttk.Button(f_top, text="폴더 선택", command=self.choose_folder, bootstyle="secondary-outline").pack(side=LEFT, padx=2)
+        self.btn_index = ttk.Button(f_top, text="다시 색인", command=self.start_index, bootstyle="secondary-outline", state="disabled")
+        self.btn_index.pack(side=LEFT, padx=2)
+        
+        f_query = ttk.Frame(self, padding=(10, 0))
+        f_query.pack(fill=X)
+        ttk.Label(f_query, text="검색어:").pack(side=LEFT)
+        self.ent_query = ttk.Entry(f_query, textvariable=self.var_query)
+        self.ent_query.pack(side=LEFT, fill=X, expand=YES, padx=5)
+        self.ent_query.bind("<Return>", lambda e: self.run_search())
+        self.var_query.trace_add("write", self._schedule_search)
+        
+        f_list = ttk.Frame(self, padding=10)
+        f_list.pack(fill=BOTH, expand=YES)
+        columns = ("file", "page", "text")
+        self.tree = ttk.Treeview(f_list, columns=columns, show="headings")
+        self.tree.heading("file", text="파일")
+        self.tree.heading("page", text="페이지")
+        self.tree.heading("text", text="내용")
+        self.tree.column("file", width=220)
+        self.tree.column("page", width=60, anchor=CENTER)
+        self.tree.column("text", width=440)
+        self.tree.pack(side=LEFT, fill=BOTH, expand=YES)
+        scroll = ttk.Scrollbar(f_list, orient=VERTICAL, command=self.tree.yview)
+        scroll.pack(side=RIGHT, fill=Y)
+        self.tree.config(yscrollcommand=scroll.set)
+        self.tree.bind("<Double-1>", self.on_open_hit)
+        self.tree.bind("<Return>", self.on_open_hit)
+        
+        self.lbl_status = ttk.Label(self, text="검색할 폴더를 선택하세요.", padding=(10, 0, 10, 10))
+        self.lbl_status.pack(fill=X)
+        
+    def choose_folder(self):
+        folder = filedialog.askdirectory(parent=self)
+        if folder:
+            self.var_folder.set(folder)
+            self.btn_index.config(state="normal")
+            self.start_index()
+            
+    def start_index(self):
+        """Indexes new and changed files of the folder; unchanged files are searchable right away."""
+        report = self.index.start(self.var_folder.get())
+        self.lbl_status.config(text=f"PDF {report['files']}개, 색인할 파일 {report['todo']}개")
+        self.run_search()
+        self.after(50, self._poll_index)
+        
+    def _poll_index(self):
+        if not self.winfo_exists():
+            return
+        busy = self.index.pump()
+        r = self.index.report
+        if busy:
+            self.lbl_status.config(text=f"색인 중... ({r['done']}/{r['todo']}) | PDF {r['files']}개")
+            self.after(100, self._poll_index)
+            return
+        text = f"PDF {r['files']}개 | 새로 색인 {r['done']}개, {r['pages']}페이지 ({r['seconds']:.1f}초)"
+        if r['errors']:
+            text += f" | 읽지 못한 파일 {len(r['errors'])}개"
+        self.lbl_status.config(text=text)
+        self.run_search()
+        
+    def _schedule_search(self, *args):
+        if self._search_job:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(200, self.run_search)
+        
+    def run_search(self):
+        self._search_job = None
+        self.tree.delete(*self.tree.get_children())
+        self.rows = {}
+        folder = self.index.folder
+        for path, page, snippet in self.index.search(self.var_query.get().strip()):
+            item = self.tree.insert("", END, values=(os.path.relpath(path, folder), page + 1, snippet))
+            self.rows[item] = (path, page)
+            
+    def on_open_hit(self, event=None):
+        sel = self.tree.selection()
+        if not sel:
+            return
+        path, page = self.rows[sel[0]]
+        if not os.path.exists(path):
+            messagebox.showerror("오류", f"파일이 없습니다.\n{path}", parent=self)
+            return
+        self.parent.show_search_hit(path, page, self.var_query.get().strip())
+        
+    def on_close(self):
+        self.index.close()
+        self.parent.folder_search = None
+        self.destroy()
+        
+class SheetIndexDialog(tk.Toplevel):
+    """Sheet index of a drawing set from its title blocks (core.sheet_index).
+
+    Not modal: the field regions are dragged on the main window's preview.
+    """
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.title("도면 목록 만들기 (표제란)")
+        self.geometry("640x560")
+        
+        self.fields = load_fields()
+        self.field_rows = [] # (name var, region label)
+        self.var_bookmarks = tk.BooleanVar(value=False)
+        self.job = None
+        self.csv_path = None
+        
+        self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+    def create_widgets(self):
+        pad = 10
+        lf_fields = ttk.Labelframe(self, text="표제란 항목", padding=pad)
+        lf_fields.pack(fill=X, padx=pad, pady=pad)
+        ttk.Label(lf_fields, text="미리보기에 도면을 띄우고 [영역 지정] 후 항목 위치를 드래그하세요.",
+                  font=("맑은 고딕", 8), bootstyle="secondary").pack(anchor=W, pady=(0, 5))
+        self.f_rows = ttk.Frame(lf_fields)
+        self.f_rows.pack(fill=X)
+        for name, region in self.fields:
+            self.add_field_row(name, region)
+        ttk.Button(lf_fields, text="+ 항목 추가", command=lambda: self.add_field_row(f"항목{len(self.fields) + 1}", None),
+                   bootstyle="secondary-link").pack(anchor=W)
+        
+        f_opt = ttk.Frame(self, padding=(pad, 0))
+        f_opt.pack(fill=X)
+        ttk.Checkbutton(f_opt, text="책갈피 만들기 (도면번호 + 도면명)", variable=self.var_bookmarks).pack(side=LEFT)
+        self.btn_run = ttk.Button(f_opt, text="목록 만들기", command=self.on_run, bootstyle="primary")
+        self.btn_run.pack(side=RIGHT)
+        
+        f_list = ttk.Frame(self, padding=pad)
+        f_list.pack(fill=BOTH, expand=YES)
+        self.tree = ttk.Treeview(f_list, show="headings")
+        self.tree.pack(side=LEFT, fill=BOTH, expand=YES)
+        scroll = ttk.Scrollbar(f_list, orient=VERTICAL, command=self.tree.yview)
+        scroll.pack(side=RIGHT, fill=Y)
+        self.tree.config(yscrollcommand=scroll.set)
+        self.tree.bind("<Double-1>", self.on_show_sheet)
+        
+        self.lbl_status = ttk.Label(self, text="", padding=(pad, 0, pad, pad))
+        self.lbl_status.pack(fill=X)
+        
+    def add_field_row(self, name, region):
+        k = len(self.field_rows)
+        if k >= len(self.fields):
+            self.fields.append([name, region])
+        row = ttk.Frame(self.f_rows)
+        row.pack(fill=X, pady=2)
+        var_name = tk.StringVar(value=name)
+        ttk.Entry(row, textvariable=var_name, width=14).pack(side=LEFT)
+        lbl = ttk.Label(row, text=self.region_text(region), width=36)
+        lbl.pack(side=LEFT, padx=5)
+        ttk.Button(row, text="영역 지정", command=lambda: self.pick(k), bootstyle="secondary-outline").pack(side=LEFT, padx=2)
+        ttk.Button(row, text="지우기", command=lambda: self.set_region(k, None), bootstyle="danger-link").pack(side=LEFT)
+        self.field_rows.append((var_name, lbl))
+        
+    def region_text(self, region):
+        if not region:
+            return "(영역 없음)"
+        x0, y0, x1, y1 = region
+        return f"가로 {x0 * 100:.1f}~{x1 * 100:.1f}%, 세로 {y0 * 100:.1f}~{y1 * 100:.1f}%"
+        
+    def pick(self, k):
+        if not self.parent.preview_panel.pick_region(lambda region: self.set_region(k, region)):
+            messagebox.showinfo("알림", "미리보기에 페이지를 먼저 표시하세요.", parent=self)
+            return
+        self.lbl_status.config(text=f"미리보기에서 '{self.field_rows[k][0].get()}' 영역을 드래그하세요.")
+        self.parent.lift()
+        
+    def set_region(self, k, region):
+        self.fields[k][1] = list(region) if region else None
+        self.field_rows[k][1].config(text=self.region_text(region))
+        self.lbl_status.config(text="")
+        self.lift()
+        
+    def on_run(self):
+        if self.job:
+            return
+        for (var_name, lbl), field in zip(self.field_rows, self.fields):
+            field[0] = var_name.get().strip() or field[0]
+        fields = [f for f in self.fields if f[1]]
+        if not fields:
+            messagebox.showwarning("경고", "영역을 지정한 항목이 없습니다.", parent=self)
+            return
+        save_fields(self.fields)
+        pdf = self.parent.pdf
+        if not pdf.doc:
+            messagebox.showwarning("경고", "먼저 PDF를 열어주세요.", parent=self)
+            return
+        base_name = os.path.splitext(os.path.basename(pdf.file_path))[0] if pdf.file_path else "도면"
+        self.csv_path = filedialog.asksaveasfilename(parent=self, defaultextension=".csv", initialfile=f"{base_name}_도면목록.csv",
+                                                     filetypes=[("CSV 파일", "*.csv")])
+        if not self.csv_path:
+            return
+        self.columns = [name for name, region in fields]
+        self.tree.delete(*self.tree.get_children())
+        self.tree.config(columns=["page"] + self.columns)
+        self.tree.heading("page", text="페이지")
+        self.tree.column("page", width=60, anchor=CENTER)
+        for name in self.columns:
+            self.tree.heading(name, text=name)
+        self.job = SheetIndexJob(pdf, fields)
+        self.btn_run.config(state="disabled")
+        self.after(20, self._poll)
+        
+    def _poll(self):
+        job = self.job
+        if not job or not self.winfo_exists():
+            return
+        try:
+            busy = job.pump()
+        except Exception as e:
+            self.job = None
+            self.btn_run.config(state="normal")
+            self.lbl_status.config(text="")
+            messagebox.showerror("오류", str(e), parent=self)
+            return
+        if busy:
+            done, total = job.progress()
+            self.lbl_status.config(text=f"표제란 읽는 중... ({done}/{total})")
+            self.after(30, self._poll)
+            return
+        self.job = None
+        self.btn_run.config(state="normal")
+        rows = job.rows
+        for number, values in rows:
+            self.tree.insert("", END, values=[number] + values)
+        fields = [(name, region) for name, region in job.fields]
+        try:
+            write_csv(self.csv_path, fields, rows)
+        except OSError as e:
+            messagebox.showerror("오류", f"CSV 저장 실패: {e}", parent=self)
+            return
+        text = f"{len(rows)}장, {job.seconds:.1f}초 | 저장: {os.path.basename(self.csv_path)}"
+        empty = sum(1 for number, values in rows if not any(values))
+        if empty:
+            text += f" | 표제란이 빈 페이지 {empty}장"
+        if self.var_bookmarks.get():
+            pdf = self.parent.pdf
+            pdf.push_undo_state()
+            pdf.set_bookmarks(toc_entries(rows))
+            text += " | 책갈피 추가 (저장 필요)"
+        self.lbl_status.config(text=text)
+        
+    def on_show_sheet(self, event=None):
+        sel = self.tree.selection()
+        if sel:
+            self.parent.go_to_page(int(self.tree.item(sel[0], "values")[0]) - 1)
+            
+    def on_close(self):
+        if self.job:
+            self.job.cancel()
+            self.job = None
+        self.parent.sheet_index = None
+        self.destroy()
+        
 class MergeOrderingDialog(tk.Toplevel):
-    def __init__(self, parent, file_paths):
+    def __init__(self, parent, file_paths, fidelity=FIDELITY_FULL):
         super().__init__(parent)
         self.title("파일 병합 순서 지정")
-        self.geometry("400x400")
+        self.geometry("400x500")
         
         # Center
         x = parent.winfo_rootx() + (parent.winfo_width() // 2) - 200
@@ -1295,6 +2224,8 @@ class MergeOrderingDialog(tk.Toplevel):
         
         self.result = None
         self.file_paths = list(file_paths)
+        self.fidelity = fidelity
+        self.var_fidelity = tk.StringVar(value=fidelity)
         
         self.create_widgets()
         
@@ -1320,6 +2251,12 @@ class MergeOrderingDialog(tk.Toplevel):
         for path in self.file_paths:
             self.listbox.insert(END, os.path.basename(path))
             
+        # Fidelity (what to copy besides page content)
+        lf_fid = ttk.Labelframe(self, text="병합 옵션", padding=10)
+        lf_fid.pack(fill=X, padx=10)
+        for level, label in FIDELITY_LABELS.items():
+            ttk.Radiobutton(lf_fid, text=label, variable=self.var_fidelity, value=level).pack(anchor=W, pady=1)
+        
         # Control Buttons Frame
         f_ctrl = ttk.Frame(self, padding=10)
         f_ctrl.pack(fill=X)
@@ -1383,4 +2320,5 @@ class MergeOrderingDialog(tk.Toplevel):
             messagebox.showwarning("경고", "병합할 파일이 없습니다.")
             return
         self.result = self.file_paths
+        self.fidelity = self.var_fidelity.get()
         self.destroy()
@@ -1,4 +1,5 @@
 import tkinter as tk
+import fitz  # PyMuPDF
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from PIL import Image, ImageTk
@@ -10,6 +11,11 @@ class PreviewPanel(ttk.Frame):
         self.on_page_change = on_page_change
         self.current_page_index = 0
         self.photo_image = None
+        self._origin = (0, 0)
+        
+        # Search hits outlined on the page (set by MainWindow)
+        self.search_index = None
+        self.search_query = ""
         
         # UI Components
         self.lbl_title = ttk.Label(self, text="Preview", font=("맑은 고딕", 10, "bold"), bootstyle="inverse-dark", padding=5)
@@ -35,6 +41,11 @@ class PreviewPanel(ttk.Frame):
         # Show Logo on Startup
         self.show_logo()
 
+    def memory_bytes(self):
+        if not self.photo_image:
+            return 0
+        return self.photo_image.width() * self.photo_image.height() * 4
+
     def _on_resize(self, event):
         # Re-center image if visible
         if self.photo_image:
@@ -113,30 +124,102 @@ class PreviewPanel(ttk.Frame):
         pil_img = self.pdf.get_page_image(index, scale=self.zoom_scale) 
         
         if pil_img:
-            self.photo_image = ImageTk.PhotoImage(pil_img)
-            
-            # Center image on canvas
-            c_width = self.canvas.winfo_width()
-            c_height = self.canvas.winfo_height()
-            
-            if c_width < 100: c_width = 800 # Fallback if not mapped
-            if c_height < 100: c_height = 600
+            self._draw(pil_img)
+            self._draw_hits()
 
-            img_w = self.photo_image.width()
-            img_h = self.photo_image.height()
-            
-            x = max(0, (c_width - img_w) // 2)
-            y = max(0, (c_height - img_h) // 2)
+    def show_image(self, index, pil_img, scale):
+        """Shows a page rendered elsewhere (e.g. by the open worker before the document is loaded here)."""
+        self.current_page_index = index
+        self.zoom_scale = scale
+        self._draw(pil_img)
 
-            self.canvas.delete("all")
-            self.canvas.create_image(x, y, anchor="nw", image=self.photo_image)
-            self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+    def _draw(self, pil_img):
+        self.photo_image = ImageTk.PhotoImage(pil_img)
+        
+        # Center image on canvas
+        c_width = self.canvas.winfo_width()
+        c_height = self.canvas.winfo_height()
+        
+        if c_width < 100: c_width = 800 # Fallback if not mapped
+        if c_height < 100: c_height = 600
 
-    def fit_to_window(self):
-        """Fit the current page to the window size (Zoom to Fit)."""
-        if not self.pdf.doc or not (0 <= self.current_page_index < len(self.pdf.doc)):
+        img_w = self.photo_image.width()
+        img_h = self.photo_image.height()
+        
+        x = max(0, (c_width - img_w) // 2)
+        y = max(0, (c_height - img_h) // 2)
+
+        self.canvas.delete("all")
+        self.canvas.create_image(x, y, anchor="nw", image=self.photo_image)
+        self._origin = (x, y)
+        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+
+    def set_search(self, query):
+        """Outlines the words matching query on the shown page ("" clears)."""
+        self.search_query = query
+        self.canvas.delete("hit")
+        if self.photo_image:
+            self._draw_hits()
+
+    def _draw_hits(self):
+        if not (self.search_index and self.search_query):
+            return
+        rects = self.search_index.page_hits(self.current_page_index, self.search_query)
+        if not rects:
             return
+        # Index boxes are in unrotated page space; the preview shows the page rotated and zoomed
+        page = self.pdf.doc[self.current_page_index]
+        matrix = ~page.derotation_matrix * fitz.Matrix(self.zoom_scale, self.zoom_scale)
+        x0, y0 = self._origin
+        for rect in rects:
+            r = rect * matrix
+            self.canvas.create_rectangle(x0 + r.x0, y0 + r.y0, x0 + r.x1, y0 + r.y1,
+                                         outline="#ff8800", width=2, tags="hit")
+
+    def pick_region(self, callback):
+        """Lets the user drag a rectangle over the shown page. callback((x0, y0, x1, y1)) gets it
+        as fractions of the page as shown. Returns False if no page is shown."""
+        if not self.photo_image:
+            return False
+        self._pick = {'callback': callback, 'start': None}
+        self.canvas.config(cursor="crosshair")
+        self.canvas.bind("<ButtonPress-1>", self._on_pick_start)
+        self.canvas.bind("<B1-Motion>", self._on_pick_drag)
+        self.canvas.bind("<ButtonRelease-1>", self._on_pick_end)
+        return True
+
+    def _on_pick_start(self, event):
+        self._pick['start'] = (self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        self.canvas.delete("pick")
 
+    def _on_pick_drag(self, event):
+        if not self._pick['start']:
+            return
+        x0, y0 = self._pick['start']
+        self.canvas.delete("pick")
+        self.canvas.create_rectangle(x0, y0, self.canvas.canvasx(event.x), self.canvas.canvasy(event.y),
+                                     outline="#2563EB", width=2, dash=(4, 2), tags="pick")
+
+    def _on_pick_end(self, event):
+        start = self._pick['start']
+        callback = self._pick['callback']
+        self.canvas.unbind("<ButtonPress-1>")
+        self.canvas.unbind("<B1-Motion>")
+        self.canvas.unbind("<ButtonRelease-1>")
+        self.canvas.config(cursor="")
+        if not start:
+            return
+        ox, oy = self._origin
+        w, h = self.photo_image.width(), self.photo_image.height()
+        x1, y1 = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        fx = sorted(min(1.0, max(0.0, (x - ox) / w)) for x in (start[0], x1))
+        fy = sorted(min(1.0, max(0.0, (y - oy) / h)) for y in (start[1], y1))
+        if fx[1] - fx[0] < 0.002 or fy[1] - fy[0] < 0.002:
+            return # a click, not a rectangle
+        callback((round(fx[0], 4), round(fy[0], 4), round(fx[1], 4), round(fy[1], 4)))
+
+    def fit_box(self):
+        """(width, height) a page has to fit into for Zoom to Fit."""
         c_width = self.canvas.winfo_width()
         c_height = self.canvas.winfo_height()
         
@@ -145,20 +228,27 @@ class PreviewPanel(ttk.Frame):
              c_width = 800
              c_height = 600
         
-        # Get page dimensions (72 DPI base)
-        page = self.pdf.doc[self.current_page_index]
-        rect = page.rect
-        p_width = rect.width
-        p_height = rect.height
-        
-        # Calculate scale
         # Margin 20px
         available_w = c_width - 20
         available_h = c_height - 20
         
         if available_w <= 0: available_w = 780
         if available_h <= 0: available_h = 580
+        return available_w, available_h
+
+    def fit_to_window(self):
+        """Fit the current page to the window size (Zoom to Fit)."""
+        if not self.pdf.doc or not (0 <= self.current_page_index < len(self.pdf.doc)):
+            return
 
+        available_w, available_h = self.fit_box()
+        
+        # Get page dimensions (72 DPI base)
+        page = self.pdf.doc[self.current_page_index]
+        rect = page.rect
+        p_width = rect.width
+        p_height = rect.height
+        
         scale_w = available_w / p_width
         scale_h = available_h / p_height
         
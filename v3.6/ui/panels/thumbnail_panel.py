@@ -1,10 +1,17 @@
 import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import os
+import time
 from PIL import Image, ImageTk
 from tkinterdnd2 import DND_FILES
-from config.settings import APP_NAME, VERSION
+from core.thumb_store import ThumbnailStore
+from core.render_profiles import RENDER_DRAFT
+from core.thumb_cache import ThumbnailDiskCache
+from core.image_import import is_image_file
+
+# Idle-time rendering of thumbnails not yet on screen: short slices keep the UI responsive
+FILL_SLICE_SECONDS = 0.04
+FILL_DELAY_MS = 10
 
 class ThumbnailPanel(ttk.Frame):
     def __init__(self, master, pdf_engine, on_selection_change, drag_manager=None, bootstyle="secondary", **kwargs):
@@ -13,10 +20,20 @@ class ThumbnailPanel(ttk.Frame):
         self.on_selection_change = on_selection_change
         self.drag_manager = drag_manager
         
-        self.thumbnails = [] # List of PhotoImage
+        self.store = ThumbnailStore() # every rendered thumbnail, compressed
+        self.thumbnails = {} # index -> PhotoImage, only for thumbnails on screen
+        self.thumb_labels = [] # image label per index
         self.thumb_widgets = [] # List of (frame, index)
+        self._visible_pending = False
+        self.missing = set() # indices with a placeholder, not rendered yet
+        self.visible = set() # indices on screen (plus margin), rendered first
+        self.streaming = False # thumbnails are being rendered by workers (staged open)
+        self._fill_generation = 0 # bumped by refresh; stops an idle fill of the previous layout
         self.selected_indices = set()
+        self.highlighted = set() # pages with search hits
         self.scale = 0.2
+        # Full anti-aliasing and annotations are invisible at thumbnail scale
+        self.render_profile = RENDER_DRAFT
         
         # Drag State
         self.drag_start_index = None
@@ -40,7 +57,7 @@ class ThumbnailPanel(ttk.Frame):
         self.drag_guide_frame = tk.Frame(self.scroll_frame, bg="#0d6efd", width=4)
         
         self.canvas_window = self.canvas.create_window((0, 0), window=self.scroll_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
         
         # Pack Scrollbar FIRST to ensure it reserves space
         self.scrollbar.pack(side=RIGHT, fill=Y)
@@ -72,47 +89,40 @@ class ThumbnailPanel(ttk.Frame):
         
         main_win = self.winfo_toplevel()
         
-        pdf_files = [f for f in files if f.lower().endswith('.pdf')]
+        # Images become pages in one batch (core.image_import)
+        image_files = [f for f in files if is_image_file(f)]
+        if image_files:
+            target_index = self.get_index_at(event.x_root, event.y_root) if self.pdf.doc else -1
+            main_win.import_images(image_files, insert_at=target_index)
+        
+        # A dropped ZIP stands for the PDFs inside it (read from the archive, not extracted)
+        pdf_files = [f for f in files if f.lower().endswith(('.pdf', '.zip'))]
         if not pdf_files: return
         
         if not self.pdf.doc:
-            file_path = pdf_files[0]
-            # Call open_pdf logic from MainWindow
-            success, msg = main_win.pdf.open_pdf(file_path)
-            if success:
-                main_win.status_bar.config(text=f"열림: {file_path}")
-                self.set_filename(os.path.basename(file_path))
-                
-                # Update Title
-                filename = os.path.basename(file_path)
-                user = main_win.auth.get_current_user_name()
-                main_win.title(f"{filename} - {APP_NAME} {VERSION} [{user}]")
-                
-                main_win.after(200, main_win._refresh_on_open)
-            else:
-                import tkinter.messagebox as messagebox
-                messagebox.showerror("오류", msg)
+            main_win.open_document(pdf_files[0])
         else:
             target_index = self.get_index_at(event.x_root, event.y_root)
             if target_index == -1:
                 target_index = -1
                 
-            success_count = 0
-            
             # Snap undo state before appending files
             if len(pdf_files) > 0:
                 main_win.pdf.push_undo_state()
                 
-            for file_path in pdf_files:
-                old_len = len(self.pdf.doc)
-                if main_win.pdf.insert_pdf(file_path, insert_at=target_index):
-                    success_count += 1
-                    if target_index != -1:
-                        target_index += (len(self.pdf.doc) - old_len)
+            # One prefetching merge for all dropped files (sources are closed as they are grafted)
+            main_win.pdf.merge_pdf_list(pdf_files, insert_at=target_index)
+            report = main_win.pdf.last_merge_report
+            success_count = len(report['merged'])
                         
             if success_count > 0:
                 self.refresh()
-                main_win.status_bar.config(text=f"PDF {success_count}개 파일 병합 완료.")
+                msg = f"PDF {success_count}개 파일 병합 완료. {main_win._timing_text()}"
+                if report['skipped']:
+                    msg += f" ({len(report['skipped'])}개 건너뜀)"
+                if report.get('dedupe'):
+                    msg += f" | 중복 리소스 {report['dedupe']['bytes_saved'] / 1024 / 1024:.1f} MB 절감"
+                main_win.status_bar.config(text=msg)
             else:
                 import tkinter.messagebox as messagebox
                 messagebox.showerror("오류", "병합 실패.")
@@ -126,6 +136,9 @@ class ThumbnailPanel(ttk.Frame):
     def scroll(self, delta):
         self.canvas.yview_scroll(int(-1*(delta/120)), "units")
 
+    def memory_bytes(self):
+        """Approximate bytes held by thumbnails: the compressed store plus decoded images (RGBA in Tk)."""
+        return self.store.stored_bytes + sum(img.width() * img.height() * 4 for img in self.thumbnails.values())
     def zoom(self, delta):
         if delta > 0:
             self.scale = min(2.0, self.scale + 0.1) 
@@ -133,6 +146,15 @@ class ThumbnailPanel(ttk.Frame):
             self.scale = max(0.1, self.scale - 0.1)
         self.refresh()
 
+    def set_render_options(self, scale, profile):
+        """Thumbnail scale and render profile from the performance mode; re-renders if either changed."""
+        if scale == self.scale and profile == self.render_profile:
+            return
+        self.scale = scale
+        self.render_profile = profile
+        if self.pdf.doc:
+            self.refresh()
+
     def select_all(self):
         if not self.pdf.doc: return
         self.selected_indices = set(range(len(self.pdf.doc)))
@@ -149,7 +171,8 @@ class ThumbnailPanel(ttk.Frame):
             # Force a refresh now that we have geometry
             self.refresh()
             
-    def refresh(self):
+    def refresh(self, sizes=None):
+        """Rebuilds the grid. sizes: thumbnail (width, height) per page if already known (staged open)."""
         # Clear existing
         for widget in self.scroll_frame.winfo_children():
             if hasattr(self, 'drag_guide_frame') and widget == self.drag_guide_frame:
@@ -160,31 +183,49 @@ class ThumbnailPanel(ttk.Frame):
         self.scroll_frame.lift()
         
         self.thumbnails.clear()
+        self.thumb_labels.clear()
         self.thumb_widgets.clear()
+        self.store.clear()
+        self.missing.clear()
+        self._fill_generation += 1
         
         if not self.pdf.doc:
             return
 
+        # Pages seen before (same file content, scale and profile) come from the disk cache;
+        # the rest get a placeholder and are rendered when they scroll into view or at idle time
+        t0 = time.perf_counter()
+        cache = ThumbnailDiskCache()
+        placeholders = 0
         for i in range(len(self.pdf.doc)):
             try:
-                # Frame style depends on selection
-                style = "primary" if i in self.selected_indices else "light"
+                # Frame style depends on selection (and search hits)
+                style = self._frame_style(i)
                 
                 frame = ttk.Frame(self.scroll_frame, padding=5, bootstyle=style)
                 
-                # Use consistent scale
-                pil_img = self.pdf.get_page_image(i, scale=self.scale)
-                if pil_img:
-                    tk_img = ImageTk.PhotoImage(pil_img)
-                    self.thumbnails.append(tk_img)
-                    
-                    lbl_img = ttk.Label(frame, image=tk_img)
-                    lbl_img.pack(side=TOP, pady=2)
-                    self._bind_events(lbl_img, i)
+                key = self.pdf.thumbnail_key(i)
+                entry = cache.get(key, self.scale, self.render_profile) if key else None
+                if entry:
+                    self.store.put_entry(i, entry)
+                    width, height = entry[1]
                 else:
-                    # Fallback
-                    lbl_img = ttk.Label(frame, text="Error", width=10)
-                    lbl_img.pack(side=TOP, pady=2)
+                    self.missing.add(i)
+                    width, height = sizes[i] if sizes else self.pdf.page_pixel_size(i, self.scale)
+                    # Embedded /Thumb: shown at once, replaced when the page is rendered
+                    placeholder = self.pdf.embedded_thumbnail(i)
+                    if placeholder:
+                        self.store.put(i, placeholder.resize((width, height), Image.BILINEAR))
+                        placeholders += 1
+                holder = tk.Frame(frame, width=width, height=height, bg="white")
+                holder.pack_propagate(False)
+                holder.pack(side=TOP, pady=2)
+                self._bind_events(holder, i)
+                
+                lbl_img = ttk.Label(holder)
+                lbl_img.pack(fill=BOTH, expand=YES)
+                self._bind_events(lbl_img, i)
+                self.thumb_labels.append(lbl_img)
                 
                 lbl_num = ttk.Label(frame, text=f"{i+1}", font=("맑은 고딕", 9))
                 lbl_num.pack(side=BOTTOM)
@@ -197,11 +238,128 @@ class ThumbnailPanel(ttk.Frame):
 
         # Update Grid
         self.update_grid_layout()
+        self._update_visible()
+        
+        cached = len(self.thumb_widgets) - len(self.missing)
+        print(f"[timing] thumbnails: {len(self.thumb_widgets)} pages in {time.perf_counter() - t0:.2f}s, "
+              f"{cached} from disk cache, {placeholders} embedded, {len(self.missing)} to render")
+        if self.streaming:
+            pass # thumbnails arrive from the open workers (accept_rendered)
+        elif self.missing:
+            self.after(FILL_DELAY_MS, self._idle_fill, self._fill_generation)
+        else:
+            self._report_store()
         
         # Note: update_grid_layout now handles the scrollregion update robustly.
         # We don't force yview_moveto(0) here because it causes the view to jump to the top when zooming,
         # which is annoying for the user. We just let the canvas stay at its scroll position.
         
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Decode what scrolled into view (coalesced: one pass per idle)
+        if not self._visible_pending:
+            self._visible_pending = True
+            self.after_idle(self._update_visible)
+
+    def _update_visible(self):
+        """Decodes thumbnails that are on screen (plus half a screen of margin) and drops the rest."""
+        self._visible_pending = False
+        if not self.thumb_widgets:
+            return
+        view_h = max(self.canvas.winfo_height(), 100)
+        top = self.canvas.canvasy(0) - view_h // 2
+        bottom = self.canvas.canvasy(0) + view_h * 3 // 2
+        self.visible.clear()
+        for i, frame in enumerate(self.thumb_widgets):
+            y = frame.winfo_y()
+            visible = y + frame.winfo_height() >= top and y <= bottom
+            if visible:
+                self.visible.add(i)
+            if visible and i not in self.thumbnails:
+                # Placeholders (embedded /Thumb) are replaced by the idle fill, visible ones first;
+                # while the open workers stream thumbnails nothing is rendered here
+                if i in self.missing and i not in self.store.entries and not self.streaming:
+                    if not self._render_thumbnail(i):
+                        continue
+                pil_img = self.store.get(i)
+                if pil_img is None:
+                    continue
+                self.thumbnails[i] = ImageTk.PhotoImage(pil_img)
+                self.thumb_labels[i].configure(image=self.thumbnails[i])
+            elif not visible and i in self.thumbnails:
+                self.thumb_labels[i].configure(image="")
+                del self.thumbnails[i]
+
+    def _render_thumbnail(self, i):
+        """Renders a missing thumbnail into the store and the disk cache. Returns False on failure."""
+        self.missing.discard(i)
+        try:
+            pil_img = self.pdf.get_page_image(i, scale=self.scale, profile=self.render_profile)
+        except Exception as e:
+            print(f"Error loading thumbnail {i}: {e}")
+            pil_img = None
+        if pil_img is None:
+            if i in self.store.entries:
+                return True # keep the embedded placeholder
+            self.thumb_labels[i].configure(text="Error")
+            return False
+        entry = self.store.put(i, pil_img)
+        key = self.pdf.thumbnail_key(i)
+        if key:
+            ThumbnailDiskCache().put(key, self.scale, self.render_profile, entry)
+        if i in self.thumbnails:
+            # Replaces a placeholder on screen
+            self.thumbnails[i] = ImageTk.PhotoImage(pil_img)
+            self.thumb_labels[i].configure(image=self.thumbnails[i])
+        return True
+
+    def start_stream(self):
+        """Thumbnails will be delivered by workers (staged open): no rendering on the UI thread meanwhile."""
+        self.streaming = True
+
+    def accept_rendered(self, i, entry):
+        """Takes a thumbnail rendered by a worker (a ThumbnailStore entry)."""
+        if i not in self.missing:
+            return
+        self.missing.discard(i)
+        self.store.put_entry(i, entry)
+        key = self.pdf.thumbnail_key(i)
+        if key:
+            ThumbnailDiskCache().put(key, self.scale, self.render_profile, entry)
+        if i in self.visible:
+            self.thumbnails[i] = ImageTk.PhotoImage(self.store.get(i))
+            self.thumb_labels[i].configure(image=self.thumbnails[i])
+
+    def end_stream(self):
+        """Workers are done (or were cancelled); whatever is left is rendered at idle time."""
+        self.streaming = False
+        if self.missing:
+            self.after(FILL_DELAY_MS, self._idle_fill, self._fill_generation)
+        else:
+            ThumbnailDiskCache().flush()
+            self._report_store()
+
+    def _idle_fill(self, generation):
+        """Renders the remaining thumbnails in short slices between UI events (fills the disk cache)."""
+        if generation != self._fill_generation or not self.pdf.doc:
+            return
+        t0 = time.perf_counter()
+        while self.missing and time.perf_counter() - t0 < FILL_SLICE_SECONDS:
+            on_screen = self.missing & self.visible
+            self._render_thumbnail(min(on_screen or self.missing))
+        if self.missing:
+            self.after(FILL_DELAY_MS, self._idle_fill, generation)
+        else:
+            ThumbnailDiskCache().flush()
+            self._report_store()
+
+    def _report_store(self):
+        r = self.store.report()
+        if r['thumbnails']:
+            print(f"[timing] thumbnails: {r['thumbnails']} pages ({r['gray']} gray), "
+                  f"{r['raw_per_thumb'] / 1024:.1f} KB -> {r['stored_per_thumb'] / 1024:.1f} KB per thumbnail, "
+                  f"{r['raw_bytes'] / 1024 / 1024:.1f} MB -> {r['stored_bytes'] / 1024 / 1024:.1f} MB total")
+
     def _update_scrollregion(self):
         # Kept for compatibility if used elsewhere, but refresh does it inline now
         self.scroll_frame.update_idletasks()
@@ -389,10 +547,19 @@ class ThumbnailPanel(ttk.Frame):
         self.has_dragged = False
         self.drag_start_pos = None
 
+    def _frame_style(self, index):
+        if index in self.selected_indices:
+            return "primary"
+        return "warning" if index in self.highlighted else "light"
+
     def refresh_selection_visuals(self):
         for i, frame in enumerate(self.thumb_widgets):
-            style = "primary" if i in self.selected_indices else "light"
-            frame.configure(bootstyle=style)
+            frame.configure(bootstyle=self._frame_style(i))
+
+    def set_highlights(self, indices):
+        """Marks the pages with search hits."""
+        self.highlighted = set(indices)
+        self.refresh_selection_visuals()
 
     def select_and_scroll_to(self, index):
         if not self.pdf.doc or not (0 <= index < len(self.pdf.doc)):